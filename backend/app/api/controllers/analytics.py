@@ -1,56 +1,103 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_current_active_user, get_db_session
-from typing import Optional
-from app.schemas.user import User
-from app.schemas.analytics import AnalyticsResponse, AnalyticsFilters
+from app.api.dependencies import (
+    conditional_get,
+    get_current_active_user,
+    get_current_user_state,
+)
+from app.core.cache import build_response_cache
 from app.crud import crud_analytics
+from app.crud.user import UserState
+from app.db import SessionContext, SessionLocal
+from app.db.routing import require_version, use_replica
+from app.schemas.analytics import AnalyticsFilters, AnalyticsResponse
+from app.schemas.user import User
 
 router = APIRouter()
 
-@router.get("/", response_model=AnalyticsResponse)
+analytics_cache = build_response_cache(AnalyticsResponse)
+
+
+@router.get(
+    "/",
+    response_model=AnalyticsResponse,
+    dependencies=[Depends(conditional_get(vary_by_day=True))],
+)
 async def get_analytics_data(
-    *, # Ensures all subsequent parameters are keyword-only
-    db: AsyncSession = Depends(get_db_session),
+    *,  # Ensures all subsequent parameters are keyword-only
+    db: SessionContext,
     current_user: User = Depends(get_current_active_user),
-    filters: AnalyticsFilters = Depends() # Injects query params: time_period, habit_id
+    state: UserState = Depends(get_current_user_state),
+    # Injects query params: time_period, habit_id
+    filters: AnalyticsFilters = Depends(),
 ):
     """
     Retrieve aggregated analytics data for the current user.
 
     - **time_period**: Filter data by 'Day', 'Week', 'Month', 'Year'. Defaults to 'Month'.
     - **habit_id**: Optional. Filter data for a specific habit ID.
+    - **start** / **end**: Optional. Custom inclusive date range in the user's timezone.
+    - **granularity**: Optional. 'hour', 'day', 'week' or 'month' buckets for a custom
+      range.
+    - **max_points**: Optional. Longer progress series are downsampled (LTTB) to this
+      many points.
     """
     user_id = current_user.id
+    timezone = state.timezone
     time_period = filters.time_period
     # Convert habit_id from string (if provided via query) to int, or keep as None
-    habit_id_int: Optional[int] = None
+    habit_id_int: int | None = None
     if filters.habit_id is not None:
         try:
             habit_id_int = int(filters.habit_id)
         except ValueError as exc:
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="Invalid habit_id format. Must be an integer."
+                detail="Invalid habit_id format. Must be an integer.",
             ) from exc
+    try:
+        crud_analytics.resolve_window(
+            time_period, timezone, filters.start, filters.end, filters.granularity
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        ) from exc
 
-    summary_stats = await crud_analytics.get_summary_stats(
-        db=db, user_id=user_id, time_period=time_period, habit_id_filter=habit_id_int
-    )
-    habit_progress = await crud_analytics.get_habit_progress_data(
-        db=db, user_id=user_id, time_period=time_period, habit_id_filter=habit_id_int
-    )
-    category_distribution = await crud_analytics.get_category_distribution_data(
-        db=db, user_id=user_id, time_period=time_period
-    )
-    habit_performance = await crud_analytics.get_habit_performance_data(
-        db=db, user_id=user_id, time_period=time_period
-    )
+    async def load(session: AsyncSession) -> AnalyticsResponse:
+        # All four sections come from one fused statement (a single scan of the window)
+        return await crud_analytics.get_analytics(
+            db=session,
+            user_id=user_id,
+            time_period=time_period,
+            habit_id_filter=habit_id_int,
+            timezone=timezone,
+            start=filters.start,
+            end=filters.end,
+            granularity=filters.granularity,
+            max_points=filters.max_points,
+        )
+
+    async def compute() -> AnalyticsResponse:
+        return await load(db)
+
+    async def refresh() -> AnalyticsResponse:
+        # Background refreshes outlive the request, so they bring their own session
+        async with SessionLocal() as session:
+            use_replica(session, user_id)
+            await require_version(session, user_id, state.data_version)
+            return await load(session)
 
-    return AnalyticsResponse(
-        summary_stats=summary_stats,
-        habit_progress=habit_progress,
-        category_distribution=category_distribution,
-        habit_performance=habit_performance,
+    cache_key = crud_analytics.analytics_cache_key(
+        user_id=user_id,
+        data_version=state.data_version,
+        time_period=time_period,
+        habit_id_filter=habit_id_int,
+        timezone=timezone,
+        start=filters.start,
+        end=filters.end,
+        granularity=filters.granularity,
+        max_points=filters.max_points,
     )
+    return await analytics_cache.get_or_compute(cache_key, compute, refresh)
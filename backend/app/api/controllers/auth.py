@@ -1,20 +1,32 @@
-from datetime import timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
-from app.crud.user import UserRepositoryDependency
-from app.crud.role import RoleRepositoryDependency
-from app.schemas import User, UserCreate, Token
-from app.core.security import create_access_token, create_refresh_token, verify_password, verify_token
-from app.core.config import settings
 from app.api.dependencies import get_current_active_user
-from fastapi.security import OAuth2PasswordBearer
+from app.core.security import (
+    PasswordHashingBusy,
+    create_access_token,
+    create_refresh_token,
+    password_hasher,
+    verify_token,
+)
+from app.crud.role import RoleRepositoryDependency
+from app.crud.user import UserRepositoryDependency
+from app.schemas import Token, User, UserCreate, UserTimezoneUpdate
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login") # tokenUrl can be any valid path for token acquisition
+oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="/auth/login"
+)  # tokenUrl can be any valid path for token acquisition
 
 router = APIRouter()
 
+busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many sign-ins at the moment, please retry shortly",
+    headers={"Retry-After": "1"},
+)
+
+
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_in: UserCreate,
@@ -29,7 +41,7 @@ async def register_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email already exists",
         )
-    
+
     # Assign default 'User' role if not specified
     if user_in.role_id is None:
         user_role = await role_repo.get_role_by_name(name="User")
@@ -41,9 +53,13 @@ async def register_user(
             )
         user_in.role_id = user_role.id
 
-    user = await user_repo.create_user(user_data=user_in)
+    try:
+        user = await user_repo.create_user(user_data=user_in)
+    except PasswordHashingBusy as exc:
+        raise busy_exception from exc
     return user
 
+
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
     user_repo: UserRepositoryDependency,
@@ -51,16 +67,29 @@ async def login_for_access_token(
 ):
     """Authenticate user and return a JWT access token."""
     user = await user_repo.get_user_by_email(email=form_data.username)
-    if not user or not verify_password(form_data.password, user.password_hash):
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await password_hasher.verify(
+                form_data.password, user.password_hash
+            )
+        except PasswordHashingBusy as exc:
+            raise busy_exception from exc
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    access_token = create_access_token(subject=user.id)
-    refresh_token = create_refresh_token(subject=user.id)
-    
+    user_id = user.id
+    if new_hash:
+        # Hashed with a cost other than BCRYPT_ROUNDS; upgrade it now that we know the
+        # password
+        await user_repo.update_password_hash(user_id=user_id, password_hash=new_hash)
+
+    access_token = create_access_token(subject=user_id)
+    refresh_token = create_refresh_token(subject=user_id)
+
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -74,6 +103,18 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 
+@router.put("/me/timezone", response_model=User)
+async def update_my_timezone(
+    timezone_in: UserTimezoneUpdate,
+    user_repo: UserRepositoryDependency,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Set the timezone used for the current user's day, week and month boundaries."""
+    return await user_repo.update_timezone(
+        user_id=current_user.id, timezone=timezone_in.timezone
+    )
+
+
 @router.post("/refresh_token", response_model=Token)
 async def refresh_access_token(token: str = Depends(oauth2_scheme)):
     """Refresh an access token using a refresh token."""
@@ -85,18 +126,18 @@ async def refresh_access_token(token: str = Depends(oauth2_scheme)):
     payload = verify_token(token)
     if not payload or payload.get("type") != "refresh":
         raise credentials_exception
-    
+
     user_id = payload.get("sub")
     if user_id is None:
         raise credentials_exception
-    
+
     # Generate new access token (refresh token remains the same for this flow)
     new_access_token = create_access_token(subject=user_id)
-    
-    # For simplicity, we return the original refresh token. 
+
+    # For simplicity, we return the original refresh token.
     # A more robust system might issue a new refresh token and invalidate the old one (rotation).
     return {
         "access_token": new_access_token,
-        "refresh_token": token, # Returning the same refresh token
+        "refresh_token": token,  # Returning the same refresh token
         "token_type": "bearer",
     }
@@ -1,47 +1,67 @@
 import datetime
-from typing import List, Optional
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.api.dependencies import get_current_active_user
+from app.api.dependencies import (
+    conditional_get,
+    get_current_active_user,
+    get_current_user_state,
+)
 from app.crud.habit import (
     HabitCategoryRepositoryDependency,
     HabitRepositoryDependency,
     HabitTrackingLogRepositoryDependency,
 )
+from app.crud.user import UserState
+from app.db.bucketing import local_today
 from app.schemas import (
     Habit,
     HabitCategory,
     HabitCategoryCreate,
     HabitCategoryUpdate,
     HabitCreate,
-    HabitUpdate,
+    HabitStatistics,  # Added for response model
+    HabitSummary,
     HabitTrackingLog,
     HabitTrackingLogCreate,
     HabitTrackingLogUpdate,
-    HabitStatistics, # Added for response model
+    HabitUpdate,
+    StreakOverview,
     User,
+    YearHeatmap,
 )
 
 router = APIRouter()
 
 # --- Habit Category Endpoints --- #
 
-@router.post("/categories", response_model=HabitCategory, status_code=status.HTTP_201_CREATED)
+
+@router.post(
+    "/categories", response_model=HabitCategory, status_code=status.HTTP_201_CREATED
+)
 async def create_habit_category(
     category_in: HabitCategoryCreate,
     category_repo: HabitCategoryRepositoryDependency,
     current_user: User = Depends(get_current_active_user),
 ):
-    return await category_repo.create_habit_category(user_id=current_user.id, name=category_in.name, color=category_in.color)
+    return await category_repo.create_habit_category(
+        user_id=current_user.id, name=category_in.name, color=category_in.color
+    )
+
 
-@router.get("/categories", response_model=List[HabitCategory])
+@router.get(
+    "/categories",
+    response_model=list[HabitCategory],
+    dependencies=[Depends(conditional_get())],
+)
 async def get_user_habit_categories(
     category_repo: HabitCategoryRepositoryDependency,
     current_user: User = Depends(get_current_active_user),
 ):
     return await category_repo.get_habit_categories_by_user_id(user_id=current_user.id)
 
+
 @router.put("/categories/{category_id}", response_model=HabitCategory)
 async def update_habit_category(
     category_id: int,
@@ -56,9 +76,12 @@ async def update_habit_category(
         color=category_in.color,
     )
     if not updated_category:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Habit category not found or not owned by user")
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "Habit category not found or not owned by user"
+        )
     return updated_category
 
+
 @router.delete("/categories/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_habit_category(
     category_id: int,
@@ -69,11 +92,15 @@ async def delete_habit_category(
         category_id=category_id, user_id=current_user.id
     )
     if not deleted:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Habit category not found or not owned by user")
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "Habit category not found or not owned by user"
+        )
     return
 
+
 # --- Habit Endpoints --- #
 
+
 @router.post("", response_model=Habit, status_code=status.HTTP_201_CREATED)
 async def create_habit(
     habit_in: HabitCreate,
@@ -82,23 +109,77 @@ async def create_habit(
 ):
     # Use model_dump to pass all validated data from the Pydantic model
     # to the repository function. This is more robust and less error-prone.
-    return await habit_repo.create_habit(user_id=current_user.id, **habit_in.model_dump())
+    return await habit_repo.create_habit(
+        user_id=current_user.id, **habit_in.model_dump()
+    )
+
 
-@router.get("", response_model=List[Habit])
+@router.get(
+    "",
+    response_model=list[HabitSummary],
+    dependencies=[Depends(conditional_get(vary_by_day=True))],
+)
 async def get_user_habits(
-    habit_repo: HabitRepositoryDependency, current_user: User = Depends(get_current_active_user)
+    habit_repo: HabitRepositoryDependency,
+    current_user: User = Depends(get_current_active_user),
+    state: UserState = Depends(get_current_user_state),
+    include: Literal["logs"] | None = Query(
+        None, description="Also return every habit's full tracking log history"
+    ),
+):
+    """The user's habits with last_logged_at, today_count and current period counts."""
+    return await habit_repo.get_habit_summaries(
+        user_id=current_user.id,
+        today=local_today(state.timezone),
+        include_logs=include == "logs",
+    )
+
+
+@router.get("/streaks", response_model=StreakOverview)
+async def get_user_streaks(
+    log_repo: HabitTrackingLogRepositoryDependency,
+    current_user: User = Depends(get_current_active_user),
+    state: UserState = Depends(get_current_user_state),
 ):
-    return await habit_repo.get_habits_by_user_id(user_id=current_user.id)
+    return await log_repo.get_streak_overview(
+        user_id=current_user.id, today=local_today(state.timezone)
+    )
+
+
+@router.get(
+    "/heatmap",
+    response_model=YearHeatmap,
+    dependencies=[Depends(conditional_get(vary_by_day=True))],
+)
+async def get_year_heatmap(
+    log_repo: HabitTrackingLogRepositoryDependency,
+    year: int | None = Query(
+        None,
+        ge=1970,
+        le=9999,
+        description="Defaults to the current year in the user's timezone",
+    ),
+    current_user: User = Depends(get_current_active_user),
+    state: UserState = Depends(get_current_user_state),
+):
+    """Completion bitmaps for all of the user's habits for one year."""
+    if year is None:
+        year = local_today(state.timezone).year
+    return await log_repo.get_year_heatmap(user_id=current_user.id, year=year)
+
 
 @router.get("/{habit_id}", response_model=Habit)
 async def get_habit(
-    habit_id: int, habit_repo: HabitRepositoryDependency, current_user: User = Depends(get_current_active_user)
+    habit_id: int,
+    habit_repo: HabitRepositoryDependency,
+    current_user: User = Depends(get_current_active_user),
 ):
     habit = await habit_repo.get_habit_by_id(habit_id=habit_id, user_id=current_user.id)
     if not habit:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Habit not found")
     return habit
 
+
 @router.put("/{habit_id}", response_model=Habit)
 async def update_habit(
     habit_id: int,
@@ -109,11 +190,18 @@ async def update_habit(
     habit = await habit_repo.get_habit_by_id(habit_id=habit_id, user_id=current_user.id)
     if not habit:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Habit not found")
-    return await habit_repo.update_habit(habit_id=habit_id, user_id=current_user.id, values_to_update=habit_in.model_dump(exclude_none=True))
+    return await habit_repo.update_habit(
+        habit_id=habit_id,
+        user_id=current_user.id,
+        values_to_update=habit_in.model_dump(exclude_none=True),
+    )
+
 
 @router.delete("/{habit_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_habit(
-    habit_id: int, habit_repo: HabitRepositoryDependency, current_user: User = Depends(get_current_active_user)
+    habit_id: int,
+    habit_repo: HabitRepositoryDependency,
+    current_user: User = Depends(get_current_active_user),
 ):
     habit = await habit_repo.get_habit_by_id(habit_id=habit_id, user_id=current_user.id)
     if not habit:
@@ -121,28 +209,36 @@ async def delete_habit(
     await habit_repo.delete_habit(habit_id=habit_id, user_id=current_user.id)
     return
 
+
 @router.get("/{habit_id}/statistics", response_model=HabitStatistics)
 async def get_habit_statistics(
     habit_id: int,
     habit_repo: HabitRepositoryDependency,
     log_repo: HabitTrackingLogRepositoryDependency,
-    days: int = Query(30, ge=1, le=365), # Default 30 days, min 1, max 365
+    days: int = Query(30, ge=1, le=365),  # Default 30 days, min 1, max 365
     current_user: User = Depends(get_current_active_user),
 ):
     habit = await habit_repo.get_habit_by_id(habit_id=habit_id, user_id=current_user.id)
     if not habit:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found or not owned by user")
-    
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Habit not found or not owned by user",
+        )
+
     statistics = await log_repo.get_habit_statistics(
-        habit_id=habit_id,
-        user_id=current_user.id,
-        days=days
+        habit_id=habit_id, user_id=current_user.id, days=days
     )
     return statistics
 
+
 # --- Habit Tracking Log Endpoints --- #
 
-@router.post("/{habit_id}/logs", response_model=HabitTrackingLog, status_code=status.HTTP_201_CREATED)
+
+@router.post(
+    "/{habit_id}/logs",
+    response_model=HabitTrackingLog,
+    status_code=status.HTTP_201_CREATED,
+)
 async def create_habit_log(
     habit_id: int,
     log_in: HabitTrackingLogCreate,
@@ -157,19 +253,23 @@ async def create_habit_log(
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Habit ID mismatch")
     return await log_repo.create_log(log_data=log_in)
 
-@router.get("/{habit_id}/logs", response_model=List[HabitTrackingLog])
+
+@router.get("/{habit_id}/logs", response_model=list[HabitTrackingLog])
 async def get_habit_logs(
     habit_id: int,
     log_repo: HabitTrackingLogRepositoryDependency,
     habit_repo: HabitRepositoryDependency,
     current_user: User = Depends(get_current_active_user),
-    start_date: Optional[datetime.date] = None,
-    end_date: Optional[datetime.date] = None,
+    start_date: datetime.date | None = None,
+    end_date: datetime.date | None = None,
 ):
     habit = await habit_repo.get_habit_by_id(habit_id=habit_id)
     if not habit or habit.user_id != current_user.id:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Habit not found")
-    return await log_repo.get_logs_by_habit(habit_id=habit_id, start_date=start_date, end_date=end_date)
+    return await log_repo.get_logs_by_habit(
+        habit_id=habit_id, start_date=start_date, end_date=end_date
+    )
+
 
 @router.put("/logs/{log_id}", response_model=HabitTrackingLog)
 async def update_habit_log(
@@ -185,7 +285,13 @@ async def update_habit_log(
     habit = await habit_repo.get_habit_by_id(habit_id=log.habit_id)
     if not habit or habit.user_id != current_user.id:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Not authorized")
-    return await log_repo.update_log(log_id=log_id, date=log_in.date, habit_id=log_in.habit_id, is_completed=log_in.is_completed)
+    return await log_repo.update_log(
+        log_id=log_id,
+        date=log_in.date,
+        habit_id=log_in.habit_id,
+        is_completed=log_in.is_completed,
+    )
+
 
 @router.delete("/logs/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_habit_log(
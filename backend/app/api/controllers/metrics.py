@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+
+from app.api.dependencies import get_current_admin_user
+from app.core.security import password_hasher
+from app.db import engine, replica_engine
+from app.db.pool import pool_metrics
+
+# Queue depths and pool internals are for operators only
+router = APIRouter(dependencies=[Depends(get_current_admin_user)])
+
+
+@router.get("")
+async def get_metrics() -> dict:
+    """Process-level gauges and counters for this worker. Requires the Admin role."""
+    metrics = {
+        "password_hashing": password_hasher.metrics(),
+        "database_pool": pool_metrics(engine),
+    }
+    if replica_engine is not None:
+        metrics["replica_pool"] = pool_metrics(replica_engine)
+    return metrics
@@ -0,0 +1,69 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app import models, schemas
+from app.api.dependencies import get_current_active_user
+from app.crud.sync import (
+    CHANGES_PAGE_SIZE,
+    MAX_CHANGES_PAGE_SIZE,
+    SyncRepositoryDependency,
+    changes_since,
+    cursor_expired,
+)
+
+router = APIRouter()
+
+
+@router.post("/logs", response_model=schemas.SyncLogResponse)
+async def sync_habit_tracking_logs(
+    *,
+    batch_in: schemas.SyncLogBatch,
+    sync_repo: SyncRepositoryDependency,
+    current_user: models.User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Apply an offline queue of tracking log operations in one round trip.
+    Logs are addressed by client-generated UUIDs, so replaying the same queue
+    after a dropped response is safe: creates that already landed come back as
+    `duplicate` and replayed deletes as `not_found`. Results are in queue order.
+    """
+    results = await sync_repo.apply_log_operations(
+        user_id=current_user.id, operations=batch_in.operations
+    )
+    return {"results": results}
+
+
+@router.get("/changes", response_model=schemas.SyncChanges)
+async def read_changes(
+    *,
+    sync_repo: SyncRepositoryDependency,
+    current_user: models.User = Depends(get_current_active_user),
+    since: str | None = None,
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE),
+) -> Any:
+    """
+    Habits, categories and tracking logs created, updated or deleted since a cursor,
+    at most `limit` rows, oldest change first.
+    Omit `since` for a first full sync, then pass the returned `cursor` each time;
+    while `has_more` is true, call again straight away for the next page.
+    Rows may repeat across calls, so apply them as upserts. 410 means the cursor
+    is too old to list every delete; resync in full.
+    """
+    position = None
+    if since is not None:
+        try:
+            position = changes_since(since)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Invalid cursor.",
+            )
+        if cursor_expired(position.since):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Cursor expired; resync without `since`.",
+            )
+    return await sync_repo.get_changes(
+        user_id=current_user.id, position=position, limit=limit
+    )
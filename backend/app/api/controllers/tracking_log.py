@@ -1,59 +1,272 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Any
+import asyncio
+from pathlib import PurePath
+from typing import Any, Literal
 
-from app import schemas, models
-# Import repository dependencies
-from app.crud.habit import HabitRepositoryDependency, HabitTrackingLogRepositoryDependency
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
+
+from app import models, schemas
 from app.api.dependencies import get_current_active_user
+from app.core.export import ENCODERS, EXPORT_MEDIA_TYPES
+from app.core.importer import IMPORT_FORMATS, run_import_job, save_upload
+from app.crud.export import EXPORT_COLUMNS, stream_tracking_logs
+
+# Import repository dependencies
+from app.crud.habit import (
+    HabitRepositoryDependency,
+    HabitTrackingLogRepositoryDependency,
+)
+from app.crud.import_job import ImportJobRepositoryDependency
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_page_cursor
+from app.models.import_job import ImportJobStatus
 
 router = APIRouter()
 
+
 @router.post("/", response_model=schemas.HabitTrackingLog)
 async def create_habit_tracking_log(
     *,
     log_in: schemas.HabitTrackingLogCreate,
     habit_repo: HabitRepositoryDependency,
     tracking_log_repo: HabitTrackingLogRepositoryDependency,
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: models.User = Depends(get_current_active_user),
 ) -> Any:
     """
     Create new habit tracking log.
     `user_id` is automatically associated with the current authenticated user.
     """
     # Check if the habit exists and belongs to the current user
-    habit = await habit_repo.get_habit_by_id(habit_id=log_in.habit_id, user_id=current_user.id)
+    habit = await habit_repo.get_habit_by_id(
+        habit_id=log_in.habit_id, user_id=current_user.id
+    )
     if not habit:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Habit with id {log_in.habit_id} not found or you do not have permission."
+            detail=(
+                f"Habit with id {log_in.habit_id} not found "
+                "or you do not have permission."
+            ),
         )
 
     log = await tracking_log_repo.create_tracking_log(
         habit_id=log_in.habit_id,
         user_id=current_user.id,
-        logged_datetime=log_in.logged_datetime
+        logged_datetime=log_in.logged_datetime,
     )
     return log
 
-@router.get("/habit/{habit_id}", response_model=List[schemas.HabitTrackingLog])
+
+@router.post("/batch", response_model=list[schemas.HabitTrackingLog])
+async def create_habit_tracking_logs(
+    *,
+    batch_in: schemas.HabitTrackingLogBatchCreate,
+    habit_repo: HabitRepositoryDependency,
+    tracking_log_repo: HabitTrackingLogRepositoryDependency,
+    current_user: models.User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Create several habit tracking logs at once, e.g. for a whole routine.
+    Either every log is created or, if any habit is not the user's, none are.
+    """
+    habit_ids = {log.habit_id for log in batch_in.logs}
+    missing = habit_ids - await habit_repo.owned_habit_ids(
+        habit_ids=habit_ids, user_id=current_user.id
+    )
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=(
+                f"Habits with ids {sorted(missing)} not found "
+                "or you do not have permission."
+            ),
+        )
+
+    logs = await tracking_log_repo.create_tracking_logs(
+        user_id=current_user.id,
+        logs=[
+            log.model_dump(
+                include={"habit_id", "logged_datetime", "completed", "progress"}
+            )
+            for log in batch_in.logs
+        ],
+    )
+    return logs
+
+
+def _page_params(cursor: str | None) -> dict:
+    if cursor is None:
+        return {}
+    try:
+        position, direction = parse_page_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor."
+        )
+    return {"position": position, "direction": direction}
+
+
+@router.get("/habit/{habit_id}", response_model=schemas.HabitTrackingLogPage)
 async def read_habit_tracking_logs_for_habit(
     *,
     habit_id: int,
     habit_repo: HabitRepositoryDependency,
     tracking_log_repo: HabitTrackingLogRepositoryDependency,
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: models.User = Depends(get_current_active_user),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
 ) -> Any:
     """
-    Retrieve tracking logs for a specific habit of the current user.
+    Retrieve tracking logs for a specific habit of the current user, newest first.
+    Pass `next_cursor` (older) or `prev_cursor` (newer) from a page as `cursor`.
     """
-    habit = await habit_repo.get_habit_by_id(habit_id=habit_id, user_id=current_user.id)
-    if not habit:
+    if not await habit_repo.user_owns_habit(habit_id=habit_id, user_id=current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Habit with id {habit_id} not found or you do not have permission."
+            detail=f"Habit with id {habit_id} not found or you do not have permission.",
         )
-    logs = await tracking_log_repo.get_tracking_logs_by_habit_id(habit_id=habit_id)
-    return logs
+    return await tracking_log_repo.get_tracking_log_page(
+        user_id=current_user.id, habit_id=habit_id, limit=limit, **_page_params(cursor)
+    )
+
+
+@router.get("/feed", response_model=schemas.HabitTrackingLogPage)
+async def read_tracking_log_feed(
+    *,
+    tracking_log_repo: HabitTrackingLogRepositoryDependency,
+    current_user: models.User = Depends(get_current_active_user),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> Any:
+    """
+    The current user's activity feed: tracking logs across all habits, newest first.
+    """
+    return await tracking_log_repo.get_tracking_log_page(
+        user_id=current_user.id, limit=limit, **_page_params(cursor)
+    )
+
+
+@router.get("/export")
+async def export_habit_tracking_logs(
+    *,
+    habit_repo: HabitRepositoryDependency,
+    current_user: models.User = Depends(get_current_active_user),
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    habit_id: int | None = None,
+) -> StreamingResponse:
+    """
+    Export all of the current user's tracking logs, or one habit's, as CSV or NDJSON.
+    Rows are streamed from a server-side cursor in batches.
+    """
+    if habit_id is not None and not await habit_repo.user_owns_habit(
+        habit_id=habit_id, user_id=current_user.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Habit with id {habit_id} not found or you do not have permission.",
+        )
+    batches = stream_tracking_logs(user_id=current_user.id, habit_id=habit_id)
+    filename = (
+        f"tracking-logs-{habit_id if habit_id is not None else 'all'}.{export_format}"
+    )
+    return StreamingResponse(
+        ENCODERS[export_format](EXPORT_COLUMNS, batches),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post(
+    "/import", response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED
+)
+async def import_habit_tracking_logs(
+    *,
+    file: UploadFile,
+    background_tasks: BackgroundTasks,
+    import_job_repo: ImportJobRepositoryDependency,
+    current_user: models.User = Depends(get_current_active_user),
+    import_format: Literal["csv", "ndjson"] | None = Query(None, alias="format"),
+) -> Any:
+    """
+    Bulk import tracking logs from a CSV or NDJSON upload (the export's format works
+    as is). The file is loaded in chunks by a background job; poll
+    GET /import/{job_id} for progress.
+    Rows already present (same habit and logged time) are skipped.
+    """
+    file_format: str | None = import_format
+    if file_format is None:
+        suffix = PurePath(file.filename or "").suffix.lower().lstrip(".")
+        file_format = "ndjson" if suffix == "jsonl" else suffix
+        if file_format not in IMPORT_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=(
+                    "Could not tell the file format; pass format=csv or format=ndjson."
+                ),
+            )
+    job = await import_job_repo.create_import_job(
+        user_id=current_user.id, format=file_format
+    )
+    await asyncio.to_thread(save_upload, file.file, job.id, file_format)
+    background_tasks.add_task(run_import_job, job.id)
+    return job
+
+
+@router.get("/import/{job_id}", response_model=schemas.ImportJob)
+async def read_import_job(
+    *,
+    job_id: int,
+    import_job_repo: ImportJobRepositoryDependency,
+    current_user: models.User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Get the status and throughput of an import job.
+    """
+    job = await import_job_repo.get_import_job(job_id=job_id, user_id=current_user.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Import job with id {job_id} not found.",
+        )
+    return job
+
+
+@router.post(
+    "/import/{job_id}/resume",
+    response_model=schemas.ImportJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def resume_import_job(
+    *,
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    import_job_repo: ImportJobRepositoryDependency,
+    current_user: models.User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Resume a failed or interrupted import from its last committed chunk.
+    """
+    job = await import_job_repo.get_import_job(job_id=job_id, user_id=current_user.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Import job with id {job_id} not found.",
+        )
+    if job.status not in (ImportJobStatus.FAILED, ImportJobStatus.RUNNING):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Import job {job_id} is {job.status.value} and cannot be resumed.",
+        )
+    background_tasks.add_task(run_import_job, job.id)
+    return job
+
 
 @router.get("/{log_id}", response_model=schemas.HabitTrackingLog)
 async def read_habit_tracking_log(
@@ -61,7 +274,7 @@ async def read_habit_tracking_log(
     log_id: int,
     habit_repo: HabitRepositoryDependency,
     tracking_log_repo: HabitTrackingLogRepositoryDependency,
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: models.User = Depends(get_current_active_user),
 ) -> Any:
     """
     Get a specific habit tracking log by ID.
@@ -70,40 +283,47 @@ async def read_habit_tracking_log(
     if not log:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Habit log with id {log_id} not found."
+            detail=f"Habit log with id {log_id} not found.",
         )
-    
+
     # Verify the user has permission to view this log by checking habit ownership
-    habit = await habit_repo.get_habit_by_id(habit_id=log.habit_id, user_id=current_user.id)
+    habit = await habit_repo.get_habit_by_id(
+        habit_id=log.habit_id, user_id=current_user.id
+    )
     if not habit:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to view this log."
+            detail="Not authorized to view this log.",
         )
-        
+
     return log
 
+
 @router.delete("/{log_id}", response_model=schemas.HabitTrackingLog)
 async def delete_habit_tracking_log(
     *,
     log_id: int,
     habit_repo: HabitRepositoryDependency,
     tracking_log_repo: HabitTrackingLogRepositoryDependency,
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: models.User = Depends(get_current_active_user),
 ) -> Any:
     """
     Delete a habit tracking log.
     """
     log_to_delete = await tracking_log_repo.get_tracking_log_by_id(log_id=log_id)
     if not log_to_delete:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit log not found.")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Habit log not found."
+        )
 
     # Verify the user has permission to delete this log by checking habit ownership
-    habit = await habit_repo.get_habit_by_id(habit_id=log_to_delete.habit_id, user_id=current_user.id)
+    habit = await habit_repo.get_habit_by_id(
+        habit_id=log_to_delete.habit_id, user_id=current_user.id
+    )
     if not habit:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this log."
+            detail="Not authorized to delete this log.",
         )
 
     await tracking_log_repo.delete_tracking_log(log_id=log_id)
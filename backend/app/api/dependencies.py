@@ -1,71 +1,72 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError, jwt
 from pydantic import ValidationError
 
+from app.core.auth_cache import principal_cache, token_cache
 from app.core.config import settings
-from app.crud.user import UserRepositoryDependency
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.db import SessionLocal # Assuming SessionLocal is your async session maker
+from app.crud.user import UserRepositoryDependency, UserState
+from app.db import SessionContext
+from app.db.bucketing import local_today
+from app.db.routing import bind_user, require_version
 from app.schemas import TokenData, User
 
 # This tells FastAPI where to look for the token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+
+def _decode_user_id(token: str) -> int | None:
+    """User id of a valid token, memoized until the token expires; None if invalid."""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        # Pydantic converts the 'sub' claim (str) to int; a ValidationError means it
+        # isn't one
+        token_data = TokenData(user_id=payload.get("sub"))
+    except (JWTError, ValidationError):
+        return None
+    if token_data.user_id is None:
+        return None
+    if "exp" in payload:
+        token_cache.put(token, token_data.user_id, float(payload["exp"]))
+    return token_data.user_id
+
+
 async def get_current_user(
+    session: SessionContext,
     user_repo: UserRepositoryDependency,
     token: str = Depends(oauth2_scheme),
 ) -> User:
-    """Dependency to get the current user from a JWT token."""
-    print(f"[DEBUG] Received token in get_current_user: {token[:20]}...{token[-20:] if len(token) > 40 else ''}") # Log snippet
+    """Dependency to get the current user from a JWT token.
+
+    Served from the principal cache when possible, in which case it runs no
+    query. Don't read `data_version` or `timezone` off it for anything cached
+    or compared; use get_current_user_state. The user is looked up on the
+    primary; only then may the request's reads move to the replica.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        print(f"[DEBUG] Decoded payload: {payload}")
-        user_id_from_sub: str = payload.get("sub")
-        print(f"[DEBUG] User ID from 'sub' claim (str): '{user_id_from_sub}'")
-        if user_id_from_sub is None:
-            print("[DEBUG] 'sub' claim is None. Raising credentials_exception.")
-            raise credentials_exception
-        
-        # Pydantic will attempt to convert user_id_from_sub (str) to int for TokenData.user_id.
-        # If conversion fails, a ValidationError is raised.
-        print(f"[DEBUG] Attempting to create TokenData with user_id_from_sub: '{user_id_from_sub}'")
-        token_data = TokenData(user_id=user_id_from_sub)
-        print(f"[DEBUG] TokenData created: user_id={token_data.user_id}, type={type(token_data.user_id)}")
-
-    except JWTError as exc:
-        print(f"[DEBUG] JWTError during token decoding: {exc}. Raising credentials_exception.")
-        raise credentials_exception from exc
-    except ValidationError as exc:
-        print(f"[DEBUG] ValidationError creating TokenData (user_id='{user_id_from_sub}'): {exc}. Raising credentials_exception.")
-        raise credentials_exception from exc
-    except Exception as exc: # Catch any other unexpected error during token processing
-        print(f"[DEBUG] Unexpected error during token processing: {exc}. Raising credentials_exception.")
-        raise credentials_exception from exc
-    
-    print(f"[DEBUG] Attempting to fetch user from DB with ID: {token_data.user_id} (type: {type(token_data.user_id)})")
-    user = await user_repo.get_user_by_id(user_id=token_data.user_id)
-    print(f"[DEBUG] User fetched from DB: {'User object' if user else 'None'}") # Avoid printing sensitive user data
-    if user is None:
-        print("[DEBUG] User not found in DB for ID. Raising credentials_exception.")
+    user_id = _decode_user_id(token)
+    if user_id is None:
         raise credentials_exception
-    
-    return user
 
-async def get_db_session() -> AsyncSession:
-    """Dependency to get an async database session."""
-    async with SessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        generation = principal_cache.generation()
+        user = await user_repo.get_user_by_id(user_id=user_id)
+        if user is None:
+            raise credentials_exception
+        principal = User.model_validate(user)
+        principal_cache.put(user_id, principal, generation)
+    bind_user(session, user_id)
+    return principal
 
 
 async def get_current_active_user(
@@ -75,3 +76,75 @@ async def get_current_active_user(
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+
+async def get_current_admin_user(
+    current_user: User = Depends(get_current_active_user),
+) -> User:
+    """Dependency for operator-only endpoints: the current user must be an Admin."""
+    if current_user.role is None or current_user.role.name != "Admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required"
+        )
+    return current_user
+
+
+async def get_current_user_state(
+    session: SessionContext,
+    user_repo: UserRepositoryDependency,
+    current_user: User = Depends(get_current_active_user),
+) -> UserState:
+    """The current user's data_version and timezone, read fresh from the primary once
+    per request.
+
+    The principal may come from a cache that other workers' writes don't reach;
+    ETags, response-cache keys and "today" must not lag behind a write. For the
+    same reason the rest of the request only reads from the replica if it has
+    already caught up with this data_version.
+    """
+    state = await user_repo.get_user_state(user_id=current_user.id)
+    if state is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    await require_version(session, current_user.id, state.data_version)
+    return state
+
+
+def conditional_get(vary_by_day: bool = False):
+    """Dependency factory for ETag / If-None-Match on per-user read endpoints.
+
+    The strong ETag is derived from the user's `data_version`, which every habit,
+    category and tracking-log write bumps. A matching If-None-Match is answered
+    with 304 before the endpoint body runs, so no query or serialization happens.
+    Set `vary_by_day` for responses that also depend on the user's current date.
+    """
+
+    async def dependency(
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_active_user),
+        state: UserState = Depends(get_current_user_state),
+    ) -> str:
+        tag = f"{current_user.id}.{state.data_version}"
+        if vary_by_day:
+            tag += f".{local_today(state.timezone).isoformat()}"
+        etag = f'"{tag}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = {
+                c.strip().removeprefix("W/") for c in if_none_match.split(",")
+            }
+            if etag in candidates or "*" in candidates:
+                raise HTTPException(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+                )
+
+        response.headers.update(headers)
+        return etag
+
+    return dependency
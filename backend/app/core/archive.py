@@ -0,0 +1,278 @@
+"""Tiered retention for tracking logs: daily rollups in the database, raw rows on disk.
+
+Raw logs older than LOG_RETENTION_DAYS are compacted per user:
+
+1. The user's daily rollups (and the bitmaps and streaks built from them) are
+   recomputed from the raw logs, and the local day the retention window
+   starts on is stored as `users.logs_archived_before`. From then on the
+   rollup rows before that day are kept as they are by every rebuild.
+2. The older raw rows are written, LOG_ARCHIVE_CHUNK_SIZE at a time, to
+   LOG_ARCHIVE_DIR/<user_id>/, and each chunk is deleted from the hot table
+   in its own transaction once its file is on disk.
+
+Everything analytics reads by day, week, month or year comes from the rollups,
+so its answers don't change; hourly analytics are limited to the retention
+window whether or not anything has been archived yet.
+
+An archive file is gzip-compressed JSON holding one array per column. ids and
+timestamps (UTC microseconds) are stored as differences from the previous
+row, which keeps the numbers short and repetitive for gzip.
+
+    python -m app.core.archive compact [user_id]
+    python -m app.core.archive restore <user_id>
+
+Restoring puts a user's archived rows back (skipping any already present and
+those of habits deleted since) and removes the files.
+"""
+
+import argparse
+import asyncio
+import datetime
+import gzip
+import itertools
+import json
+import logging
+import os
+import uuid
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.bulk import as_utc, owned_habit_ids
+from app.crud.heatmap import rebuild_year_bitmaps
+from app.crud.rollup import rebuild_daily_rollups, upsert_insert
+from app.crud.streak import rebuild_streaks
+from app.crud.user import bump_data_version
+from app.db import SessionLocal
+from app.db.bucketing import local_day_bounds, local_today
+from app.models.habit import HabitTrackingLog
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = 1
+ARCHIVE_COLUMNS = (
+    "id",
+    "habit_id",
+    "logged_datetime",
+    "completed",
+    "progress",
+    "client_id",
+    "created_at",
+    "updated_at",
+)
+TIMESTAMP_COLUMNS = ("logged_datetime", "created_at", "updated_at")
+DELTA_COLUMNS = ("id", *TIMESTAMP_COLUMNS)
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.UTC)
+
+
+def archive_dir(user_id: int) -> Path:
+    return Path(settings.LOG_ARCHIVE_DIR) / str(user_id)
+
+
+def _micros(moment: datetime.datetime) -> int:
+    return (as_utc(moment) - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def _deltas(values: list[int]) -> list[int]:
+    return [value - previous for previous, value in zip([0, *values], values)]
+
+
+def encode_archive(user_id: int, rows: Sequence) -> bytes:
+    """Archive file contents for rows carrying ARCHIVE_COLUMNS, oldest first."""
+    columns = {}
+    for name in ARCHIVE_COLUMNS:
+        values: list[Any] = [getattr(row, name) for row in rows]
+        if name in TIMESTAMP_COLUMNS:
+            values = [_micros(value) for value in values]
+        elif name == "completed":
+            values = [int(value) for value in values]
+        elif name == "client_id":
+            values = [str(value) if value is not None else None for value in values]
+        columns[name] = _deltas(values) if name in DELTA_COLUMNS else values
+    document = {
+        "format": ARCHIVE_FORMAT,
+        "user_id": user_id,
+        "rows": len(rows),
+        "columns": columns,
+    }
+    return gzip.compress(json.dumps(document, separators=(",", ":")).encode())
+
+
+def decode_archive(data: bytes) -> tuple[int, list[dict]]:
+    """(user_id, rows) of an archive file, each row a dict of ARCHIVE_COLUMNS."""
+    document = json.loads(gzip.decompress(data))
+    if document.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"Unsupported archive format: {document.get('format')!r}")
+    columns = document["columns"]
+    for name in DELTA_COLUMNS:
+        columns[name] = list(itertools.accumulate(columns[name]))
+    for name in TIMESTAMP_COLUMNS:
+        columns[name] = [
+            EPOCH + datetime.timedelta(microseconds=value) for value in columns[name]
+        ]
+    columns["completed"] = [bool(value) for value in columns["completed"]]
+    columns["client_id"] = [
+        uuid.UUID(value) if value is not None else None
+        for value in columns["client_id"]
+    ]
+    rows = [
+        dict(zip(ARCHIVE_COLUMNS, values))
+        for values in zip(*(columns[name] for name in ARCHIVE_COLUMNS))
+    ]
+    return document["user_id"], rows
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    # Complete and synced before it gets its real name, so a file is never partial
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".part")
+    with open(partial, "wb") as target:
+        target.write(data)
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(partial, path)
+
+
+async def compact_user_logs(
+    session: AsyncSession,
+    user_id: int,
+    timezone: str,
+    archived_before: datetime.date | None,
+    started: datetime.datetime,
+) -> int:
+    """Folds and archives one user's logs past the retention window; returns rows
+    archived.
+
+    Commits after the fold and after every chunk, so an interrupted run just
+    leaves fewer rows archived; rerunning picks up the rest.
+    """
+    cutoff_day = local_today(timezone) - datetime.timedelta(
+        days=settings.LOG_RETENTION_DAYS
+    )
+    cutoff_at, _ = local_day_bounds(cutoff_day, cutoff_day, timezone)
+    older = (
+        HabitTrackingLog.user_id == user_id,
+        HabitTrackingLog.logged_datetime < cutoff_at,
+    )
+    if not await session.scalar(select(exists().where(*older))):
+        return 0
+
+    if archived_before is None or archived_before < cutoff_day:
+        # Rollups are kept current by every write; recomputing them here makes
+        # sure they are exact before they become the only record
+        await rebuild_daily_rollups(session, user_id=user_id)
+        await rebuild_year_bitmaps(session, user_id=user_id)
+        await rebuild_streaks(session, user_id=user_id)
+        await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(logs_archived_before=cutoff_day)
+        )
+        await bump_data_version(session, user_id)
+        await session.commit()
+
+    archived = 0
+    query = (
+        select(*(getattr(HabitTrackingLog, name) for name in ARCHIVE_COLUMNS))
+        .filter(*older)
+        .order_by(HabitTrackingLog.logged_datetime, HabitTrackingLog.id)
+        .limit(settings.LOG_ARCHIVE_CHUNK_SIZE)
+    )
+    for chunk in itertools.count():
+        rows = (await session.execute(query)).all()
+        if not rows:
+            break
+        path = archive_dir(user_id) / f"{started:%Y%m%dT%H%M%S}-{chunk:05}.json.gz"
+        await asyncio.to_thread(_write_file, path, encode_archive(user_id, rows))
+        await session.execute(
+            delete(HabitTrackingLog).filter(
+                HabitTrackingLog.id.in_([row.id for row in rows])
+            )
+        )
+        # Habit lists that include logs change; analytics don't
+        await bump_data_version(session, user_id)
+        await session.commit()
+        archived += len(rows)
+    return archived
+
+
+async def restore_user_logs(session: AsyncSession, user_id: int) -> int:
+    """Puts a user's archived logs back in the hot table; returns rows restored.
+
+    The daily rollups already count these logs, so they are left as they are.
+    Each file is committed and then removed; a rerun skips rows already back.
+    """
+    restored = 0
+    for path in sorted(archive_dir(user_id).glob("*.json.gz")):
+        owner, rows = decode_archive(await asyncio.to_thread(path.read_bytes))
+        if owner != user_id:
+            raise ValueError(f"{path} belongs to user {owner}")
+        owned = await owned_habit_ids(
+            session, user_id, {row["habit_id"] for row in rows}
+        )
+        rows = [dict(row, user_id=user_id) for row in rows if row["habit_id"] in owned]
+        if rows:
+            await session.execute(
+                upsert_insert(session)(HabitTrackingLog).on_conflict_do_nothing(), rows
+            )
+            await bump_data_version(session, user_id)
+        await session.commit()
+        os.remove(path)
+        restored += len(rows)
+    await session.execute(
+        update(User).where(User.id == user_id).values(logs_archived_before=None)
+    )
+    await session.commit()
+    return restored
+
+
+async def compact_logs(user_id: int | None = None) -> int:
+    """Runs compaction for every user, or just one; returns rows archived."""
+    started = datetime.datetime.now(datetime.UTC)
+    total = 0
+    async with SessionLocal() as session:
+        query = select(User.id, User.timezone, User.logs_archived_before).order_by(
+            User.id
+        )
+        if user_id is not None:
+            query = query.filter(User.id == user_id)
+        for row in (await session.execute(query)).all():
+            archived = await compact_user_logs(
+                session, row.id, row.timezone, row.logs_archived_before, started
+            )
+            if archived:
+                logger.info(f"Archived {archived} logs of user {row.id}.")
+            total += archived
+    return total
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.core.archive",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact = commands.add_parser(
+        "compact", help="archive raw logs older than LOG_RETENTION_DAYS"
+    )
+    compact.add_argument("user_id", type=int, nargs="?")
+    restore = commands.add_parser("restore", help="put a user's archived logs back")
+    restore.add_argument("user_id", type=int)
+    args = parser.parse_args()
+    if args.command == "compact":
+        logger.info(f"Archived {await compact_logs(args.user_id)} logs in total.")
+    else:
+        async with SessionLocal() as session:
+            restored = await restore_user_logs(session, args.user_id)
+            logger.info(f"Restored {restored} logs of user {args.user_id}.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,142 @@
+"""Per-process caches that take the database out of request authentication.
+
+- TokenCache memoizes decoded access tokens until they expire, so a client
+  reusing its token skips the signature check and claim parsing.
+- PrincipalCache keeps a snapshot of each recently seen user (with role) for
+  PRINCIPAL_CACHE_TTL_SECONDS in a bounded LRU.
+
+A principal is dropped as soon as a session flushes a change to one of its
+fields, and again when that session commits. A lookup that started before
+the change can't store its stale result afterwards, because every
+invalidation bumps the cache's generation. Other worker processes only see a
+change once their entry expires, which is what the TTL bounds.
+
+`data_version` and `timezone` change with ordinary writes and key ETags and
+cached responses, so they are never taken from here; see
+`get_current_user_state` in app.api.dependencies.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User as UserModel
+from app.schemas.user import User
+
+ValueT = TypeVar("ValueT")
+
+# Changes to these reach the cached snapshot; data_version and timezone are read fresh
+PRINCIPAL_FIELDS = ("is_active", "role_id", "email", "full_name", "timezone")
+
+
+class TTLCache(Generic[ValueT]):
+    """LRU of at most `max_entries` values, each kept until its own deadline."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, ValueT]] = OrderedDict()
+
+    def get(self, key: Hashable) -> ValueT | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[0]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: ValueT, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class TokenCache:
+    """Decoded access tokens: token -> user id, until the token's `exp`."""
+
+    def __init__(self, max_entries: int):
+        self._tokens: TTLCache[int] = TTLCache(max_entries)
+
+    def get(self, token: str) -> int | None:
+        return self._tokens.get(token)
+
+    def put(self, token: str, user_id: int, expires_at: float) -> None:
+        ttl = expires_at - time.time()
+        if ttl > 0:
+            self._tokens.put(token, user_id, ttl)
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.ttl = ttl
+        self._principals: TTLCache[User] = TTLCache(max_entries)
+        # One counter for all users keeps this bounded; principals rarely change,
+        # so a lookup that loses a race with someone else's change is just a miss
+        self._generation = 0
+
+    def get(self, user_id: int) -> User | None:
+        return self._principals.get(user_id)
+
+    def generation(self) -> int:
+        """Read before loading a user; pass to `put` along with what was loaded."""
+        return self._generation
+
+    def put(self, user_id: int, principal: User, generation: int) -> None:
+        if self._generation == generation:
+            self._principals.put(user_id, principal, self.ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        self._generation += 1
+        self._principals.pop(user_id)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._principals.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES)
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed_principals(session: Session, _) -> None:
+    changed = session.info.setdefault("changed_principals", set())
+    for instance in session.dirty:
+        if isinstance(instance, UserModel):
+            state = inspect(instance)
+            if any(
+                state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS
+            ):
+                changed.add(instance.id)
+    for instance in session.deleted:
+        if isinstance(instance, UserModel):
+            changed.add(instance.id)
+    for user_id in changed:
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_principals(session: Session) -> None:
+    # Lookups between the flush and the commit still read the old row
+    for user_id in session.info.pop("changed_principals", ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_principals(session: Session) -> None:
+    session.info.pop("changed_principals", None)
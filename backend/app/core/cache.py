@@ -0,0 +1,206 @@
+"""Response cache with LRU eviction, TTL and stale-while-revalidate.
+
+Entries are never invalidated in place. Callers put the user's `data_version`
+into the key, so any write moves readers to a new key and the old entry simply
+ages out. Two backends are available:
+
+- InMemoryBackend keeps live objects in a per-process LRU.
+- SharedBackend keeps JSON in a key-value store that all workers share. Any
+  client with redis.asyncio's get/set signature plugs in, and LocalKeyValueStore
+  stands in for one when no server is configured.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, Generic, Protocol, TypeVar
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> tuple[float, Any] | None:
+        """(stored_at, value) or None."""
+        ...
+
+    async def set(self, key: str, stored_at: float, value: Any) -> None: ...
+
+
+class InMemoryBackend:
+    """Process-local LRU that drops entries older than `max_age` seconds."""
+
+    def __init__(self, max_entries: int, max_age: float):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> tuple[float, Any] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] >= self.max_age:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, stored_at: float, value: Any) -> None:
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class KeyValueStore(Protocol):
+    """The subset of redis.asyncio.Redis the shared backend relies on."""
+
+    async def get(self, name: str) -> bytes | None: ...
+
+    async def set(self, name: str, value: bytes, ex: int | None = None) -> Any: ...
+
+
+class LocalKeyValueStore:
+    """In-process stand-in for a shared store: same calls, bytes in and out, LRU."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._values: OrderedDict[str, tuple[float | None, bytes]] = OrderedDict()
+
+    async def get(self, name: str) -> bytes | None:
+        entry = self._values.get(name)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and time.time() >= expires_at:
+            del self._values[name]
+            return None
+        self._values.move_to_end(name)
+        return value
+
+    async def set(self, name: str, value: bytes, ex: int | None = None) -> None:
+        self._values[name] = (time.time() + ex if ex else None, value)
+        self._values.move_to_end(name)
+        while len(self._values) > self.max_entries:
+            self._values.popitem(last=False)
+
+
+class SharedBackend(Generic[ModelT]):
+    """Serialized entries in a KeyValueStore, which expires them after `max_age`."""
+
+    def __init__(self, store: KeyValueStore, model: type[ModelT], max_age: float):
+        self.store = store
+        self.model = model
+        self.max_age = max_age
+
+    async def get(self, key: str) -> tuple[float, ModelT] | None:
+        raw = await self.store.get(key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["stored_at"], self.model.model_validate(entry["value"])
+
+    async def set(self, key: str, stored_at: float, value: ModelT) -> None:
+        raw = json.dumps(
+            {"stored_at": stored_at, "value": value.model_dump(mode="json")}
+        )
+        await self.store.set(key, raw.encode(), ex=math.ceil(self.max_age))
+
+
+class ResponseCache(Generic[ModelT]):
+    """Serves cached responses, refreshing stale ones in the background.
+
+    Fresh entries (younger than `ttl`) are returned as-is. Stale entries (within a
+    further `stale_ttl`) are returned immediately while one background refresh per
+    key recomputes them, so a hot key never waits on a recompute. Anything older
+    is recomputed inline.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, stale_ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[ModelT]],
+        refresh: Callable[[], Awaitable[ModelT]],
+    ) -> ModelT:
+        """`compute` runs in the request; `refresh` must not use request resources."""
+        cached = await self.backend.get(key)
+        if cached is not None:
+            stored_at, value = cached
+            age = time.time() - stored_at
+            if age < self.ttl:
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._schedule_refresh(key, refresh)
+                return value
+        stored_at = time.time()
+        value = await compute()
+        await self.backend.set(key, stored_at, value)
+        return value
+
+    def _schedule_refresh(
+        self, key: str, refresh: Callable[[], Awaitable[ModelT]]
+    ) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def run() -> None:
+            try:
+                stored_at = time.time()
+                await self.backend.set(key, stored_at, await refresh())
+            except Exception:
+                logger.exception("Background refresh failed for cache key %s", key)
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)  # Keep a reference until the task finishes
+        task.add_done_callback(self._tasks.discard)
+
+
+def _shared_store() -> KeyValueStore:
+    if not settings.ANALYTICS_CACHE_URL:
+        return LocalKeyValueStore(settings.ANALYTICS_CACHE_MAX_ENTRIES)
+    try:
+        from redis import asyncio as redis_asyncio
+    except ImportError as exc:
+        raise RuntimeError(
+            "ANALYTICS_CACHE_URL requires the 'redis' package to be installed"
+        ) from exc
+    return redis_asyncio.from_url(settings.ANALYTICS_CACHE_URL)
+
+
+def build_response_cache(model: type[ModelT]) -> ResponseCache[ModelT]:
+    """Cache for `model` responses, using the backend selected in settings."""
+    max_age = (
+        settings.ANALYTICS_CACHE_TTL_SECONDS + settings.ANALYTICS_CACHE_STALE_SECONDS
+    )
+    if settings.ANALYTICS_CACHE_BACKEND == "shared":
+        backend: CacheBackend = SharedBackend(_shared_store(), model, max_age)
+    elif settings.ANALYTICS_CACHE_BACKEND == "memory":
+        backend = InMemoryBackend(settings.ANALYTICS_CACHE_MAX_ENTRIES, max_age)
+    else:
+        raise ValueError(
+            f"Unknown ANALYTICS_CACHE_BACKEND: {settings.ANALYTICS_CACHE_BACKEND!r}"
+        )
+    return ResponseCache(
+        backend,
+        settings.ANALYTICS_CACHE_TTL_SECONDS,
+        settings.ANALYTICS_CACHE_STALE_SECONDS,
+    )
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+
 class Settings(BaseSettings):
     # JWT settings
     SECRET_KEY: str  # Loaded from .env
@@ -7,9 +8,92 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Password hashing
+    BCRYPT_ROUNDS: int = (
+        12  # Stored hashes with another cost are rehashed at the next login
+    )
+    PASSWORD_HASH_WORKERS: int = 4  # Threads per process; caps concurrent bcrypt runs
+    PASSWORD_HASH_MAX_WAITING: int = (
+        64  # Further logins and signups get a 503 until the queue drains
+    )
+
+    # Authentication caches (per process)
+    TOKEN_CACHE_MAX_ENTRIES: int = (
+        10_000  # Decoded access tokens, each kept until it expires
+    )
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = (
+        30  # How long other workers may keep serving a deactivated user or old role
+    )
+
     # Database settings
     DB_CONNECTION_STRING: str
+    DB_POOL_SIZE: int = 5  # Connections kept open per worker process
+    DB_POOL_MAX_OVERFLOW: int = (
+        10  # Extra connections opened under load and closed when returned
+    )
+    DB_POOL_TIMEOUT_SECONDS: float = (
+        30  # Wait for a free connection before the request fails
+    )
+    DB_POOL_RECYCLE_SECONDS: int = (
+        1800  # Reopen older connections; -1 keeps them forever
+    )
+    DB_POOL_PRE_PING: bool = (
+        True  # Check each connection on checkout and replace dead ones
+    )
+    DB_STATEMENT_CACHE_SIZE: int = (
+        100  # Prepared statements cached per asyncpg connection
+    )
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = (
+        False  # Behind pgbouncer pool_mode=transaction: no statement cache
+    )
+    DB_REPLICA_CONNECTION_STRING: str | None = (
+        None  # Read replica for GET requests; unset reads the primary
+    )
+    DB_REPLICA_STICKY_SECONDS: int = (
+        10  # After a write, that user's reads stay on the primary this long
+    )
+    DB_REPLICA_STICKY_MAX_USERS: int = 10_000
+
+    # Analytics response cache
+    ANALYTICS_CACHE_BACKEND: str = "memory"  # "memory" (per process) or "shared"
+    ANALYTICS_CACHE_URL: str | None = (
+        None  # Redis URL for "shared"; unset uses the local stand-in
+    )
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 10_000
+    ANALYTICS_CACHE_TTL_SECONDS: int = 300
+    ANALYTICS_CACHE_STALE_SECONDS: int = (
+        600  # Extra window in which stale entries are served while refreshing
+    )
+
+    # Bulk tracking-log imports
+    IMPORT_DIR: str = (
+        "/tmp/habit-tracker-imports"  # Uploads are kept here until their job completes
+    )
+    IMPORT_CHUNK_SIZE: int = (
+        5000  # Rows per transaction; a resumed job restarts at a chunk boundary
+    )
+
+    # Offline sync
+    SYNC_TOMBSTONE_DAYS: int = (
+        90  # Deletes are kept this long; older cursors must resync in full
+    )
+
+    # Monthly tracking-log partitions (Postgres)
+    LOG_PARTITION_MONTHS_AHEAD: int = (
+        3  # Partitions created ahead of time by `python -m app.core.partitions ensure`
+    )
+
+    # Tracking-log retention
+    # Raw logs older than this are archived by `python -m app.core.archive compact`
+    LOG_RETENTION_DAYS: int = 365
+    # Must be durable; archives are the only copy of the rows
+    LOG_ARCHIVE_DIR: str = "/var/lib/habit-tracker/log-archive"
+    LOG_ARCHIVE_CHUNK_SIZE: int = (
+        5000  # Rows per archive file and per delete transaction
+    )
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
+
 settings = Settings()
@@ -0,0 +1,27 @@
+"""Opaque cursors for feeds and pagination.
+
+A cursor is URL-safe base64 of a small JSON object. Clients pass it back as is;
+its contents are not part of the API and may change.
+"""
+
+import base64
+import binascii
+import json
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Raises ValueError for anything that isn't a cursor this module produced."""
+    try:
+        payload = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(payload, dict):
+        raise ValueError("Malformed cursor")
+    return payload
@@ -0,0 +1,46 @@
+"""Chunked CSV / NDJSON encoders for streamed exports."""
+
+import csv
+import datetime
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+
+from sqlalchemy import Row
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _value(value):
+    if isinstance(value, datetime.datetime | datetime.date):
+        return value.isoformat()
+    return value
+
+
+async def encode_csv(
+    columns: Sequence[str], batches: AsyncIterator[Sequence[Row]]
+) -> AsyncIterator[bytes]:
+    """Header line, then one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_value(v) for v in row] for row in rows)
+        yield buffer.getvalue().encode()
+
+
+async def encode_ndjson(
+    columns: Sequence[str], batches: AsyncIterator[Sequence[Row]]
+) -> AsyncIterator[bytes]:
+    """One JSON object per line, one chunk per batch."""
+    async for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, (_value(v) for v in row)))) + "\n"
+            for row in rows
+        ).encode()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson}
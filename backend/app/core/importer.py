@@ -0,0 +1,229 @@
+"""Resumable bulk import of tracking logs from CSV or NDJSON uploads.
+
+The upload is kept on disk and parsed lazily, one chunk at a time. Each chunk
+is loaded in its own transaction together with its rollup deltas and the job's
+progress counters, so a crashed or failed job resumes from the last committed
+chunk. Rows whose (habit, logged time) is already stored are skipped, which
+also makes re-importing the same file harmless.
+"""
+
+import asyncio
+import csv
+import datetime
+import itertools
+import json
+import logging
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, BinaryIO, cast
+
+from pydantic import ValidationError
+from sqlalchemy import CursorResult, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.bulk import (
+    as_utc,
+    copy_tracking_logs,
+    existing_log_keys,
+    owned_habit_ids,
+    rollup_deltas,
+)
+from app.crud.heatmap import rebuild_year_bitmaps
+from app.crud.rollup import apply_rollup_deltas
+from app.crud.streak import rebuild_streaks
+from app.crud.user import bump_data_version, user_timezone
+from app.db import SessionLocal
+from app.models.import_job import ImportJob, ImportJobStatus
+from app.schemas.habit import HabitTrackingLogCreate
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def import_file_path(job_id: int, file_format: str) -> Path:
+    return Path(settings.IMPORT_DIR) / f"{job_id}.{file_format}"
+
+
+def save_upload(source: BinaryIO, job_id: int, file_format: str) -> None:
+    """Copies an upload to the job's file in fixed-size blocks."""
+    path = import_file_path(job_id, file_format)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as target:
+        shutil.copyfileobj(source, target)
+
+
+def _records(lines: Iterator[str], file_format: str) -> Iterator[dict | ValueError]:
+    """Data rows of an upload; an invalid NDJSON line comes back as its error."""
+    if file_format == "csv":
+        for record in csv.DictReader(lines):
+            # Empty CSV cells mean "not given"
+            yield {key: value for key, value in record.items() if value != ""}
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield exc
+
+
+def _parse(record: dict) -> HabitTrackingLogCreate:
+    # Accepts the export's columns (logged_datetime) as well as the API's logged_at
+    return HabitTrackingLogCreate.model_validate(record)
+
+
+def _take(records: Iterator[dict | ValueError], count: int) -> list[dict | ValueError]:
+    return list(itertools.islice(records, count))
+
+
+async def _load_chunk(
+    session: AsyncSession,
+    user_id: int,
+    timezone: str,
+    chunk: list,
+    owned: dict[int, bool],
+) -> tuple[int, int, int, str | None]:
+    """Loads one chunk; returns (inserted, skipped, failed, last error).
+
+    Does not commit.
+    """
+    parsed: list[HabitTrackingLogCreate] = []
+    failed, error = 0, None
+    for record in chunk:
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            parsed.append(_parse(record))
+        except (ValidationError, ValueError) as exc:
+            failed += 1
+            error = str(exc).splitlines()[0]
+
+    # Ownership of every habit id not seen in earlier chunks, in one lookup
+    unseen = {log.habit_id for log in parsed} - owned.keys()
+    if unseen:
+        mine = await owned_habit_ids(session, user_id, unseen)
+        owned.update({habit_id: habit_id in mine for habit_id in unseen})
+
+    rows, keys = [], set()
+    for log in parsed:
+        if not owned[log.habit_id]:
+            failed += 1
+            error = f"Habit {log.habit_id} not found or you do not have permission."
+            continue
+        logged = as_utc(log.logged_datetime)
+        if (log.habit_id, logged) in keys:
+            continue  # Duplicate within the chunk; counted as skipped below
+        keys.add((log.habit_id, logged))
+        rows.append(
+            {
+                "habit_id": log.habit_id,
+                "user_id": user_id,
+                "logged_datetime": logged,
+                "completed": log.completed,
+                "progress": log.progress,
+            }
+        )
+
+    present = await existing_log_keys(session, user_id, rows)
+    rows = [
+        row for row in rows if (row["habit_id"], row["logged_datetime"]) not in present
+    ]
+    await copy_tracking_logs(session, rows)
+    await apply_rollup_deltas(session, rollup_deltas(user_id, rows, timezone))
+    skipped = len(chunk) - failed - len(rows)
+    return len(rows), skipped, failed, error
+
+
+async def run_import_job(job_id: int) -> None:
+    """Runs a job from its last committed chunk to the end.
+
+    Progress is claimed with a compare-and-set on `rows_processed`, so if two
+    runners ever pick up the same job only one commits each chunk.
+    """
+    async with SessionLocal() as session:
+        job = await session.get(ImportJob, job_id)
+        if job is None or job.status == ImportJobStatus.COMPLETED:
+            return
+        user_id, file_format, processed = job.user_id, job.format, job.rows_processed
+        job.status = ImportJobStatus.RUNNING
+        await session.commit()
+
+        try:
+            timezone = await user_timezone(session, user_id)
+            owned: dict[int, bool] = {}
+            with open(
+                import_file_path(job_id, file_format), newline="", encoding="utf-8"
+            ) as upload:
+                records = _records(upload, file_format)
+                # File reads and parsing run off the event loop
+                await asyncio.to_thread(_take, records, processed)
+                while chunk := await asyncio.to_thread(
+                    _take, records, settings.IMPORT_CHUNK_SIZE
+                ):
+                    started = time.perf_counter()
+                    inserted, skipped, failed, error = await _load_chunk(
+                        session, user_id, timezone, chunk, owned
+                    )
+                    if inserted:
+                        await bump_data_version(session, user_id)
+                    values: dict[str, Any] = {
+                        "rows_processed": ImportJob.rows_processed + len(chunk),
+                        "rows_inserted": ImportJob.rows_inserted + inserted,
+                        "rows_skipped": ImportJob.rows_skipped + skipped,
+                        "rows_failed": ImportJob.rows_failed + failed,
+                        "elapsed_seconds": ImportJob.elapsed_seconds
+                        + (time.perf_counter() - started),
+                    }
+                    if error is not None:
+                        values["last_error"] = error
+                    claimed = cast(
+                        "CursorResult",
+                        await session.execute(
+                            update(ImportJob)
+                            .where(
+                                ImportJob.id == job_id,
+                                ImportJob.rows_processed == processed,
+                            )
+                            .values(**values)
+                        ),
+                    )
+                    if claimed.rowcount == 0:
+                        await session.rollback()
+                        logger.warning(
+                            "Import job %s is being run elsewhere; stopping", job_id
+                        )
+                        return
+                    await session.commit()
+                    processed += len(chunk)
+
+            # Bitmaps and streaks are rebuilt once from the loaded rollup
+            await rebuild_year_bitmaps(session, user_id=user_id)
+            await rebuild_streaks(session, user_id=user_id)
+            await bump_data_version(session, user_id)
+            await session.execute(
+                update(ImportJob)
+                .where(ImportJob.id == job_id)
+                .values(
+                    status=ImportJobStatus.COMPLETED,
+                    finished_at=datetime.datetime.now(datetime.UTC),
+                )
+            )
+            await session.commit()
+        except Exception as exc:
+            logger.exception("Import job %s failed", job_id)
+            await session.rollback()
+            await session.execute(
+                update(ImportJob)
+                .where(ImportJob.id == job_id)
+                .values(status=ImportJobStatus.FAILED, last_error=str(exc)[:500])
+            )
+            await session.commit()
+            return
+
+    os.remove(import_file_path(job_id, file_format))
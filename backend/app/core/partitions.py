@@ -0,0 +1,196 @@
+"""Maintenance of the monthly partitions of habit_tracking_logs (Postgres only).
+
+Partitions hold one UTC month of logged_datetime each and are named
+habit_tracking_logs_pYYYYMM; habit_tracking_logs_legacy holds everything from
+before partitioning and habit_tracking_logs_default anything no partition
+covers. Run `ensure` daily, e.g. from cron, so the coming months exist before
+logs arrive for them:
+
+    python -m app.core.partitions ensure [--months-ahead N]
+    python -m app.core.partitions list
+    python -m app.core.partitions detach 2024-01
+
+A detached partition is an ordinary table again, outside every query; archive
+or drop it as needed, or attach it back with ALTER TABLE ... ATTACH PARTITION.
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.db import engine
+
+logger = logging.getLogger(__name__)
+
+TABLE = "habit_tracking_logs"
+
+
+def add_months(day: datetime.date, months: int) -> datetime.date:
+    """First day of the month `months` after the one `day` is in."""
+    years, month = divmod(day.month - 1 + months, 12)
+    return datetime.date(day.year + years, month + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _bounds(month: datetime.date) -> tuple[datetime.datetime, datetime.datetime]:
+    start = datetime.datetime.combine(month, datetime.time(), datetime.UTC)
+    return start, datetime.datetime.combine(
+        add_months(month, 1), datetime.time(), datetime.UTC
+    )
+
+
+async def _check_partitioned(connection: AsyncConnection) -> None:
+    if connection.dialect.name != "postgresql":
+        raise SystemExit("Tracking logs are only partitioned on Postgres")
+    kind = await connection.scalar(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": TABLE},
+    )
+    if kind != "p":
+        raise SystemExit(f"{TABLE} is not partitioned yet; run alembic upgrade head")
+
+
+async def create_partition(connection: AsyncConnection, month: datetime.date) -> bool:
+    """Creates the partition for `month` unless it exists; True if it was created.
+
+    Rows for the month already caught by the default partition are moved into
+    the new one, in the same transaction. Does not commit.
+    """
+    name = partition_name(month)
+    if (
+        await connection.scalar(text("SELECT to_regclass(:name)"), {"name": name})
+        is not None
+    ):
+        return False
+    start, end = _bounds(month)
+    bounds = {"start": start, "end": end}
+    # Bound values can't be bind parameters in DDL; these are generated dates
+    values = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    stranded = await connection.scalar(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {TABLE}_default "
+            "WHERE logged_datetime >= :start AND logged_datetime < :end)"
+        ),
+        bounds,
+    )
+    if not stranded:
+        await connection.execute(
+            text(f"CREATE TABLE {name} PARTITION OF {TABLE} {values}")
+        )
+        return True
+    await connection.execute(
+        text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+    )
+    await connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {TABLE}_default "
+            "WHERE logged_datetime >= :start AND logged_datetime < :end "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    await connection.execute(
+        text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} {values}")
+    )
+    return True
+
+
+async def ensure_partitions(
+    months_ahead: int = settings.LOG_PARTITION_MONTHS_AHEAD,
+) -> list[str]:
+    """Creates any missing partitions from this month through `months_ahead` months out.
+
+    Each partition is created in its own transaction; returns the new names.
+    """
+    this_month = datetime.datetime.now(datetime.UTC).date().replace(day=1)
+    created = []
+    async with engine.connect() as connection:
+        await _check_partitioned(connection)
+        await connection.commit()
+        for months in range(months_ahead + 1):
+            month = add_months(this_month, months)
+            if await create_partition(connection, month):
+                created.append(partition_name(month))
+            await connection.commit()
+    return created
+
+
+async def list_partitions() -> list[tuple[str, str, int]]:
+    """(name, bounds, estimated rows) of every attached partition."""
+    async with engine.connect() as connection:
+        await _check_partitioned(connection)
+        result = await connection.execute(
+            text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), "
+                "greatest(c.reltuples, 0)::bigint "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+            ),
+            {"table": TABLE},
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def detach_partition(month: datetime.date) -> str:
+    """Detaches a month's partition; no rows are moved or scanned.
+
+    DETACH ... CONCURRENTLY isn't allowed next to a default partition, so this
+    briefly locks the whole table instead, giving up after a few seconds
+    rather than queueing writes behind a long transaction.
+    """
+    name = partition_name(month)
+    async with engine.connect() as connection:
+        await _check_partitioned(connection)
+        await connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+        await connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        await connection.commit()
+    return name
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.core.partitions",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser(
+        "ensure", help="create the partitions for this month and the next ones"
+    )
+    ensure.add_argument(
+        "--months-ahead", type=int, default=settings.LOG_PARTITION_MONTHS_AHEAD
+    )
+    commands.add_parser("list", help="show attached partitions")
+    detach = commands.add_parser("detach", help="detach one month's partition")
+    detach.add_argument(
+        "month",
+        type=lambda value: datetime.datetime.strptime(value, "%Y-%m").date(),
+        help="YYYY-MM",
+    )
+    args = parser.parse_args()
+    try:
+        if args.command == "ensure":
+            created = await ensure_partitions(args.months_ahead)
+            logger.info(
+                f"Created {len(created)} partitions: {', '.join(created) or '-'}"
+            )
+        elif args.command == "list":
+            for name, bounds, rows in await list_partitions():
+                print(f"{name:32} {rows:>12}  {bounds}")
+        else:
+            logger.info(f"Detached {await detach_partition(args.month)}.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
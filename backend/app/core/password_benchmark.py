@@ -0,0 +1,85 @@
+"""Event-loop latency under concurrent logins, bcrypt inline vs on the hashing pool.
+
+A probe task sleeps for a few milliseconds in a loop and records how late it
+wakes up: that lag is what every other request on the worker would see. Each
+scenario verifies `--logins` passwords concurrently, the way simultaneous
+POST /auth/login requests do, at the configured BCRYPT_ROUNDS:
+
+    python -m app.core.password_benchmark [--logins 32]
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=2 python -m app.core.password_benchmark
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+from app.core.config import settings
+from app.core.security import PasswordHasher, pwd_context
+
+PROBE_INTERVAL = 0.005
+PASSWORD = "correct horse battery staple"
+
+
+async def _probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def _scenario(name: str, login: Callable[[], Awaitable], logins: int) -> None:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    lags_ms = sorted(1000 * lag for lag in lags) or [0.0]
+    p99 = (
+        statistics.quantiles(lags_ms, n=100, method="inclusive")[98]
+        if len(lags_ms) > 1
+        else lags_ms[0]
+    )
+    print(
+        f"{name:8} {logins / elapsed:8.1f} logins/s   "
+        f"loop lag p50 {statistics.median(lags_ms):8.1f} ms   "
+        f"p99 {p99:8.1f} ms   max {lags_ms[-1]:8.1f} ms"
+    )
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.core.password_benchmark",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--logins", type=int, default=32, help="concurrent logins per scenario"
+    )
+    args = parser.parse_args()
+
+    stored = pwd_context.hash(PASSWORD)
+    hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, max_waiting=args.logins)
+    print(
+        f"bcrypt cost {settings.BCRYPT_ROUNDS}, "
+        f"{settings.PASSWORD_HASH_WORKERS} hashing threads, {args.logins} logins"
+    )
+
+    async def inline() -> None:
+        pwd_context.verify(PASSWORD, stored)
+
+    async def pooled() -> None:
+        await hasher.verify(PASSWORD, stored)
+
+    await _scenario("inline", inline, args.logins)
+    await _scenario("pool", pooled, args.logins)
+    print(f"pool metrics: {hasher.metrics()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
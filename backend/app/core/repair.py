@@ -0,0 +1,61 @@
+import logging
+from typing import TYPE_CHECKING
+
+from app.crud.heatmap import rebuild_year_bitmaps
+from app.crud.rollup import rebuild_daily_rollups
+from app.crud.streak import rebuild_streaks
+from app.crud.sync import prune_tombstones
+from app.db import SessionLocal
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_derived_state(user_id: int | None = None) -> None:
+    """Recomputes daily rollups, heatmap bitmaps and streak state from raw logs.
+
+    Normal writes keep both current; this is the backfill/repair path, e.g. after
+    a manual data fix or when the streak tables are first introduced.
+    """
+    logger.info("Rebuilding derived analytics state...")
+    session: AsyncSession | None = None
+    try:
+        session = SessionLocal()
+        await rebuild_daily_rollups(session, user_id=user_id)
+        await rebuild_year_bitmaps(session, user_id=user_id)
+        await rebuild_streaks(session, user_id=user_id)
+        await session.commit()
+    except Exception as e:
+        logger.error(f"Error rebuilding derived state: {e}")
+        if session:
+            await session.rollback()
+        raise
+    finally:
+        if session:
+            await session.close()
+    logger.info("Derived analytics state rebuilt.")
+
+
+async def prune_sync_tombstones() -> None:
+    """Drops sync tombstones older than SYNC_TOMBSTONE_DAYS; run periodically."""
+    async with SessionLocal() as session:
+        pruned = await prune_tombstones(session)
+        await session.commit()
+    logger.info(f"Pruned {pruned} sync tombstones.")
+
+
+if __name__ == "__main__":
+    # python -m app.core.repair [user_id]
+    # python -m app.core.repair prune-tombstones
+    import asyncio
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] == ["prune-tombstones"]:
+        asyncio.run(prune_sync_tombstones())
+    else:
+        asyncio.run(
+            rebuild_derived_state(int(sys.argv[1]) if len(sys.argv) > 1 else None)
+        )
@@ -0,0 +1,172 @@
+"""End-to-end check of read-replica routing, through the API.
+
+Point both connection strings at scratch databases, e.g. two SQLite files:
+
+    DB_CONNECTION_STRING=sqlite+aiosqlite:////tmp/primary.db \\
+    DB_REPLICA_CONNECTION_STRING=sqlite+aiosqlite:////tmp/replica.db \\
+        python -m app.core.replica_check
+
+or a Postgres primary and a streaming replica of it (migrated to head). The
+check registers a throwaway user, then counts which engine each request's
+statements run on:
+
+1. once the replica has caught up, GET /habits reads it;
+2. right after a write, the same user's GETs stay on the primary;
+3. once that stickiness has lapsed (as it has on another worker), a GET
+   still sees the write, because the replica is behind the user's
+   data_version or has already replicated it.
+
+With SQLite the replica file is overwritten with a copy of the primary to
+stand in for replication, and step 3 always reads the primary; never point it
+at a database you care about. Exits 1 if any step fails.
+"""
+
+import asyncio
+import sqlite3
+import sys
+import time
+import uuid
+from collections import Counter
+
+import httpx
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core.seeder import init_roles
+from app.db import SessionLocal, engine, replica_engine
+from app.db.routing import recent_writers
+from app.main import app
+from app.models import Base, User
+
+REPLICATION_TIMEOUT_SECONDS = 30
+
+
+class StatementCounter:
+    """Statements per engine ("primary" / "replica") since the last reset."""
+
+    def __init__(self):
+        self.counts: Counter[str] = Counter()
+        for name, target in (("primary", engine), ("replica", replica_engine)):
+            if target is not None:
+                event.listen(
+                    target.sync_engine, "before_cursor_execute", self._counter(name)
+                )
+
+    def _counter(self, name: str):
+        def count(*_) -> None:
+            self.counts[name] += 1
+
+        return count
+
+    def reset(self) -> None:
+        self.counts.clear()
+
+
+async def _catch_up(email: str) -> None:
+    """Makes the replica current with the primary for the check's user."""
+    if replica_engine is None:
+        raise SystemExit("Set DB_REPLICA_CONNECTION_STRING to check replica routing")
+    if engine.dialect.name == "sqlite":
+        await replica_engine.dispose()
+        source = sqlite3.connect(make_url(settings.DB_CONNECTION_STRING).database or "")
+        target = sqlite3.connect(
+            make_url(settings.DB_REPLICA_CONNECTION_STRING or "").database or ""
+        )
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+        return
+    query = select(User.data_version).filter(User.email == email)
+    async with SessionLocal() as session:
+        expected = await session.scalar(query)
+    deadline = time.monotonic() + REPLICATION_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        async with replica_engine.connect() as connection:
+            if await connection.scalar(query) == expected:
+                return
+        await asyncio.sleep(0.5)
+    raise SystemExit(
+        f"The replica didn't catch up within {REPLICATION_TIMEOUT_SECONDS}s"
+    )
+
+
+async def check() -> int:
+    """Runs the three steps, printing one line each; returns the number of failures."""
+    if engine.dialect.name == "sqlite":
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+    await init_roles()  # Startup events don't run under ASGITransport
+    statements = StatementCounter()
+    email = f"replica-check-{uuid.uuid4().hex[:12]}@example.com"
+    failures = 0
+
+    def report(step: str, passed: bool) -> None:
+        nonlocal failures
+        failures += not passed
+        print(
+            f"{'ok' if passed else 'FAIL':4}  {step:44} "
+            f"primary={statements.counts['primary']:<3} "
+            f"replica={statements.counts['replica']}"
+        )
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://check"
+    ) as client:
+        password = uuid.uuid4().hex
+        await client.post("/auth/register", json={"email": email, "password": password})
+        token = (
+            await client.post(
+                "/auth/login", data={"username": email, "password": password}
+            )
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post("/habits", json={"name": "Before"}, headers=headers)
+
+        await _catch_up(email)
+        recent_writers.clear()
+        statements.reset()
+        response = await client.get("/habits", headers=headers)
+        report(
+            "caught-up GET reads the replica",
+            response.status_code == 200 and statements.counts["replica"] > 0,
+        )
+
+        await client.post("/habits", json={"name": "After"}, headers=headers)
+        statements.reset()
+        response = await client.get("/habits", headers=headers)
+        names = {habit["name"] for habit in response.json()}
+        report(
+            "GET right after a write stays on the primary",
+            "After" in names and statements.counts["replica"] == 0,
+        )
+
+        recent_writers.clear()
+        statements.reset()
+        response = await client.get("/habits", headers=headers)
+        names = {habit["name"] for habit in response.json()}
+        behind_on_primary = (
+            engine.dialect.name != "sqlite" or statements.counts["replica"] == 1
+        )
+        report(
+            "GET after stickiness lapsed still sees it",
+            "After" in names and behind_on_primary,
+        )
+    return failures
+
+
+async def _main() -> None:
+    try:
+        failures = await check()
+    finally:
+        await engine.dispose()
+        if replica_engine is not None:
+            await replica_engine.dispose()
+    if failures:
+        print(f"{failures} step(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
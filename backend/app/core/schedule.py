@@ -0,0 +1,149 @@
+"""Habit schedule arithmetic shared by streaks and performance analytics.
+
+A habit's timeline is cut into numbered *periods*, and a period is met when its
+completions reach the period target:
+
+- DAILY: one period per day, target `target_times` (default 1).
+- WEEKLY with `days_of_week`: one period per scheduled weekday, target 1.
+- WEEKLY without days: one period per Monday-based week, target `target_times`.
+
+Weeks start on Monday everywhere, as analytics' `date_trunc('week', ...)`
+buckets do. Days are numbered from EPOCH, a Monday, so `day_number // 7` is the
+week and `day_number % 7` the position in it (0=Monday). `days_of_week` keeps
+the frontend's 0=Sunday numbering and is converted to positions on parse. The
+SQL side mirrors this with `app.db.functions.day_number`.
+"""
+
+import datetime
+import json
+
+from app.models.habit import FrequencyType
+
+EPOCH = datetime.date(1970, 1, 5)  # A Monday
+
+
+def day_number(day: datetime.date) -> int:
+    return (day - EPOCH).days
+
+
+def week_position(weekday: int) -> int:
+    """Position in the Monday-based week (0=Monday) of a 0=Sunday weekday."""
+    return (weekday + 6) % 7
+
+
+def parse_days_of_week(raw: str | None) -> list[int]:
+    """Sorted weekday numbers (0=Sunday) from either "1,3,5" or '["1","3","5"]'."""
+    if not raw:
+        return []
+    try:
+        values = json.loads(raw)
+    except ValueError:
+        values = raw.split(",")
+    if not isinstance(values, list):
+        values = [values]
+    days = set()
+    for value in values:
+        try:
+            day = int(str(value).strip())
+        except ValueError:
+            continue
+        if 0 <= day <= 6:
+            days.add(day)
+    return sorted(days)
+
+
+class HabitSchedule:
+    """Period numbering for one habit."""
+
+    def __init__(
+        self,
+        frequency_type: FrequencyType,
+        target_times: int | None,
+        days_of_week: str | None,
+    ):
+        self.frequency_type = frequency_type
+        # Scheduled days as week positions (0=Monday), in the order they occur
+        self.days = (
+            sorted(week_position(day) for day in parse_days_of_week(days_of_week))
+            if frequency_type == FrequencyType.WEEKLY
+            else []
+        )
+        if self.days:
+            self.target = 1
+        else:
+            self.target = max(target_times or 1, 1)
+
+    @classmethod
+    def for_habit(cls, habit) -> "HabitSchedule":
+        return cls(habit.frequency_type, habit.target_times, habit.days_of_week)
+
+    @property
+    def is_weekly(self) -> bool:
+        return self.frequency_type == FrequencyType.WEEKLY and not self.days
+
+    def period_of(self, day: datetime.date) -> int | None:
+        """Period a day falls in, or None if the day is not scheduled."""
+        number = day_number(day)
+        if self.frequency_type != FrequencyType.WEEKLY:
+            return number
+        if not self.days:
+            return number // 7
+        week, position = divmod(number, 7)
+        if position not in self.days:
+            return None
+        return week * len(self.days) + self.days.index(position)
+
+    def period_days(self, day: datetime.date) -> tuple[datetime.date, datetime.date]:
+        """First and last day of the period containing `day` (one day unless weekly)."""
+        if self.is_weekly:
+            start = day - datetime.timedelta(days=day_number(day) % 7)
+            return start, start + datetime.timedelta(days=6)
+        return day, day
+
+    def latest_period(self, day: datetime.date) -> int:
+        """Latest period that has started on or before `day`."""
+        number = day_number(day)
+        if self.frequency_type != FrequencyType.WEEKLY:
+            return number
+        if not self.days:
+            return number // 7
+        week, position = divmod(number, 7)
+        earlier = [d for d in self.days if d <= position]
+        if earlier:
+            return week * len(self.days) + self.days.index(earlier[-1])
+        return week * len(self.days) - 1  # Last scheduled day of the previous week
+
+
+def weekday_counts(first_day: datetime.date, last_day: datetime.date) -> list[int]:
+    """How often each week position (0=Monday) occurs in [first_day, last_day]."""
+    total = (last_day - first_day).days + 1
+    if total <= 0:
+        return [0] * 7
+    full_weeks, remainder = divmod(total, 7)
+    counts = [full_weeks] * 7
+    first_position = day_number(first_day) % 7
+    for offset in range(remainder):
+        counts[(first_position + offset) % 7] += 1
+    return counts
+
+
+def expected_occurrences(
+    schedules: list[HabitSchedule], first_day: datetime.date, last_day: datetime.date
+) -> list[float]:
+    """Expected completions for each schedule over [first_day, last_day].
+
+    The range's weekday histogram is computed once and every habit is a dot
+    product against it, so the per-habit cost is constant whatever the range.
+    Weekly targets without fixed days are prorated for partial weeks.
+    """
+    counts = weekday_counts(first_day, last_day)
+    total_days = sum(counts)
+    expected = []
+    for schedule in schedules:
+        if schedule.days:
+            expected.append(float(sum(counts[d] for d in schedule.days)))
+        elif schedule.is_weekly:
+            expected.append(schedule.target * total_days / 7)
+        else:
+            expected.append(float(schedule.target * total_days))
+    return expected
@@ -1,45 +1,162 @@
-from datetime import datetime, timedelta, timezone
-from typing import Any, Union
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from typing import Any, TypeVar
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
+T = TypeVar("T")
+
 # It's recommended to use a robust hashing algorithm like bcrypt.
 # The 'schemes' list defines the hashing algorithms to be used.
 # 'deprecated="auto"' will automatically mark older hashes for re-hashing upon verification.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min and max rounds to the configured cost also marks hashes made
+# with any other cost, so changing BCRYPT_ROUNDS rehashes users as they log in.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
 
 def get_password_hash(password: str) -> str:
-    """Hashes a password."""
+    """Hashes a password.
+
+    Blocks for the whole bcrypt run; async code uses password_hasher.
+    """
     return pwd_context.hash(password)
 
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifies a password against a hash."""
+    """Verifies a password against a hash. Blocks like get_password_hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
-def _create_token(subject: Union[str, Any], expires_delta: timedelta, token_type: str = "access") -> str:
+
+class PasswordHashingBusy(Exception):
+    """More password checks are waiting than PASSWORD_HASH_MAX_WAITING allows."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool, off the event loop.
+
+    bcrypt releases the GIL while it hashes, so threads run in parallel and the
+    event loop keeps serving other requests. At most `workers` hashes run at
+    once; the rest wait on a semaphore, where the queue is visible in the
+    metrics, and waiters that are cancelled leave without doing the work. Past
+    `max_waiting` callers are turned away with PasswordHashingBusy instead of
+    piling up.
+    """
+
+    def __init__(self, workers: int, max_waiting: int):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._slots = asyncio.Semaphore(workers)
+        self.running = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.hash_seconds = 0.0
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PasswordHashingBusy()
+        queued = time.perf_counter()
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self.wait_seconds += started - queued
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+        finally:
+            self.running -= 1
+            self._slots.release()
+            self.completed += 1
+            self.hash_seconds += time.perf_counter() - started
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """(valid, new hash); the new hash is set when the stored cost is outdated."""
+        return await self._run(
+            pwd_context.verify_and_update, plain_password, hashed_password
+        )
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(1000 * self.wait_seconds / self.completed, 2)
+            if self.completed
+            else 0.0,
+            "avg_hash_ms": round(1000 * self.hash_seconds / self.completed, 2)
+            if self.completed
+            else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_WAITING
+)
+
+
+def _create_token(
+    subject: str | Any, expires_delta: timedelta, token_type: str = "access"
+) -> str:
     """Helper function to create a token."""
-    expire = datetime.now(timezone.utc) + expires_delta
+    expire = datetime.now(UTC) + expires_delta
     to_encode = {"exp": expire, "sub": str(subject), "type": token_type}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt.encode(
+        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    )
     return encoded_jwt
 
-def create_access_token(subject: Union[str, Any]) -> str:
+
+def create_access_token(subject: str | Any) -> str:
     """Creates a JWT access token."""
     expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return _create_token(subject, expires_delta, token_type="access")
 
-def create_refresh_token(subject: Union[str, Any]) -> str:
+
+def create_refresh_token(subject: str | Any) -> str:
     """Creates a JWT refresh token."""
     expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     return _create_token(subject, expires_delta, token_type="refresh")
 
+
 def verify_token(token: str) -> dict | None:
     """Verifies a JWT token and returns its payload if valid."""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
         return payload
     except JWTError:
         return None
@@ -0,0 +1,191 @@
+"""Dense habits × buckets matrices for chart series.
+
+Bucket values come back from SQL already truncated (see `app.db.bucketing`), so
+a bucket's position on the axis is plain arithmetic from the axis start, with no
+formatting or parsing. Counts live in one flat `array` that each dataset row is
+sliced from.
+
+Long axes are thinned with LTTB (Largest-Triangle-Three-Buckets): it keeps the
+points that best preserve the visual shape of a series, so peaks survive where
+fixed-stride sampling would drop them.
+
+Run `python -m app.core.timeseries` for a microbenchmark against per-label
+string keys.
+"""
+
+import datetime
+from array import array
+from collections.abc import Hashable, Iterable, Sequence
+
+AXIS_UNITS = ("hour", "day", "week", "month")
+
+
+class TimeAxis:
+    """`length` consecutive buckets of `unit` starting at `start`.
+
+    Hour axes hold naive local datetimes; the other units hold dates, with week
+    buckets starting on Monday and month buckets on the 1st.
+    """
+
+    def __init__(
+        self, unit: str, start: datetime.date | datetime.datetime, length: int
+    ):
+        if unit not in AXIS_UNITS:
+            raise ValueError(f"Unknown axis unit: {unit!r}")
+        self.unit = unit
+        self.start = start
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def index_of(self, value: datetime.date | datetime.datetime) -> int:
+        """Position of a bucket value; may fall outside [0, length)."""
+        if self.unit == "hour":
+            if not isinstance(value, datetime.datetime) or not isinstance(
+                self.start, datetime.datetime
+            ):
+                raise TypeError("Hour axes index datetimes")
+            return int((value - self.start).total_seconds() // 3600)
+        if self.unit == "month":
+            return (value.year - self.start.year) * 12 + value.month - self.start.month
+        days = value.toordinal() - self.start.toordinal()
+        return days // 7 if self.unit == "week" else days
+
+    def bucket(self, index: int) -> datetime.date | datetime.datetime:
+        if self.unit == "hour":
+            return self.start + datetime.timedelta(hours=index)
+        if self.unit == "day":
+            return self.start + datetime.timedelta(days=index)
+        if self.unit == "week":
+            return self.start + datetime.timedelta(weeks=index)
+        year, month = divmod(self.start.month - 1 + index, 12)
+        return self.start.replace(year=self.start.year + year, month=month + 1)
+
+    def buckets(self) -> list:
+        return [self.bucket(i) for i in range(self.length)]
+
+    def labels(self, fmt: str) -> list[str]:
+        return [b.strftime(fmt) for b in self.buckets()]
+
+
+class SeriesMatrix:
+    """Counts per (row key, bucket) in a flat row-major integer array."""
+
+    def __init__(self, row_keys: Iterable[Hashable], axis: TimeAxis):
+        self.axis = axis
+        self.rows = {key: i for i, key in enumerate(row_keys)}
+        self.values = array("q", bytes(8 * len(self.rows) * len(axis)))
+
+    def add(
+        self, row_key: Hashable, bucket: datetime.date | datetime.datetime, value: int
+    ) -> None:
+        """Adds to a cell; unknown rows and buckets outside the axis are ignored."""
+        row = self.rows.get(row_key)
+        column = self.axis.index_of(bucket)
+        if row is None or not 0 <= column < len(self.axis):
+            return
+        self.values[row * len(self.axis) + column] += value
+
+    def row(self, row_key: Hashable, columns: Sequence[int] | None = None) -> list[int]:
+        """One row's counts, optionally only at the given column indexes."""
+        width = len(self.axis)
+        start = self.rows[row_key] * width
+        if columns is None:
+            return self.values[start : start + width].tolist()
+        return [self.values[start + column] for column in columns]
+
+    def column_totals(self) -> list[int]:
+        width = len(self.axis)
+        totals = [0] * width
+        for offset in range(0, len(self.values), width):
+            for column, value in enumerate(self.values[offset : offset + width]):
+                totals[column] += value
+        return totals
+
+
+def lttb_indices(values: Sequence[float], threshold: int) -> list[int]:
+    """Indexes of at most `threshold` points of `values` chosen by LTTB.
+
+    The first and last points are always kept. Series at or under the threshold
+    come back whole.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    anchor = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the triangle's third corner
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = -1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs(
+                (anchor - avg_x) * (values[j] - values[anchor])
+                - (anchor - j) * (avg_y - values[anchor])
+            )
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        anchor = best
+    selected.append(n - 1)
+    return selected
+
+
+def _benchmark(habits: int = 200, buckets: int = 365, repeat: int = 5) -> None:
+    import random
+    import timeit
+
+    axis = TimeAxis("day", datetime.date(2025, 1, 1), buckets)
+    cells = [
+        (h, axis.bucket(i), random.randint(1, 5))
+        for h in range(habits)
+        for i in range(buckets)
+        if random.random() < 0.3
+    ]
+    labels = axis.labels("%b %d")
+    year = axis.start.year
+
+    def label_parsing() -> list[list[int]]:
+        # The previous approach: one string key per cell, one strptime per habit and
+        # label
+        completions = {(h, str(day)): value for h, day, value in cells}
+        return [
+            [
+                completions.get(
+                    (
+                        h,
+                        str(
+                            datetime.datetime.strptime(
+                                f"{year} {label}", "%Y %b %d"
+                            ).date()
+                        ),
+                    ),
+                    0,
+                )
+                for label in labels
+            ]
+            for h in range(habits)
+        ]
+
+    def dense_matrix() -> list[list[int]]:
+        matrix = SeriesMatrix(range(habits), axis)
+        for h, day, value in cells:
+            matrix.add(h, day, value)
+        return [matrix.row(h) for h in range(habits)]
+
+    assert label_parsing() == dense_matrix()
+    before = min(timeit.repeat(label_parsing, number=1, repeat=repeat))
+    after = min(timeit.repeat(dense_matrix, number=1, repeat=repeat))
+    print(f"{habits} habits x {buckets} buckets, {len(cells)} non-empty cells")
+    print(f"label parsing: {before * 1000:8.1f} ms")
+    print(f"dense matrix:  {after * 1000:8.1f} ms  ({before / after:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,145 @@
+"""Set-based helpers for writing many tracking logs at once.
+
+Ownership is checked with one IN query, duplicates with one range query, and
+rows are loaded with COPY on asyncpg or a multi-row INSERT elsewhere, instead
+of a round trip and commit per log.
+"""
+
+import datetime
+from collections import defaultdict
+from collections.abc import Iterable
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.heatmap import record_day_totals
+from app.crud.rollup import apply_rollup_deltas, log_day
+from app.crud.streak import record_log_changes
+from app.models.habit import Habit, HabitTrackingLog
+
+LOG_COLUMNS = ("habit_id", "user_id", "logged_datetime", "completed", "progress")
+
+
+def as_utc(moment: datetime.datetime) -> datetime.datetime:
+    """Aware UTC datetime; naive values are taken as UTC."""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=datetime.UTC)
+    return moment.astimezone(datetime.UTC)
+
+
+async def owned_habit_ids(
+    session: AsyncSession, user_id: int, habit_ids: Iterable[int]
+) -> set[int]:
+    """The subset of `habit_ids` that belong to the user, in a single query."""
+    habit_ids = set(habit_ids)
+    if not habit_ids:
+        return set()
+    result = await session.execute(
+        select(Habit.id).filter(Habit.user_id == user_id, Habit.id.in_(habit_ids))
+    )
+    return set(result.scalars().all())
+
+
+async def existing_log_keys(
+    session: AsyncSession, user_id: int, rows: list[dict]
+) -> set[tuple[int, datetime.datetime]]:
+    """(habit_id, UTC logged_datetime) of stored logs among `rows`' habits and span."""
+    if not rows:
+        return set()
+    moments = [row["logged_datetime"] for row in rows]
+    result = await session.execute(
+        select(HabitTrackingLog.habit_id, HabitTrackingLog.logged_datetime).filter(
+            HabitTrackingLog.user_id == user_id,
+            HabitTrackingLog.habit_id.in_({row["habit_id"] for row in rows}),
+            HabitTrackingLog.logged_datetime >= min(moments),
+            HabitTrackingLog.logged_datetime <= max(moments),
+        )
+    )
+    return {(habit_id, as_utc(logged)) for habit_id, logged in result.all()}
+
+
+async def copy_tracking_logs(session: AsyncSession, rows: list[dict]) -> None:
+    """Loads rows (LOG_COLUMNS, UTC datetimes) inside the session's transaction.
+
+    Does not commit.
+    """
+    if not rows:
+        return
+    if session.get_bind().dialect.driver == "asyncpg":
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            HabitTrackingLog.__tablename__,
+            records=[tuple(row[column] for column in LOG_COLUMNS) for row in rows],
+            columns=LOG_COLUMNS,
+        )
+    else:
+        # executemany over insertmanyvalues: a few multi-row INSERTs per batch
+        await session.execute(insert(HabitTrackingLog), rows)
+
+
+def rollup_deltas(user_id: int, rows: list[dict], timezone: str) -> list[dict]:
+    """Rows folded into one rollup delta per (habit, local day)."""
+    totals: dict[tuple[int, datetime.date], list[int]] = defaultdict(lambda: [0, 0])
+    for row in rows:
+        total = totals[(row["habit_id"], log_day(row["logged_datetime"], timezone))]
+        total[0] += 1
+        total[1] += row["progress"] or 0
+    return [
+        {
+            "user_id": user_id,
+            "habit_id": habit_id,
+            "day": day,
+            "completions": completions,
+            "progress_sum": progress,
+        }
+        for (habit_id, day), (completions, progress) in totals.items()
+    ]
+
+
+async def record_logs_added(
+    session: AsyncSession, user_id: int, rows: list[dict], timezone: str
+) -> None:
+    """Brings rollups, bitmaps and streaks up to date with newly inserted logs.
+
+    Does not commit.
+    """
+    await _record_deltas(session, user_id, rollup_deltas(user_id, rows, timezone))
+
+
+async def record_logs_removed(
+    session: AsyncSession, user_id: int, rows: list[dict], timezone: str
+) -> None:
+    """Brings rollups, bitmaps and streaks up to date with deleted logs.
+
+    Does not commit.
+    """
+    deltas = [
+        {
+            **delta,
+            "completions": -delta["completions"],
+            "progress_sum": -delta["progress_sum"],
+        }
+        for delta in rollup_deltas(user_id, rows, timezone)
+    ]
+    await _record_deltas(session, user_id, deltas)
+
+
+async def _record_deltas(
+    session: AsyncSession, user_id: int, deltas: list[dict]
+) -> None:
+    # A fixed number of statements per batch: one rollup upsert, one bitmap
+    # upsert and the streak reads, however many (habit, day) pairs changed
+    totals = await apply_rollup_deltas(session, deltas)
+    changes = [
+        (delta["habit_id"], delta["day"], delta["completions"]) for delta in deltas
+    ]
+    await record_day_totals(
+        session,
+        user_id=user_id,
+        changes=[
+            (habit_id, day, totals.get((habit_id, day), 0), added)
+            for habit_id, day, added in changes
+        ],
+    )
+    await record_log_changes(session, user_id=user_id, changes=changes)
@@ -1,232 +1,540 @@
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import func, case, and_, Date, cast, select
-from datetime import datetime, timedelta, date as DDate # Alias to avoid confusion
-from typing import List, Dict, Any, Optional
 import calendar
+from collections.abc import Sequence
+from datetime import UTC, datetime, time, timedelta  # Alias to avoid confusion
+from datetime import date as DDate
+from typing import NamedTuple
+
+from sqlalchemy import Select, cast, func, literal, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.schedule import HabitSchedule, expected_occurrences
+from app.core.timeseries import SeriesMatrix, TimeAxis, lttb_indices
+from app.crud.streak import OVERALL_SCHEDULE, effective_current_streak
+from app.db.bucketing import local_now, local_trunc, trunc_date, truncate
+from app.models.habit import (  # Corrected import for HabitCategory
+    Habit,
+    HabitCategory,
+    HabitDailyRollup,
+    HabitTrackingLog,
+)
+from app.models.streak import HabitStreak, UserStreak
+from app.schemas.analytics import (
+    AnalyticsResponse,
+    CategoryDistributionData,
+    ChartDataset,
+    HabitPerformanceItem,
+    HabitProgressData,
+    PieChartDataset,
+    SummaryStats,
+)
+
+# Section tags used to tell apart the rows of the fused analytics statement
+SECTION_BUCKET = "bucket"
+SECTION_HABIT = "habit"
+SECTION_CATEGORY = "category"
+SECTION_USER = "user"
+
+# Custom ranges: label formats per granularity, and bounds on the chart size
+RANGE_LABEL_FORMATS = {
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m",
+}
+MAX_RANGE_BUCKETS = 5000  # Before downsampling; bounds the habits x buckets matrix
+DEFAULT_MAX_POINTS = 400
 
-from app.models.habit import Habit, HabitTrackingLog, HabitCategory # Corrected import for HabitCategory
-from app.schemas.analytics import SummaryStats, HabitProgressData, CategoryDistributionData, HabitPerformanceItem, ChartDataset, PieChartDataset
 
-# Helper function to determine date range based on time_period string
-def get_date_range(time_period: str, current_date: Optional[datetime] = None) -> tuple[datetime, datetime]:
+class AnalyticsWindow(NamedTuple):
+    start_date: datetime  # Aware, local to the user
+    end_date: datetime  # Aware, never later than now
+    today: DDate
+    axis: TimeAxis
+    label_format: str
+
+
+# Helper function to determine date range based on time_period string.
+# Boundaries are local to `timezone`; the returned datetimes are aware.
+def get_date_range(
+    time_period: str, current_date: datetime | None = None, timezone: str = "UTC"
+) -> tuple[datetime, datetime]:
     if current_date is None:
-        current_date = datetime.utcnow()
-    
+        current_date = local_now(timezone)
+
     end_date = current_date
 
     if time_period.lower() == "month":
-        start_date = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start_date = current_date.replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
         # To get the actual end of the month, not just 30 days back for current month view
         # end_date = (start_date + timedelta(days=calendar.monthrange(start_date.year, start_date.month)[1])) - timedelta(microseconds=1)
     elif time_period.lower() == "week":
-        start_date = (current_date - timedelta(days=current_date.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        start_date = (current_date - timedelta(days=current_date.weekday())).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
     elif time_period.lower() == "day":
         start_date = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
     elif time_period.lower() == "year":
-        start_date = current_date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    else: # Default to current month
-        start_date = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
+        start_date = current_date.replace(
+            month=1, day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+    else:  # Default to current month
+        start_date = current_date.replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+
     return start_date, end_date
 
-async def get_summary_stats(db: AsyncSession, user_id: int, time_period: str, habit_id_filter: Optional[int] = None) -> SummaryStats:
-    start_date, end_date = get_date_range(time_period)
 
-    # Base query for logs
-    log_stmt = select(func.count(HabitTrackingLog.id)).filter(
-        HabitTrackingLog.user_id == user_id,
-        HabitTrackingLog.logged_datetime >= start_date,
-        HabitTrackingLog.logged_datetime <= end_date
+def analytics_cache_key(
+    user_id: int,
+    data_version: int,
+    time_period: str,
+    habit_id_filter: int | None,
+    timezone: str = "UTC",
+    start: DDate | None = None,
+    end: DDate | None = None,
+    granularity: str | None = None,
+    max_points: int | None = None,
+) -> str:
+    """Cache key for a user's analytics view.
+
+    The data version changes on every write (a timezone change included) and the
+    period bucket (the user's local date) changes as the window and "today" move,
+    so an entry is never valid past either.
+    """
+    _, end_date = get_date_range(time_period, timezone=timezone)
+    habit_key = habit_id_filter if habit_id_filter is not None else "all"
+    points = max_points or DEFAULT_MAX_POINTS
+    view = f"{time_period.lower()}:{start}:{end}:{granularity}:{points}"
+    day = end_date.date().isoformat()
+    return f"analytics:{user_id}:v{data_version}:{view}:{habit_key}:{day}"
+
+
+def _progress_axis(time_period: str, start_date: datetime) -> tuple[TimeAxis, str]:
+    """Chart axis matching the buckets the database returns, and its label format."""
+    if time_period.lower() == "day":
+        # Local wall-clock hours, as local_trunc('hour', ...) returns them
+        return TimeAxis("hour", start_date.replace(tzinfo=None), 24), "%H:00"
+    if time_period.lower() == "year":
+        return TimeAxis("month", start_date.date(), 12), "%b"
+    # Default to month view if time_period is unrecognized
+    days_in_month = calendar.monthrange(start_date.year, start_date.month)[1]
+    return TimeAxis("day", start_date.date(), days_in_month), "%b %d"
+
+
+def resolve_window(
+    time_period: str,
+    timezone: str = "UTC",
+    start: DDate | None = None,
+    end: DDate | None = None,
+    granularity: str | None = None,
+    current_date: datetime | None = None,
+) -> AnalyticsWindow:
+    """Analytics window and chart axis for a request.
+
+    Without `start`, `end` or `granularity` this is the current Day/Week/Month/Year.
+    Otherwise it spans the inclusive local dates [start, end] (each defaulting to
+    the current period's bounds) in `granularity` buckets, a day by default.
+    Raises ValueError for an inverted range, one with too many buckets, or hourly
+    buckets older than LOG_RETENTION_DAYS, whose raw logs may be archived.
+    """
+    period_start, now = get_date_range(time_period, current_date, timezone)
+    if start is None and end is None and granularity is None:
+        axis, label_format = _progress_axis(time_period, period_start)
+        return AnalyticsWindow(period_start, now, now.date(), axis, label_format)
+
+    first_day = start or period_start.date()
+    last_day = end or now.date()
+    if first_day > last_day:
+        raise ValueError("start must be on or before end")
+    unit = granularity or "day"
+    if unit == "hour" and first_day < now.date() - timedelta(
+        days=settings.LOG_RETENTION_DAYS
+    ):
+        raise ValueError(
+            f"Hourly analytics only cover the last {settings.LOG_RETENTION_DAYS} days"
+        )
+    first = truncate(datetime.combine(first_day, time.min), unit)
+    last = truncate(datetime.combine(last_day, time(23)), unit)
+    if unit != "hour":
+        first, last = first.date(), last.date()
+    length = TimeAxis(unit, first, 1).index_of(last) + 1
+    if length > MAX_RANGE_BUCKETS:
+        raise ValueError(
+            f"Range spans {length} {unit} buckets; the limit is {MAX_RANGE_BUCKETS}"
+        )
+
+    start_date = datetime.combine(first_day, time.min, tzinfo=now.tzinfo)
+    end_date = min(datetime.combine(last_day, time.max, tzinfo=now.tzinfo), now)
+    return AnalyticsWindow(
+        start_date,
+        end_date,
+        now.date(),
+        TimeAxis(unit, first, length),
+        RANGE_LABEL_FORMATS[unit],
+    )
+
+
+def _window_buckets(
+    user_id: int, unit: str, start_date: datetime, end_date: datetime, timezone: str
+) -> Select:
+    """Per (habit, bucket) completions for the window: the one scan all sections read.
+
+    `date_group` is the start of the `unit` bucket in the user's timezone, computed
+    by the database.
+    """
+    if unit == "hour":
+        # Hourly buckets are finer than the rollup; the bucket limit keeps the raw scan
+        # bounded
+        return (
+            select(
+                HabitTrackingLog.habit_id.label("habit_id"),
+                local_trunc("hour", HabitTrackingLog.logged_datetime, timezone).label(
+                    "date_group"
+                ),
+                func.count(HabitTrackingLog.id).label("completions"),
+            )
+            .filter(
+                HabitTrackingLog.user_id == user_id,
+                HabitTrackingLog.logged_datetime >= start_date.astimezone(UTC),
+                HabitTrackingLog.logged_datetime <= end_date.astimezone(UTC),
+            )
+            .group_by("habit_id", "date_group")
+        )
+
+    # Rollup days are already local calendar days
+    if unit == "day":
+        date_group_func = HabitDailyRollup.day
+    else:
+        date_group_func = trunc_date(
+            unit, HabitDailyRollup.day
+        )  # Week or month buckets
+    return (
+        select(
+            HabitDailyRollup.habit_id.label("habit_id"),
+            date_group_func.label("date_group"),
+            func.sum(HabitDailyRollup.completions).label("completions"),
+        )
+        .filter(
+            HabitDailyRollup.user_id == user_id,
+            HabitDailyRollup.day >= start_date.date(),
+            HabitDailyRollup.day <= end_date.date(),
+        )
+        .group_by("habit_id", "date_group")
+    )
+
+
+def _analytics_statement(
+    user_id: int, window: AnalyticsWindow, habit_id_filter: int | None, timezone: str
+):
+    """One CTE-based statement returning every analytics section as tagged rows.
+
+    Columns: section, ref_id (habit or category id), date_group, name, color, value,
+    then the habit schedule and stored streak state (habit and user rows only).
+    """
+    window_buckets = _window_buckets(
+        user_id, window.axis.unit, window.start_date, window.end_date, timezone
+    ).cte("window_buckets")
+    user_habits = (
+        select(
+            Habit.id,
+            Habit.name,
+            Habit.category_id,
+            Habit.frequency_type,
+            Habit.target_times,
+            Habit.days_of_week,
+        )
+        .filter(Habit.user_id == user_id)
+        .cte("user_habits")
+    )
+    habit_totals = (
+        select(
+            window_buckets.c.habit_id,
+            func.sum(window_buckets.c.completions).label("completions"),
+        )
+        .group_by(window_buckets.c.habit_id)
+        .subquery("habit_totals")
+    )
+
+    # Every habit with its window total and streak (drives summary, datasets and
+    # performance). It goes first so the compound statement takes its column types from
+    # it.
+    habit_rows = select(
+        literal(SECTION_HABIT).label("section"),
+        user_habits.c.id.label("ref_id"),
+        cast(null(), window_buckets.c.date_group.type).label("date_group"),
+        user_habits.c.name.label("name"),
+        HabitCategory.color.label("color"),
+        func.coalesce(habit_totals.c.completions, 0).label("value"),
+        user_habits.c.frequency_type.label("frequency_type"),
+        user_habits.c.target_times.label("target_times"),
+        user_habits.c.days_of_week.label("days_of_week"),
+        HabitStreak.current_streak.label("streak"),
+        HabitStreak.last_completed_day.label("streak_day"),
+    ).select_from(
+        user_habits.outerjoin(
+            HabitCategory, HabitCategory.id == user_habits.c.category_id
+        )
+        .outerjoin(habit_totals, habit_totals.c.habit_id == user_habits.c.id)
+        .outerjoin(HabitStreak, HabitStreak.habit_id == user_habits.c.id)
     )
 
-    # Base query for habits
-    habit_stmt = select(func.count(Habit.id)).filter(Habit.user_id == user_id)
+    def typed_null(name: str):
+        # Postgres reads a bare NULL as text, which doesn't unify with date or enum
+        # columns
+        return cast(null(), habit_rows.selected_columns[name].type)
 
+    # Overall day streak state
+    user_rows = select(
+        literal(SECTION_USER),
+        UserStreak.user_id,
+        typed_null("date_group"),
+        typed_null("name"),
+        typed_null("color"),
+        literal(0),
+        typed_null("frequency_type"),
+        typed_null("target_times"),
+        typed_null("days_of_week"),
+        UserStreak.current_streak,
+        UserStreak.last_completed_day,
+    ).filter(UserStreak.user_id == user_id)
+
+    # Progress matrix cells
+    bucket_rows = select(
+        literal(SECTION_BUCKET),
+        window_buckets.c.habit_id,
+        window_buckets.c.date_group,
+        typed_null("name"),
+        typed_null("color"),
+        window_buckets.c.completions,
+        typed_null("frequency_type"),
+        typed_null("target_times"),
+        typed_null("days_of_week"),
+        typed_null("streak"),
+        typed_null("streak_day"),
+    )
     if habit_id_filter is not None:
-        log_stmt = log_stmt.filter(HabitTrackingLog.habit_id == habit_id_filter)
-        habit_stmt = habit_stmt.filter(Habit.id == habit_id_filter)
+        bucket_rows = bucket_rows.filter(window_buckets.c.habit_id == habit_id_filter)
+
+    category_rows = (
+        select(
+            literal(SECTION_CATEGORY),
+            HabitCategory.id,
+            typed_null("date_group"),
+            HabitCategory.name,
+            HabitCategory.color,
+            func.sum(window_buckets.c.completions),
+            typed_null("frequency_type"),
+            typed_null("target_times"),
+            typed_null("days_of_week"),
+            typed_null("streak"),
+            typed_null("streak_day"),
+        )
+        .select_from(
+            window_buckets.join(
+                user_habits, user_habits.c.id == window_buckets.c.habit_id
+            ).join(HabitCategory, HabitCategory.id == user_habits.c.category_id)
+        )
+        .filter(HabitCategory.user_id == user_id)
+        .group_by(HabitCategory.id, HabitCategory.name, HabitCategory.color)
+    )
+
+    return union_all(habit_rows, user_rows, bucket_rows, category_rows)
+
 
-    total_completions_result = await db.execute(log_stmt)
-    total_completions = total_completions_result.scalar_one() or 0
+def _habit_color(habit_id: int, alpha: float | None = None) -> str:
+    rgb = f"{(habit_id * 30) % 255}, {(habit_id * 50) % 255}, {(habit_id * 70) % 255}"
+    return f"rgba({rgb}, {alpha})" if alpha is not None else f"rgb({rgb})"
 
-    active_habits_result = await db.execute(habit_stmt)
-    active_habits = active_habits_result.scalar_one() or 0
-    
+
+def _build_summary_stats(
+    habit_rows: Sequence, streak_row, streak_schedule: HabitSchedule, today: DDate
+) -> SummaryStats:
+    total_completions = sum(int(r.value) for r in habit_rows)
+    active_habits = len(habit_rows)
     avg_per_habit = (total_completions / active_habits) if active_habits > 0 else 0
 
-    # Day streak is complex and needs dedicated logic, placeholder for now
-    # It would involve checking consecutive days with completed logs for specific habits or overall.
-    day_streak = 0 
+    # Stored streak state is O(1) to read; it only needs a check that the run is still
+    # alive
+    day_streak = 0
+    if streak_row is not None and streak_row.streak is not None:
+        state = UserStreak(
+            current_streak=streak_row.streak, last_completed_day=streak_row.streak_day
+        )
+        day_streak = effective_current_streak(state, streak_schedule, today)
 
     return SummaryStats(
         total_completions=total_completions,
-        day_streak=day_streak, 
+        day_streak=day_streak,
         avg_per_habit=round(avg_per_habit, 2),
-        active_habits=active_habits
+        active_habits=active_habits,
     )
 
-async def get_habit_progress_data(db: AsyncSession, user_id: int, time_period: str, habit_id_filter: Optional[int] = None) -> HabitProgressData:
-    start_date, end_date = get_date_range(time_period)
 
-    # Determine labels based on time_period
-    labels: List[str] = []
-    date_format_str = "%b %d" # Default for month/week
-    if time_period.lower() == "day":
-        labels = [(start_date + timedelta(hours=i)).strftime("%H:00") for i in range(24)]
-        date_group_func = func.strftime('%Y-%m-%d %H:00:00', HabitTrackingLog.logged_datetime)
-    elif time_period.lower() == "year":
-        labels = [DDate(start_date.year, i, 1).strftime("%b") for i in range(1, 13)]
-        date_group_func = func.strftime('%Y-%m', HabitTrackingLog.logged_datetime) # Group by month for year view
-    else: # Default to month view if time_period is unrecognized
-        days_in_month = calendar.monthrange(start_date.year, start_date.month)[1]
-        labels = [(start_date + timedelta(days=i)).strftime(date_format_str) for i in range(days_in_month)]
-        date_group_func = cast(HabitTrackingLog.logged_datetime, Date)
-
-    # Base query for logs, grouped by the determined date_group_func
-    stmt_select = select(
-        date_group_func.label("date_group"),
-        HabitTrackingLog.habit_id.label("habit_id"),
-        func.count(HabitTrackingLog.id).label("completions"),
-    ).filter(
-        HabitTrackingLog.user_id == user_id,
-        HabitTrackingLog.logged_datetime >= start_date,
-        HabitTrackingLog.logged_datetime <= end_date,
-    ).group_by("date_group", "habit_id")
-
-    # Fetch active habits for the user to iterate over for datasets
-    user_habits_stmt = select(Habit).filter(Habit.user_id == user_id)
-
-    if habit_id_filter is not None: # habit_id_filter is Optional[int]
-        stmt_select = stmt_select.filter(HabitTrackingLog.habit_id == habit_id_filter)
-        user_habits_stmt = user_habits_stmt.filter(Habit.id == habit_id_filter)
-
-    log_results_exec = await db.execute(stmt_select)
-    log_results = log_results_exec.all() # list of Row objects with date_group, habit_id, completions
-
-    user_habits_exec = await db.execute(user_habits_stmt)
-    user_habits = user_habits_exec.scalars().all() # list of Habit objects
-
-    datasets: List[ChartDataset] = []
-
-    # Prepare a map of completions for quick lookup: {(habit_id, date_group_str): completions}
-    completions_map: Dict[tuple[int, str], int] = {}
-    for res in log_results:
-        completions_map[(res.habit_id, str(res.date_group))] = res.completions
-
-    for habit_obj in user_habits:
-        data_points = []
-        for label_date_str in labels:
-            key_to_check_date_group = "" # This will be the string representation of the date group
-            # Convert label_date_str (from chart labels) to the format used in date_group (from query)
-            if time_period.lower() == "day": # Label: HH:00, Key: YYYY-MM-DD HH:00:00
-                key_to_check_date_group = f"{start_date.strftime('%Y-%m-%d')} {label_date_str}:00"
-            elif time_period.lower() == "week": # Label: Mon DD, Key: YYYY-MM-DD
-                parsed_label_date = datetime.strptime(f"{start_date.year} {label_date_str}", f"%Y {date_format_str}").date()
-                key_to_check_date_group = str(parsed_label_date)
-            elif time_period.lower() == "month": # Label: Mon DD, Key: YYYY-MM-DD
-                # Assuming labels are generated for the start_date's month
-                parsed_label_date = datetime.strptime(f"{start_date.year}-{start_date.month:02d}-{label_date_str.split(' ')[1]}", "%Y-%m-%d").date()
-                key_to_check_date_group = str(parsed_label_date)
-            elif time_period.lower() == "year": # Label: Mon (e.g. Jan, Feb), Key: YYYY-MM
-                month_num = datetime.strptime(label_date_str, "%b").month
-                key_to_check_date_group = f"{start_date.year}-{month_num:02d}"
-            else: # Default to month view, key is YYYY-MM-DD
-                parsed_label_date = datetime.strptime(f"{start_date.year} {label_date_str}", f"%Y {date_format_str}").date()
-                key_to_check_date_group = str(parsed_label_date)
-            
-            # Lookup in the prepared map
-            completions_for_habit_date = completions_map.get((habit_obj.id, key_to_check_date_group), 0)
-            data_points.append(completions_for_habit_date)
-
-        datasets.append(ChartDataset(
-            label=habit_obj.name,
-            data=data_points,
-            borderColor=f'rgb({(habit_obj.id * 30) % 255}, {(habit_obj.id * 50) % 255}, {(habit_obj.id * 70) % 255})',
-            backgroundColor=f'rgba({(habit_obj.id * 30) % 255}, {(habit_obj.id * 50) % 255}, {(habit_obj.id * 70) % 255}, 0.5)'
-        ))
-
-    return HabitProgressData(labels=labels, datasets=datasets)
-
-async def get_category_distribution_data(db: AsyncSession, user_id: int, time_period: str) -> CategoryDistributionData:
-    start_date, end_date = get_date_range(time_period)
-
-    stmt = (
-        select(
-            HabitCategory.name.label("category_name"),
-            HabitCategory.color.label("category_color"),
-            func.count(HabitTrackingLog.id).label("completions"),
-        )
-        .join(Habit, HabitCategory.id == Habit.category_id)
-        .join(HabitTrackingLog, Habit.id == HabitTrackingLog.habit_id)
-        .filter(
-            HabitCategory.user_id == user_id,
-            HabitTrackingLog.user_id == user_id,  # Ensure logs also belong to the user
-            HabitTrackingLog.logged_datetime >= start_date,
-            HabitTrackingLog.logged_datetime <= end_date
+def _build_habit_progress(
+    axis: TimeAxis,
+    label_format: str,
+    habit_rows: Sequence,
+    bucket_rows: Sequence,
+    max_points: int,
+) -> HabitProgressData:
+    # Bucket values index straight into a dense habits x buckets matrix
+    matrix = SeriesMatrix((r.ref_id for r in habit_rows), axis)
+    for res in bucket_rows:
+        matrix.add(res.ref_id, res.date_group, int(res.value))
+
+    # Long ranges keep the buckets LTTB picks on the combined series, so every
+    # dataset still lines up with the shared labels
+    columns = (
+        lttb_indices(matrix.column_totals(), max_points)
+        if len(axis) > max_points
+        else None
+    )
+    labels = axis.labels(label_format)
+    if columns is not None:
+        labels = [labels[i] for i in columns]
+
+    datasets: list[ChartDataset] = []
+    for habit_row in habit_rows:
+        data_points: list[int | float] = [*matrix.row(habit_row.ref_id, columns)]
+
+        datasets.append(
+            ChartDataset(
+                label=habit_row.name,
+                data=data_points,
+                borderColor=_habit_color(habit_row.ref_id),
+                backgroundColor=_habit_color(habit_row.ref_id, 0.5),
+            )
         )
-        .group_by(HabitCategory.name, HabitCategory.color)
+
+    return HabitProgressData(
+        labels=labels, datasets=datasets, granularity=axis.unit, total_points=len(axis)
     )
-    results_exec = await db.execute(stmt)
-    results = results_exec.all()
 
-    if not results:
-        return CategoryDistributionData(labels=[], datasets=[PieChartDataset(data=[], backgroundColor=[])])
 
-    labels = [r.category_name for r in results]
-    data = [r.completions for r in results]
+def _build_category_distribution(category_rows: Sequence) -> CategoryDistributionData:
+    if not category_rows:
+        return CategoryDistributionData(
+            labels=[], datasets=[PieChartDataset(data=[], backgroundColor=[])]
+        )
+
+    labels = [r.name for r in category_rows]
+    data: list[int | float] = [int(r.value) for r in category_rows]
     # Use category colors if available, otherwise generate defaults
     background_colors = [
-        r.category_color if r.category_color else f'rgba({(i * 60) % 255}, {(i * 90) % 255}, {(i * 120) % 255}, 0.7)' 
-        for i, r in enumerate(results)
+        r.color
+        if r.color
+        else f"rgba({(i * 60) % 255}, {(i * 90) % 255}, {(i * 120) % 255}, 0.7)"
+        for i, r in enumerate(category_rows)
     ]
-    border_colors = [bg.replace('0.7', '1') for bg in background_colors] # Make border opaque
+    border_colors = [
+        bg.replace("0.7", "1") for bg in background_colors
+    ]  # Make border opaque
 
     return CategoryDistributionData(
         labels=labels,
         datasets=[
             PieChartDataset(
-                data=data,
-                backgroundColor=background_colors,
-                borderColor=border_colors
+                data=data, backgroundColor=background_colors, borderColor=border_colors
             )
-        ]
-    )
-
-async def get_habit_performance_data(db: AsyncSession, user_id: int, time_period: str) -> List[HabitPerformanceItem]:
-    start_date, end_date = get_date_range(time_period)
-    
-    # Fetch active habits for the user, preloading category for color access
-    user_habits_stmt = select(Habit).options(selectinload(Habit.category)).filter(Habit.user_id == user_id)
-    user_habits_exec = await db.execute(user_habits_stmt)
-    user_habits = user_habits_exec.scalars().all()
-    
-    performance_items: List[HabitPerformanceItem] = []
-
-    for habit_obj in user_habits:
-        # TODO: Calculate actual performance percentage based on logs vs target/frequency
-        # This is a complex calculation depending on habit type (daily, weekly, specific target)
-        # For now, using a placeholder percentage.
-        total_logs_stmt = select(func.count(HabitTrackingLog.id)).filter(
-            HabitTrackingLog.habit_id == habit_obj.id,
-            HabitTrackingLog.user_id == user_id,
-            HabitTrackingLog.logged_datetime >= start_date,
-            HabitTrackingLog.logged_datetime <= end_date
-        )
-        total_logs_result = await db.execute(total_logs_stmt)
-        total_logs = total_logs_result.scalar_one_or_none() or 0
-        
-        # Placeholder percentage calculation (e.g., based on logs in period / (days in period * target_times_daily_equivalent))
-        # This needs significant refinement based on habit.frequency_type and habit.target_times
-        placeholder_percentage = (total_logs / 30) * 100 if time_period.lower() == "month" else (total_logs / 7) * 100 # very rough
-        placeholder_percentage = min(round(placeholder_percentage, 0), 100) # Cap at 100
+        ],
+    )
+
+
+def _habit_schedule(habit_row) -> HabitSchedule:
+    return HabitSchedule(
+        habit_row.frequency_type, habit_row.target_times, habit_row.days_of_week
+    )
+
+
+def _build_habit_performance(
+    start_date: datetime, end_date: datetime, habit_rows: Sequence
+) -> list[HabitPerformanceItem]:
+    # Completions vs. what each habit's schedule expects over the days the window has
+    # covered so far
+    expected = expected_occurrences(
+        [_habit_schedule(r) for r in habit_rows], start_date.date(), end_date.date()
+    )
+    performance_items: list[HabitPerformanceItem] = []
+
+    for habit_row, expected_count in zip(habit_rows, expected):
+        completions = int(habit_row.value)
+        percentage = (completions / expected_count) * 100 if expected_count > 0 else 0
+        percentage = min(round(percentage, 0), 100)  # Cap at 100
 
         performance_items.append(
             HabitPerformanceItem(
-                id=str(habit_obj.id),
-                name=habit_obj.name,
-                percentage=placeholder_percentage, # Placeholder
-                color=habit_obj.category.color if habit_obj.category and habit_obj.category.color else f'rgb({(habit_obj.id * 30) % 255}, {(habit_obj.id * 50) % 255}, {(habit_obj.id * 70) % 255})'
+                id=str(habit_row.ref_id),
+                name=habit_row.name,
+                percentage=percentage,
+                color=habit_row.color
+                if habit_row.color
+                else _habit_color(habit_row.ref_id),
+                completions=completions,
+                target=round(expected_count, 2),
             )
         )
     return performance_items
+
+
+async def get_analytics(
+    db: AsyncSession,
+    user_id: int,
+    time_period: str,
+    habit_id_filter: int | None = None,
+    timezone: str = "UTC",
+    start: DDate | None = None,
+    end: DDate | None = None,
+    granularity: str | None = None,
+    max_points: int | None = None,
+) -> AnalyticsResponse:
+    """Builds the whole analytics page from a single round trip.
+
+    Summary stats and progress honour `habit_id_filter`; category distribution and
+    habit performance always cover all of the user's habits. Periods and "today"
+    follow the user's `timezone`; see `resolve_window` for custom ranges.
+    """
+    window = resolve_window(time_period, timezone, start, end, granularity)
+    stmt = _analytics_statement(user_id, window, habit_id_filter, timezone)
+    rows = (await db.execute(stmt)).all()
+
+    bucket_rows = [r for r in rows if r.section == SECTION_BUCKET]
+    habit_rows = sorted(
+        (r for r in rows if r.section == SECTION_HABIT), key=lambda r: r.ref_id
+    )
+    category_rows = sorted(
+        (r for r in rows if r.section == SECTION_CATEGORY), key=lambda r: r.name
+    )
+    filtered_habit_rows = [
+        r for r in habit_rows if habit_id_filter is None or r.ref_id == habit_id_filter
+    ]
+
+    # Overall day streak, or the habit's own streak when filtered to one habit
+    if habit_id_filter is None:
+        streak_row = next((r for r in rows if r.section == SECTION_USER), None)
+        streak_schedule = OVERALL_SCHEDULE
+    else:
+        streak_row = filtered_habit_rows[0] if filtered_habit_rows else None
+        streak_schedule = (
+            _habit_schedule(streak_row) if streak_row is not None else OVERALL_SCHEDULE
+        )
+
+    return AnalyticsResponse(
+        summary_stats=_build_summary_stats(
+            filtered_habit_rows, streak_row, streak_schedule, window.today
+        ),
+        habit_progress=_build_habit_progress(
+            window.axis,
+            window.label_format,
+            filtered_habit_rows,
+            bucket_rows,
+            max_points or DEFAULT_MAX_POINTS,
+        ),
+        category_distribution=_build_category_distribution(category_rows),
+        habit_performance=_build_habit_performance(
+            window.start_date, window.end_date, habit_rows
+        ),
+    )
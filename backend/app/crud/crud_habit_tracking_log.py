@@ -1,61 +1,110 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Date as SQLDate # Added cast and SQLDate
-from typing import List, Optional
 import datetime
 
-from app.models.habit import HabitTrackingLog # Corrected import path
-from app.schemas.habit_tracking_log import HabitTrackingLogCreate, HabitTrackingLogUpdate
-from app.schemas.habit import HabitStatistics, HabitDailyStat # Added statistics schemas
+from sqlalchemy.orm import Session
 
-class CRUDHabitTrackingLog:
-    def get(self, db: Session, id: int, user_id: int) -> Optional[HabitTrackingLog]:
-        return db.query(HabitTrackingLog).filter(HabitTrackingLog.id == id, HabitTrackingLog.user_id == user_id).first()
+from app.crud.pagination import LogPosition, older_than
+from app.db.bucketing import local_today
+from app.models.habit import HabitDailyRollup, HabitTrackingLog  # Corrected import path
+from app.schemas.habit import (  # Added statistics schemas
+    HabitDailyStat,
+    HabitStatistics,
+)
+from app.schemas.habit_tracking_log import (
+    HabitTrackingLogCreate,
+    HabitTrackingLogUpdate,
+)
 
-    def get_multi_by_habit(self, db: Session, *, habit_id: int, user_id: int, skip: int = 0, limit: int = 100) -> List[HabitTrackingLog]:
+
+class CRUDHabitTrackingLog:
+    def get(self, db: Session, id: int, user_id: int) -> HabitTrackingLog | None:
         return (
             db.query(HabitTrackingLog)
-            .filter(HabitTrackingLog.habit_id == habit_id, HabitTrackingLog.user_id == user_id)
-            .order_by(HabitTrackingLog.logged_datetime.desc())
-            .offset(skip)
+            .filter(HabitTrackingLog.id == id, HabitTrackingLog.user_id == user_id)
+            .first()
+        )
+
+    def get_multi_by_habit(
+        self,
+        db: Session,
+        *,
+        habit_id: int,
+        user_id: int,
+        before: LogPosition | None = None,
+        limit: int = 100,
+    ) -> list[HabitTrackingLog]:
+        # Keyset paging: pass the last row's LogPosition as `before` for the next page
+        query = db.query(HabitTrackingLog).filter(
+            HabitTrackingLog.habit_id == habit_id, HabitTrackingLog.user_id == user_id
+        )
+        if before is not None:
+            query = query.filter(older_than(before))
+        return (
+            query.order_by(
+                HabitTrackingLog.logged_datetime.desc(), HabitTrackingLog.id.desc()
+            )
             .limit(limit)
             .all()
         )
-    
-    def get_multi_by_user(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[HabitTrackingLog]:
+
+    def get_multi_by_user(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        before: LogPosition | None = None,
+        limit: int = 100,
+    ) -> list[HabitTrackingLog]:
+        query = db.query(HabitTrackingLog).filter(HabitTrackingLog.user_id == user_id)
+        if before is not None:
+            query = query.filter(older_than(before))
         return (
-            db.query(HabitTrackingLog)
-            .filter(HabitTrackingLog.user_id == user_id)
-            .order_by(HabitTrackingLog.logged_datetime.desc())
-            .offset(skip)
+            query.order_by(
+                HabitTrackingLog.logged_datetime.desc(), HabitTrackingLog.id.desc()
+            )
             .limit(limit)
             .all()
         )
 
-    def create_with_owner(self, db: Session, *, obj_in: HabitTrackingLogCreate, user_id: int) -> HabitTrackingLog:
+    def create_with_owner(
+        self, db: Session, *, obj_in: HabitTrackingLogCreate, user_id: int
+    ) -> HabitTrackingLog:
         db_obj = HabitTrackingLog(
-            **obj_in.model_dump(exclude_unset=True), # Pydantic V2, use .dict() for V1
-            user_id=user_id
+            **obj_in.model_dump(exclude_unset=True),  # Pydantic V2, use .dict() for V1
+            user_id=user_id,
         )
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
-    def update(self, db: Session, *, db_obj: HabitTrackingLog, obj_in: HabitTrackingLogUpdate, user_id: int) -> Optional[HabitTrackingLog]:
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: HabitTrackingLog,
+        obj_in: HabitTrackingLogUpdate,
+        user_id: int,
+    ) -> HabitTrackingLog | None:
         if db_obj.user_id != user_id:
-            return None # Or raise an exception for unauthorized access
-        
-        update_data = obj_in.model_dump(exclude_unset=True) # Pydantic V2, use .dict() for V1
+            return None  # Or raise an exception for unauthorized access
+
+        update_data = obj_in.model_dump(
+            exclude_unset=True
+        )  # Pydantic V2, use .dict() for V1
         for field, value in update_data.items():
             setattr(db_obj, field, value)
-        
+
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
-    def remove(self, db: Session, *, id: int, user_id: int) -> Optional[HabitTrackingLog]:
-        obj = db.query(HabitTrackingLog).filter(HabitTrackingLog.id == id, HabitTrackingLog.user_id == user_id).first()
+    def remove(self, db: Session, *, id: int, user_id: int) -> HabitTrackingLog | None:
+        obj = (
+            db.query(HabitTrackingLog)
+            .filter(HabitTrackingLog.id == id, HabitTrackingLog.user_id == user_id)
+            .first()
+        )
         if not obj:
             return None
         db.delete(obj)
@@ -68,44 +117,48 @@ class CRUDHabitTrackingLog:
         *,
         habit_id: int,
         user_id: int,
-        days: int = 30
+        days: int = 30,
+        timezone: str = "UTC",
     ) -> HabitStatistics:
-        end_date = datetime.date.today()
-        start_date = end_date - datetime.timedelta(days=days -1) # -1 because we want to include today in the 30 days
+        end_date = local_today(timezone)
+        start_date = end_date - datetime.timedelta(
+            days=days - 1
+        )  # -1 because we want to include today in the 30 days
 
-        # Query to get daily completion counts
+        # Daily completion counts: the rollup counts log entries per local day,
+        # and still has the days whose raw logs were archived
         daily_counts_query = (
             db.query(
-                cast(HabitTrackingLog.logged_datetime, SQLDate).label("log_date"),
-                func.count(HabitTrackingLog.id).label("count")
+                HabitDailyRollup.day.label("log_date"),
+                HabitDailyRollup.completions.label("count"),
             )
             .filter(
-                HabitTrackingLog.habit_id == habit_id,
-                HabitTrackingLog.user_id == user_id,
-                cast(HabitTrackingLog.logged_datetime, SQLDate) >= start_date,
-                cast(HabitTrackingLog.logged_datetime, SQLDate) <= end_date
+                HabitDailyRollup.habit_id == habit_id,
+                HabitDailyRollup.user_id == user_id,
+                HabitDailyRollup.day >= start_date,
+                HabitDailyRollup.day <= end_date,
             )
-            .group_by(cast(HabitTrackingLog.logged_datetime, SQLDate))
-            .order_by(cast(HabitTrackingLog.logged_datetime, SQLDate))
             .all()
         )
 
         # Process results into a dictionary for easy lookup
         logs_by_date = {log.log_date: log.count for log in daily_counts_query}
 
-        daily_stats_list: List[HabitDailyStat] = []
+        daily_stats_list: list[HabitDailyStat] = []
         total_completions = 0
 
         # Generate stats for each day in the period, filling with 0 if no logs
         for i in range(days):
             current_date = start_date + datetime.timedelta(days=i)
             count_for_day = logs_by_date.get(current_date, 0)
-            daily_stats_list.append(HabitDailyStat(date=current_date, value=count_for_day))
+            daily_stats_list.append(
+                HabitDailyStat(date=current_date, value=count_for_day)
+            )
             total_completions += count_for_day
-        
+
         return HabitStatistics(
-            total_completions=total_completions,
-            daily_stats=daily_stats_list
+            total_completions=total_completions, daily_stats=daily_stats_list
         )
 
+
 habit_tracking_log = CRUDHabitTrackingLog()
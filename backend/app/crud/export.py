@@ -0,0 +1,58 @@
+from collections.abc import AsyncIterator, Sequence
+
+from sqlalchemy import Row, Select, select
+
+from app.db import SessionLocal
+from app.db.routing import use_replica
+from app.models.habit import Habit, HabitTrackingLog
+
+EXPORT_BATCH_SIZE = 2000
+EXPORT_COLUMNS = (
+    "id",
+    "habit_id",
+    "habit_name",
+    "logged_datetime",
+    "completed",
+    "progress",
+    "created_at",
+)
+
+
+def tracking_log_export_query(user_id: int, habit_id: int | None = None) -> Select:
+    """EXPORT_COLUMNS (no ORM objects) for the user's logs, or one habit's, by id."""
+    query = (
+        select(
+            HabitTrackingLog.id,
+            HabitTrackingLog.habit_id,
+            Habit.name.label("habit_name"),
+            HabitTrackingLog.logged_datetime,
+            HabitTrackingLog.completed,
+            HabitTrackingLog.progress,
+            HabitTrackingLog.created_at,
+        )
+        .join(Habit, Habit.id == HabitTrackingLog.habit_id)
+        .filter(HabitTrackingLog.user_id == user_id)
+        .order_by(HabitTrackingLog.id)
+    )
+    if habit_id is not None:
+        query = query.filter(HabitTrackingLog.habit_id == habit_id)
+    return query
+
+
+async def stream_tracking_logs(
+    user_id: int, habit_id: int | None = None, batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[Sequence[Row]]:
+    """Yields the export in batches from a server-side cursor, so memory is bounded by
+    `batch_size`.
+
+    The response streams after the request's dependencies have closed, so this
+    brings its own session.
+    """
+    query = tracking_log_export_query(user_id, habit_id).execution_options(
+        yield_per=batch_size
+    )
+    async with SessionLocal() as session:
+        use_replica(session, user_id)
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            yield rows
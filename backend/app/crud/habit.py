@@ -1,82 +1,177 @@
-from typing import Annotated, Sequence
+import base64
+import calendar
 import datetime
+from collections.abc import Sequence
+from typing import Annotated, cast
 
 from fastapi import Depends
-from sqlalchemy import select, delete, update
-from sqlalchemy.orm import selectinload
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.db import SessionContext # Assuming SessionContext is your AsyncSession
-from app.models.habit import Habit, HabitCategory, HabitTrackingLog, FrequencyType
-from app.schemas.habit import HabitStatistics # Import the statistics schema
-from app.crud import crud_habit_tracking_log as crud_htl_sync # Import the synchronous crud instance
+from sqlalchemy import CursorResult, and_, delete, func, insert, select, update
+from sqlalchemy.orm import noload, selectinload
+
+from app.core.schedule import HabitSchedule, day_number
+from app.crud import (
+    crud_habit_tracking_log as crud_htl_sync,  # Import the synchronous crud instance
+)
+from app.crud.bulk import owned_habit_ids, record_logs_added
+from app.crud.heatmap import (
+    BITMAP_BYTES,
+    delete_habit_bitmaps,
+    get_year_bitmaps,
+    record_day_total,
+)
+from app.crud.pagination import (
+    DEFAULT_PAGE_SIZE,
+    LogPosition,
+    newer_than,
+    older_than,
+    page_cursor,
+)
+from app.crud.rollup import apply_rollup_delta, log_day
+from app.crud.streak import (
+    OVERALL_SCHEDULE,
+    delete_habit_streak,
+    effective_current_streak,
+    recompute_habit_streak,
+    recompute_user_streak,
+    record_log_change,
+)
+from app.crud.sync import add_tombstones
+from app.crud.user import bump_data_version, user_timezone
+from app.db import SessionContext  # Assuming SessionContext is your AsyncSession
+from app.db.bucketing import local_today
+from app.models.habit import (
+    FrequencyType,
+    Habit,
+    HabitCategory,
+    HabitDailyRollup,
+    HabitTrackingLog,
+)
+from app.models.streak import HabitStreak, UserStreak
+from app.schemas.habit import (  # Import the statistics schema
+    HabitHeatmap,
+    HabitStatistics,
+    HabitStreakInfo,
+    HabitSummary,
+    StreakInfo,
+    StreakOverview,
+    YearHeatmap,
+)
+from app.schemas.habit import HabitTrackingLog as HabitTrackingLogSchema
+
 # We will define Pydantic schemas for create/update operations later
 # from app.schemas.habit import HabitCreate, HabitUpdate, HabitCategoryCreate, HabitCategoryUpdate, HabitTrackingLogCreate, HabitTrackingLogUpdate
 
+
 # --- HabitCategory CRUD --- #
 class HabitCategoryRepository:
     def __init__(self, session: SessionContext):
         self.session = session
 
-    async def create_habit_category(self, user_id: int, name: str, color: str | None = None) -> HabitCategory:
+    async def create_habit_category(
+        self, user_id: int, name: str, color: str | None = None
+    ) -> HabitCategory:
         db_category = HabitCategory(user_id=user_id, name=name, color=color)
         self.session.add(db_category)
-        await self.session.commit()
+        await bump_data_version(self.session, user_id)
+        await self.session.flush()
         await self.session.refresh(db_category)
         return db_category
 
-    async def get_habit_category_by_id(self, category_id: int, user_id: int) -> HabitCategory | None:
-        query = select(HabitCategory).filter(HabitCategory.id == category_id, HabitCategory.user_id == user_id)
+    async def get_habit_category_by_id(
+        self, category_id: int, user_id: int
+    ) -> HabitCategory | None:
+        query = select(HabitCategory).filter(
+            HabitCategory.id == category_id, HabitCategory.user_id == user_id
+        )
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
-    async def get_habit_categories_by_user_id(self, user_id: int) -> Sequence[HabitCategory]:
-        query = select(HabitCategory).filter(HabitCategory.user_id == user_id).order_by(HabitCategory.name)
+    async def get_habit_categories_by_user_id(
+        self, user_id: int
+    ) -> Sequence[HabitCategory]:
+        query = (
+            select(HabitCategory)
+            .filter(HabitCategory.user_id == user_id)
+            .order_by(HabitCategory.name)
+        )
         result = await self.session.execute(query)
         return result.scalars().all()
-    
-    async def get_habit_category_by_name(self, user_id: int, name: str) -> HabitCategory | None:
-        query = select(HabitCategory).filter(HabitCategory.user_id == user_id, HabitCategory.name == name)
+
+    async def get_habit_category_by_name(
+        self, user_id: int, name: str
+    ) -> HabitCategory | None:
+        query = select(HabitCategory).filter(
+            HabitCategory.user_id == user_id, HabitCategory.name == name
+        )
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
-    async def update_habit_category(self, category_id: int, user_id: int, name: str | None = None, color: str | None = None) -> HabitCategory | None:
-        category = await self.get_habit_category_by_id(category_id=category_id, user_id=user_id)
+    async def update_habit_category(
+        self,
+        category_id: int,
+        user_id: int,
+        name: str | None = None,
+        color: str | None = None,
+    ) -> HabitCategory | None:
+        category = await self.get_habit_category_by_id(
+            category_id=category_id, user_id=user_id
+        )
         if not category:
             return None
         if name is not None:
             category.name = name
-        if icon is not None:
-            category.icon = icon
-        await self.session.commit()
+        if color is not None:
+            category.color = color
+        await bump_data_version(self.session, user_id)
+        await self.session.flush()
         await self.session.refresh(category)
         return category
 
     async def delete_habit_category(self, category_id: int, user_id: int) -> bool:
-        query = delete(HabitCategory).filter(HabitCategory.id == category_id, HabitCategory.user_id == user_id)
-        result = await self.session.execute(query)
-        await self.session.commit()
+        query = delete(HabitCategory).filter(
+            HabitCategory.id == category_id, HabitCategory.user_id == user_id
+        )
+        result = cast("CursorResult", await self.session.execute(query))
+        if result.rowcount > 0:
+            await add_tombstones(self.session, user_id, "category", [category_id])
+            await bump_data_version(self.session, user_id)
+        await self.session.flush()
         return result.rowcount > 0
 
+
 # --- Habit CRUD --- #
 class HabitRepository:
     def __init__(self, session: SessionContext):
         self.session = session
 
-    async def create_habit(self, user_id: int, name: str, icon: str | None = None, 
-                           frequency_type: FrequencyType = FrequencyType.DAILY, 
-                           target_times: int | None = None, # Updated
-                           days_of_week: str | None = None, # Added
-                           times_of_day: str | None = None, # Added
-                           reminder_on: bool = False, # Updated
-                           streak_goal: int | None = None, category_id: int | None = None) -> Habit:
+    async def create_habit(
+        self,
+        user_id: int,
+        name: str,
+        icon: str | None = None,
+        frequency_type: FrequencyType = FrequencyType.DAILY,
+        target_times: int | None = None,  # Updated
+        days_of_week: str | None = None,  # Added
+        times_of_day: str | None = None,  # Added
+        reminder_on: bool = False,  # Updated
+        streak_goal: int | None = None,
+        category_id: int | None = None,
+    ) -> Habit:
         db_habit = Habit(
-            user_id=user_id, name=name, icon=icon, frequency_type=frequency_type,
-            target_times=target_times, days_of_week=days_of_week, times_of_day=times_of_day, 
-            reminder_on=reminder_on, streak_goal=streak_goal, category_id=category_id
+            user_id=user_id,
+            name=name,
+            icon=icon,
+            frequency_type=frequency_type,
+            target_times=target_times,
+            days_of_week=days_of_week,
+            times_of_day=times_of_day,
+            reminder_on=reminder_on,
+            streak_goal=streak_goal,
+            category_id=category_id,
         )
         self.session.add(db_habit)
-        await self.session.commit()
+        await bump_data_version(self.session, user_id)
+        await self.session.flush()
         await self.session.refresh(db_habit)
         return db_habit
 
@@ -85,7 +180,18 @@ class HabitRepository:
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
-    async def get_habits_by_user_id(self, user_id: int, category_id: int | None = None) -> Sequence[Habit]:
+    async def user_owns_habit(self, habit_id: int, user_id: int) -> bool:
+        # Column-only check; loading the Habit would also load its logs
+        query = select(Habit.id).filter(Habit.id == habit_id, Habit.user_id == user_id)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none() is not None
+
+    async def owned_habit_ids(self, habit_ids: set[int], user_id: int) -> set[int]:
+        return await owned_habit_ids(self.session, user_id, habit_ids)
+
+    async def get_habits_by_user_id(
+        self, user_id: int, category_id: int | None = None
+    ) -> Sequence[Habit]:
         query = (
             select(Habit)
             .options(selectinload(Habit.tracking_logs), selectinload(Habit.category))
@@ -97,115 +203,475 @@ class HabitRepository:
         result = await self.session.execute(query)
         return result.scalars().unique().all()
 
-    async def update_habit(self, habit_id: int, user_id: int, values_to_update: dict) -> Habit | None:
+    async def get_habit_summaries(
+        self, user_id: int, today: datetime.date, include_logs: bool = False
+    ) -> list[HabitSummary]:
+        """The user's habits with log summaries, in one query over habits and this
+        week's rollup.
+
+        Every habit's current period (a day, or a Monday-based week) lies within
+        the week containing `today`, so each habit joins at most seven rollup rows.
+        `last_logged_at` is a max() per habit answered from the (habit_id,
+        logged_datetime) index. Logs are loaded only with `include_logs`.
+        """
+        week_start = today - datetime.timedelta(days=day_number(today) % 7)
+        last_logged_at = (
+            select(func.max(HabitTrackingLog.logged_datetime))
+            .filter(HabitTrackingLog.habit_id == Habit.id)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                Habit,
+                last_logged_at.label("last_logged_at"),
+                HabitDailyRollup.day,
+                HabitDailyRollup.completions,
+            )
+            .outerjoin(
+                HabitDailyRollup,
+                and_(
+                    HabitDailyRollup.user_id == user_id,
+                    HabitDailyRollup.habit_id == Habit.id,
+                    HabitDailyRollup.day >= week_start,
+                    HabitDailyRollup.day <= week_start + datetime.timedelta(days=6),
+                ),
+            )
+            .options(
+                selectinload(Habit.tracking_logs)
+                if include_logs
+                else noload(Habit.tracking_logs)
+            )
+            .filter(Habit.user_id == user_id)
+            .order_by(Habit.name, Habit.id)
+        )
+        rows = (await self.session.execute(query)).all()
+
+        habits: dict[
+            int, tuple[Habit, datetime.datetime | None, dict[datetime.date, int]]
+        ] = {}
+        for habit, last_logged, day, completions in rows:
+            _, _, days = habits.setdefault(habit.id, (habit, last_logged, {}))
+            if day is not None:
+                days[day] = completions
+
+        summaries = []
+        for habit, last_logged, days in habits.values():
+            first_day, last_day = HabitSchedule.for_habit(habit).period_days(today)
+            summaries.append(
+                HabitSummary.model_validate(habit).model_copy(
+                    update={
+                        "last_logged_at": last_logged,
+                        "today_count": days.get(today, 0),
+                        "current_period_completions": sum(
+                            n for day, n in days.items() if first_day <= day <= last_day
+                        ),
+                        "tracking_logs": habit.tracking_logs if include_logs else None,
+                    }
+                )
+            )
+        return summaries
+
+    async def update_habit(
+        self, habit_id: int, user_id: int, values_to_update: dict
+    ) -> Habit | None:
         # Ensure user_id is not in values_to_update to prevent changing ownership
-        values_to_update.pop('user_id', None) 
+        values_to_update.pop("user_id", None)
         if not values_to_update:
             # If nothing to update, fetch and return the habit
             return await self.get_habit_by_id(habit_id=habit_id, user_id=user_id)
-            
-        stmt = update(Habit).where(Habit.id == habit_id, Habit.user_id == user_id).values(**values_to_update).returning(Habit)
+
+        stmt = (
+            update(Habit)
+            .where(Habit.id == habit_id, Habit.user_id == user_id)
+            .values(**values_to_update)
+            .returning(Habit)
+        )
         result = await self.session.execute(stmt)
-        await self.session.commit()
-        return result.scalar_one_or_none()
+        habit = result.scalar_one_or_none()
+        # A new schedule renumbers periods, so the streak must be recomputed
+        if habit and values_to_update.keys() & {
+            "frequency_type",
+            "target_times",
+            "days_of_week",
+        }:
+            await recompute_habit_streak(self.session, habit_id)
+        if habit:
+            await bump_data_version(self.session, user_id)
+        await self.session.flush()
+        return habit
 
     async def delete_habit(self, habit_id: int, user_id: int) -> bool:
         # First, delete all tracking logs associated with this habit and user
-        delete_logs_query = delete(HabitTrackingLog).filter(
+        delete_logs_query = delete(
+            HabitTrackingLog
+        ).filter(
             HabitTrackingLog.habit_id == habit_id,
-            HabitTrackingLog.user_id == user_id  # Ensure user owns the logs via habit's user_id implicitly or directly if log has user_id
+            HabitTrackingLog.user_id
+            # Ensure user owns the logs via habit's user_id implicitly or directly if
+            # log has user_id
+            == user_id,
         )
         await self.session.execute(delete_logs_query)
-        # It's generally good to commit this separately or ensure the transactionality covers both, 
+        await self.session.execute(
+            delete(HabitDailyRollup).filter(
+                HabitDailyRollup.habit_id == habit_id,
+                HabitDailyRollup.user_id == user_id,
+            )
+        )
+        # It's generally good to commit this separately or ensure the transactionality covers both,
         # but for simplicity here, we'll let the habit deletion commit handle both if it's part of the same transaction scope.
         # However, if the habit deletion fails after logs are deleted, logs would remain deleted.
         # For robust transaction, consider a single commit after both operations if possible or handle rollbacks.
 
         # Then, delete the habit itself
-        delete_habit_query = delete(Habit).filter(Habit.id == habit_id, Habit.user_id == user_id)
-        result = await self.session.execute(delete_habit_query)
-        await self.session.commit() # Commit after both operations
+        await delete_habit_streak(self.session, habit_id)
+        await delete_habit_bitmaps(self.session, habit_id)
+        delete_habit_query = delete(Habit).filter(
+            Habit.id == habit_id, Habit.user_id == user_id
+        )
+        result = cast("CursorResult", await self.session.execute(delete_habit_query))
+        if result.rowcount > 0:
+            await add_tombstones(self.session, user_id, "habit", [habit_id])
+        await recompute_user_streak(self.session, user_id)
+        await bump_data_version(self.session, user_id)
+        await self.session.flush()  # Flush after both operations
         return result.rowcount > 0
 
+
 # --- HabitTrackingLog CRUD --- #
 class HabitTrackingLogRepository:
     def __init__(self, session: SessionContext):
         self.session = session
 
-    async def create_tracking_log(self, habit_id: int, user_id: int, logged_datetime: datetime.datetime,
-                                  completed: bool = False, progress: int | None = None) -> HabitTrackingLog:
+    async def create_tracking_log(
+        self,
+        habit_id: int,
+        user_id: int,
+        logged_datetime: datetime.datetime,
+        completed: bool = False,
+        progress: int | None = None,
+    ) -> HabitTrackingLog:
         db_log = HabitTrackingLog(
             habit_id=habit_id,
             user_id=user_id,
             logged_datetime=logged_datetime,
             completed=completed,
-            progress=progress
+            progress=progress,
         )
         self.session.add(db_log)
-        await self.session.commit()
+        day = log_day(logged_datetime, await user_timezone(self.session, user_id))
+        total = await apply_rollup_delta(
+            self.session,
+            user_id=user_id,
+            habit_id=habit_id,
+            day=day,
+            completions=1,
+            progress=progress or 0,
+        )
+        await record_day_total(
+            self.session,
+            user_id=user_id,
+            habit_id=habit_id,
+            day=day,
+            total=total,
+            delta=1,
+        )
+        await record_log_change(
+            self.session, user_id=user_id, habit_id=habit_id, day=day, delta=1
+        )
+        await bump_data_version(self.session, user_id)
+        await self.session.flush()
         await self.session.refresh(db_log)
         return db_log
 
+    async def create_tracking_logs(
+        self, user_id: int, logs: list[dict]
+    ) -> list[HabitTrackingLogSchema]:
+        """Inserts many logs with one multi-row INSERT ... RETURNING and flushes once.
+
+        Each dict has habit_id, logged_datetime, completed and progress; ownership
+        is checked by the caller. Logs come back in the order given, built from the
+        returned rows, so no instances are left in the session.
+        """
+        rows = [{**log, "user_id": user_id} for log in logs]
+        result = await self.session.execute(
+            insert(HabitTrackingLog).returning(
+                *HabitTrackingLog.__table__.columns, sort_by_parameter_order=True
+            ),
+            rows,
+        )
+        created = [HabitTrackingLogSchema.model_validate(row) for row in result]
+        await record_logs_added(
+            self.session, user_id, rows, await user_timezone(self.session, user_id)
+        )
+        await bump_data_version(self.session, user_id)
+        await self.session.flush()
+        return created
+
     async def get_tracking_log_by_id(self, log_id: int) -> HabitTrackingLog | None:
         # Add user_id check via join with Habit if logs are user-specific
         query = select(HabitTrackingLog).filter(HabitTrackingLog.id == log_id)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
-    async def get_tracking_logs_by_habit_id(self, habit_id: int, 
-                                            start_date: datetime.date | None = None, 
-                                            end_date: datetime.date | None = None) -> Sequence[HabitTrackingLog]:
+    async def get_tracking_logs_by_habit_id(
+        self,
+        habit_id: int,
+        start_date: datetime.date | None = None,
+        end_date: datetime.date | None = None,
+    ) -> Sequence[HabitTrackingLog]:
         query = select(HabitTrackingLog).filter(HabitTrackingLog.habit_id == habit_id)
         if start_date:
-            query = query.filter(HabitTrackingLog.logged_datetime >= datetime.datetime.combine(start_date, datetime.time.min))
+            query = query.filter(
+                HabitTrackingLog.logged_datetime
+                >= datetime.datetime.combine(start_date, datetime.time.min)
+            )
         if end_date:
-            query = query.filter(HabitTrackingLog.logged_datetime <= datetime.datetime.combine(end_date, datetime.time.max))
+            query = query.filter(
+                HabitTrackingLog.logged_datetime
+                <= datetime.datetime.combine(end_date, datetime.time.max)
+            )
         query = query.order_by(HabitTrackingLog.logged_datetime.desc())
         result = await self.session.execute(query)
         return result.scalars().all()
 
-    async def update_tracking_log(self, log_id: int, completed: bool | None = None, progress: int | None = None) -> HabitTrackingLog | None:
+    async def get_tracking_log_page(
+        self,
+        user_id: int,
+        habit_id: int | None = None,
+        position: LogPosition | None = None,
+        direction: str = "older",
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> dict:
+        """One page of a user's logs (or one habit's), newest first, with next/prev
+        cursors.
+
+        `position` and `direction` come from a cursor; without them this is the newest
+        page. One extra row is read to tell whether the page has a further neighbour.
+        Raises ValueError for a "newer" page without a position.
+        """
+        query = (
+            select(HabitTrackingLog)
+            .options(noload(HabitTrackingLog.habit))
+            .filter(HabitTrackingLog.user_id == user_id)
+        )
+        if habit_id is not None:
+            query = query.filter(HabitTrackingLog.habit_id == habit_id)
+        if direction == "newer":
+            if position is None:
+                raise ValueError("A newer page needs a position")
+            query = query.filter(newer_than(position)).order_by(
+                HabitTrackingLog.logged_datetime, HabitTrackingLog.id
+            )
+        else:
+            if position is not None:
+                query = query.filter(older_than(position))
+            query = query.order_by(
+                HabitTrackingLog.logged_datetime.desc(), HabitTrackingLog.id.desc()
+            )
+        rows = (await self.session.scalars(query.limit(limit + 1))).all()
+        more, items = len(rows) > limit, list(rows[:limit])
+        if direction == "newer":
+            items.reverse()
+
+        first = (
+            LogPosition(items[0].logged_datetime, items[0].id) if items else position
+        )
+        last = (
+            LogPosition(items[-1].logged_datetime, items[-1].id) if items else position
+        )
+        # Rows lie beyond the far edge when the extra row turned up, and behind
+        # the near edge whenever we got here from a cursor
+        has_older = more if direction == "older" else True
+        has_newer = more if direction == "newer" else position is not None
+        return {
+            "items": items,
+            "next_cursor": page_cursor(last, "older")
+            if has_older and last is not None
+            else None,
+            "prev_cursor": page_cursor(first, "newer")
+            if has_newer and first is not None
+            else None,
+        }
+
+    async def update_tracking_log(
+        self, log_id: int, completed: bool | None = None, progress: int | None = None
+    ) -> HabitTrackingLog | None:
         log_entry = await self.get_tracking_log_by_id(log_id=log_id)
         if not log_entry:
             return None
         if completed is not None:
             log_entry.completed = completed
         if progress is not None:
+            progress_delta = progress - (log_entry.progress or 0)
             log_entry.progress = progress
-        await self.session.commit()
+            if progress_delta:
+                await apply_rollup_delta(
+                    self.session,
+                    user_id=log_entry.user_id,
+                    habit_id=log_entry.habit_id,
+                    day=log_day(
+                        log_entry.logged_datetime,
+                        await user_timezone(self.session, log_entry.user_id),
+                    ),
+                    completions=0,
+                    progress=progress_delta,
+                )
+        await bump_data_version(self.session, log_entry.user_id)
+        await self.session.flush()
         await self.session.refresh(log_entry)
         return log_entry
 
     async def delete_tracking_log(self, log_id: int) -> bool:
-        query = delete(HabitTrackingLog).filter(HabitTrackingLog.id == log_id)
-        result = await self.session.execute(query)
-        await self.session.commit()
-        return result.rowcount > 0
+        query = (
+            delete(HabitTrackingLog)
+            .filter(HabitTrackingLog.id == log_id)
+            .returning(
+                HabitTrackingLog.user_id,
+                HabitTrackingLog.habit_id,
+                HabitTrackingLog.logged_datetime,
+                HabitTrackingLog.progress,
+                HabitTrackingLog.client_id,
+            )
+        )
+        deleted = (await self.session.execute(query)).one_or_none()
+        if deleted is not None:
+            await add_tombstones(
+                self.session, deleted.user_id, "log", [log_id], [deleted.client_id]
+            )
+            day = log_day(
+                deleted.logged_datetime,
+                await user_timezone(self.session, deleted.user_id),
+            )
+            total = await apply_rollup_delta(
+                self.session,
+                user_id=deleted.user_id,
+                habit_id=deleted.habit_id,
+                day=day,
+                completions=-1,
+                progress=-(deleted.progress or 0),
+            )
+            await record_day_total(
+                self.session,
+                user_id=deleted.user_id,
+                habit_id=deleted.habit_id,
+                day=day,
+                total=total,
+                delta=-1,
+            )
+            await record_log_change(
+                self.session,
+                user_id=deleted.user_id,
+                habit_id=deleted.habit_id,
+                day=day,
+                delta=-1,
+            )
+            await bump_data_version(self.session, deleted.user_id)
+        await self.session.flush()
+        return deleted is not None
 
     async def get_habit_statistics(
         self,
         habit_id: int,
-        user_id: int, # Ensure user_id is used for authorization checks before calling this
-        days: int = 30
+        # Ensure user_id is used for authorization checks before calling this
+        user_id: int,
+        days: int = 30,
     ) -> HabitStatistics:
         # This method calls the synchronous CRUD function using run_sync
         # The actual database query logic is in crud_habit_tracking_log.py
-        
+
+        timezone = await user_timezone(self.session, user_id)
+
         # Define a synchronous function to be run by run_sync
         def _get_stats_sync(sync_session):
             # Note: We are accessing habit_tracking_log attribute from the imported crud_htl_sync module
             return crud_htl_sync.habit_tracking_log.get_statistics_by_habit(
                 db=sync_session,
                 habit_id=habit_id,
-                user_id=user_id, # Passed for the sync function's logic
-                days=days
+                user_id=user_id,  # Passed for the sync function's logic
+                days=days,
+                timezone=timezone,
             )
-        
+
         # Execute the synchronous function in a way that's compatible with AsyncSession
         statistics_data = await self.session.run_sync(_get_stats_sync)
         return statistics_data
 
+    async def get_streak_overview(
+        self, user_id: int, today: datetime.date | None = None
+    ) -> StreakOverview:
+        # Reads stored streak state only; no log history is scanned
+        if today is None:
+            today = local_today(await user_timezone(self.session, user_id))
+        query = (
+            select(
+                Habit.id,
+                Habit.frequency_type,
+                Habit.target_times,
+                Habit.days_of_week,
+                HabitStreak,
+            )
+            .outerjoin(HabitStreak, HabitStreak.habit_id == Habit.id)
+            .filter(Habit.user_id == user_id)
+            .order_by(Habit.id)
+        )
+        rows = (await self.session.execute(query)).all()
+        habits = []
+        for row in rows:
+            schedule = HabitSchedule(
+                row.frequency_type, row.target_times, row.days_of_week
+            )
+            state = row.HabitStreak
+            habits.append(
+                HabitStreakInfo(
+                    habit_id=row.id,
+                    current_streak=effective_current_streak(state, schedule, today),
+                    longest_streak=state.longest_streak if state else 0,
+                    last_completed_day=state.last_completed_day if state else None,
+                )
+            )
+        user_state = await self.session.get(UserStreak, user_id)
+        overall = StreakInfo(
+            current_streak=effective_current_streak(
+                user_state, OVERALL_SCHEDULE, today
+            ),
+            longest_streak=user_state.longest_streak if user_state else 0,
+            last_completed_day=user_state.last_completed_day if user_state else None,
+        )
+        return StreakOverview(overall=overall, habits=habits)
+
+    async def get_year_heatmap(self, user_id: int, year: int) -> YearHeatmap:
+        # One row per habit; each bitmap is read as a little-endian integer so
+        # counts and the cross-habit union are plain bit operations
+        rows = await get_year_bitmaps(self.session, user_id, year)
+        any_habit = 0
+        habits = []
+        for row in rows:
+            bits = int.from_bytes(row.bits or b"", "little")
+            any_habit |= bits
+            habits.append(
+                HabitHeatmap(
+                    habit_id=row.habit_id,
+                    days_completed=bits.bit_count(),
+                    bitmap=base64.b64encode(
+                        bits.to_bytes(BITMAP_BYTES, "little")
+                    ).decode(),
+                )
+            )
+        return YearHeatmap(
+            year=year,
+            days_in_year=366 if calendar.isleap(year) else 365,
+            any_habit=base64.b64encode(
+                any_habit.to_bytes(BITMAP_BYTES, "little")
+            ).decode(),
+            habits=habits,
+        )
+
 
-HabitCategoryRepositoryDependency = Annotated[HabitCategoryRepository, Depends(HabitCategoryRepository)]
+HabitCategoryRepositoryDependency = Annotated[
+    HabitCategoryRepository, Depends(HabitCategoryRepository)
+]
 HabitRepositoryDependency = Annotated[HabitRepository, Depends(HabitRepository)]
-HabitTrackingLogRepositoryDependency = Annotated[HabitTrackingLogRepository, Depends(HabitTrackingLogRepository)]
+HabitTrackingLogRepositoryDependency = Annotated[
+    HabitTrackingLogRepository, Depends(HabitTrackingLogRepository)
+]
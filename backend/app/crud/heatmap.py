@@ -0,0 +1,172 @@
+import datetime
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+
+from sqlalchemy import and_, case, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.rollup import upsert_insert
+from app.db.functions import get_byte, set_byte
+from app.models.habit import Habit, HabitDailyRollup, HabitYearBitmap
+
+BITMAP_BYTES = 46  # 366 days, one bit each
+
+
+def day_bit(day: datetime.date) -> int:
+    """Bit index of a day within its year's bitmap."""
+    return day.timetuple().tm_yday - 1
+
+
+def _mark(bits: bytearray, index: int) -> None:
+    bits[index // 8] |= 1 << (index % 8)
+
+
+def _merged_bits(flips: dict[int, bool]):
+    """SQL for the stored bits with each bit index in `flips` set or cleared.
+
+    One set_byte per touched byte, so the expression stays shallow however
+    many days of the year change.
+    """
+    set_mask, clear_mask = bytearray(BITMAP_BYTES), bytearray(BITMAP_BYTES)
+    for index, completed in flips.items():
+        _mark(set_mask if completed else clear_mask, index)
+    bits = HabitYearBitmap.bits
+    for position in range(BITMAP_BYTES):
+        if set_mask[position] or clear_mask[position]:
+            byte = get_byte(HabitYearBitmap.bits, position).op("|")(set_mask[position])
+            bits = set_byte(bits, position, byte.op("&")(~clear_mask[position] & 0xFF))
+    return bits
+
+
+async def record_day_totals(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    changes: Iterable[tuple[int, datetime.date, int, int]],
+) -> None:
+    """Keeps the bitmaps in step with many rollup changes in one multi-row upsert. Does
+    not commit.
+
+    Each change is (habit_id, day, total, delta): a rollup day that moved by
+    `delta` to `total` completions, at most one per (habit, day). Only days
+    going from zero completions to some, or back, touch a bit.
+    """
+    flips: dict[tuple[int, int], dict[int, bool]] = defaultdict(dict)
+    for habit_id, day, total, delta in changes:
+        if total > 0 and total - delta <= 0:
+            flips[(habit_id, day.year)][day_bit(day)] = True
+        elif total <= 0 < total - delta:
+            flips[(habit_id, day.year)][day_bit(day)] = False
+    if not flips:
+        return
+    rows = []
+    for (habit_id, year), bits in flips.items():
+        initial = bytearray(BITMAP_BYTES)
+        for index, completed in bits.items():
+            if completed:
+                _mark(initial, index)
+        rows.append(
+            {
+                "habit_id": habit_id,
+                "year": year,
+                "user_id": user_id,
+                "bits": bytes(initial),
+            }
+        )
+    stmt = upsert_insert(session)(HabitYearBitmap).values(rows)
+    merged = case(
+        *[
+            (
+                and_(
+                    HabitYearBitmap.habit_id == habit_id, HabitYearBitmap.year == year
+                ),
+                _merged_bits(bits),
+            )
+            for (habit_id, year), bits in flips.items()
+        ],
+        else_=HabitYearBitmap.bits,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[HabitYearBitmap.habit_id, HabitYearBitmap.year],
+        set_={"bits": merged},
+    )
+    await session.execute(stmt)
+
+
+async def record_day_total(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    habit_id: int,
+    day: datetime.date,
+    total: int,
+    delta: int,
+) -> None:
+    """Keeps the bitmap in step with a rollup change that left `total` completions.
+
+    Does not commit.
+    """
+    await record_day_totals(
+        session, user_id=user_id, changes=[(habit_id, day, total, delta)]
+    )
+
+
+async def delete_habit_bitmaps(session: AsyncSession, habit_id: int) -> None:
+    await session.execute(
+        delete(HabitYearBitmap).filter(HabitYearBitmap.habit_id == habit_id)
+    )
+
+
+async def get_year_bitmaps(session: AsyncSession, user_id: int, year: int) -> Sequence:
+    """(habit_id, bits) for each of the user's habits in one query.
+
+    bits is None for a habit without logs that year.
+    """
+    query = (
+        select(Habit.id.label("habit_id"), HabitYearBitmap.bits)
+        .outerjoin(
+            HabitYearBitmap,
+            and_(HabitYearBitmap.habit_id == Habit.id, HabitYearBitmap.year == year),
+        )
+        .filter(Habit.user_id == user_id)
+        .order_by(Habit.id)
+    )
+    return (await session.execute(query)).all()
+
+
+async def rebuild_year_bitmaps(
+    session: AsyncSession, *, user_id: int | None = None
+) -> None:
+    """Repair path: rebuilds bitmaps from the daily rollup (all users or one).
+
+    Does not commit.
+    """
+    clear = delete(HabitYearBitmap)
+    source = select(
+        HabitDailyRollup.user_id, HabitDailyRollup.habit_id, HabitDailyRollup.day
+    ).filter(HabitDailyRollup.completions > 0)
+    if user_id is not None:
+        clear = clear.filter(HabitYearBitmap.user_id == user_id)
+        source = source.filter(HabitDailyRollup.user_id == user_id)
+
+    bitmaps: dict[tuple[int, int], tuple[int, bytearray]] = {}
+    for row in (await session.execute(source)).all():
+        _, bits = bitmaps.setdefault(
+            (row.habit_id, row.day.year), (row.user_id, bytearray(BITMAP_BYTES))
+        )
+        _mark(bits, day_bit(row.day))
+
+    await session.execute(clear)
+    if bitmaps:
+        await session.execute(
+            insert(HabitYearBitmap),
+            [
+                {
+                    "habit_id": habit_id,
+                    "year": year,
+                    "user_id": owner,
+                    "bits": bytes(bits),
+                }
+                for (habit_id, year), (owner, bits) in bitmaps.items()
+            ],
+        )
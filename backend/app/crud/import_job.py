@@ -0,0 +1,31 @@
+from typing import Annotated
+
+from fastapi import Depends
+from sqlalchemy import select
+
+from app.db import SessionContext
+from app.models.import_job import ImportJob
+
+
+class ImportJobRepository:
+    def __init__(self, session: SessionContext):
+        self.session = session
+
+    async def create_import_job(self, user_id: int, format: str) -> ImportJob:
+        job = ImportJob(user_id=user_id, format=format)
+        self.session.add(job)
+        await self.session.flush()
+        await self.session.refresh(job)
+        return job
+
+    async def get_import_job(self, job_id: int, user_id: int) -> ImportJob | None:
+        query = select(ImportJob).filter(
+            ImportJob.id == job_id, ImportJob.user_id == user_id
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+
+ImportJobRepositoryDependency = Annotated[
+    ImportJobRepository, Depends(ImportJobRepository)
+]
@@ -0,0 +1,74 @@
+"""Keyset pagination over (logged_datetime, id), newest first.
+
+A page is the `limit` rows on one side of a position, found with a row-value
+comparison that an index on (..., logged_datetime, id) answers as a range scan,
+so every page costs the same however deep it is. The redundant bound on
+logged_datetime alone lets Postgres prune the monthly partitions a page can't
+reach, which it can't work out from the row comparison.
+"""
+
+import datetime
+from typing import NamedTuple
+
+from sqlalchemy import and_, literal, tuple_
+
+from app.core.cursor import decode_cursor, encode_cursor
+from app.models.habit import HabitTrackingLog
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class LogPosition(NamedTuple):
+    logged_datetime: datetime.datetime
+    id: int
+
+
+def _key():
+    return tuple_(HabitTrackingLog.logged_datetime, HabitTrackingLog.id)
+
+
+def _bound(position: LogPosition):
+    return tuple_(
+        literal(position.logged_datetime, HabitTrackingLog.logged_datetime.type),
+        literal(position.id, HabitTrackingLog.id.type),
+    )
+
+
+def older_than(position: LogPosition):
+    return and_(
+        HabitTrackingLog.logged_datetime <= position.logged_datetime,
+        _key() < _bound(position),
+    )
+
+
+def newer_than(position: LogPosition):
+    return and_(
+        HabitTrackingLog.logged_datetime >= position.logged_datetime,
+        _key() > _bound(position),
+    )
+
+
+def page_cursor(position: LogPosition, direction: str) -> str:
+    return encode_cursor(
+        {
+            "at": position.logged_datetime.isoformat(),
+            "id": position.id,
+            "dir": direction,
+        }
+    )
+
+
+def parse_page_cursor(cursor: str) -> tuple[LogPosition, str]:
+    """(position, "older" or "newer"). Raises ValueError for a bad cursor."""
+    payload = decode_cursor(cursor)
+    try:
+        position = LogPosition(
+            datetime.datetime.fromisoformat(payload["at"]), int(payload["id"])
+        )
+        direction = payload["dir"]
+    except (KeyError, TypeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if direction not in ("older", "newer"):
+        raise ValueError("Malformed cursor")
+    return position, direction
@@ -2,13 +2,14 @@ from typing import Annotated
 
 from fastapi import Depends
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import SessionContext # Assuming SessionContext is your AsyncSession
+from app.db import SessionContext  # Assuming SessionContext is your AsyncSession
 from app.models.role import Role
+
 # We'll define RoleCreate and Role schemas later
 # from app.schemas.role import RoleCreate
 
+
 class RoleRepository:
     def __init__(self, session: SessionContext):
         self.session = session
@@ -16,7 +17,7 @@ class RoleRepository:
     async def create_role(self, role_name: str) -> Role:
         db_role = Role(name=role_name)
         self.session.add(db_role)
-        await self.session.commit()
+        await self.session.flush()
         await self.session.refresh(db_role)
         return db_role
 
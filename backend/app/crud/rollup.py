@@ -0,0 +1,168 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, exists, func, insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.bucketing import local_date
+from app.models.habit import HabitDailyRollup, HabitTrackingLog
+from app.models.user import User
+
+
+def log_day(logged_datetime: datetime.datetime, timezone: str) -> datetime.date:
+    """Rollup day a log belongs to: its calendar date in the owner's timezone.
+
+    Naive datetimes are UTC, as SQLite hands them back. Same as local_date in SQL.
+    """
+    if logged_datetime.tzinfo is None:
+        logged_datetime = logged_datetime.replace(tzinfo=datetime.UTC)
+    return logged_datetime.astimezone(ZoneInfo(timezone)).date()
+
+
+def upsert_insert(session: AsyncSession):
+    """Dialect-specific `insert` construct that supports ON CONFLICT."""
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
+
+async def apply_rollup_delta(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    habit_id: int,
+    day: datetime.date,
+    completions: int,
+    progress: int = 0,
+) -> int:
+    """Adds a delta to one habit-day rollup row and returns its new completions. Does
+    not commit.
+
+    Rows that drop to zero completions are removed so the table stays sparse.
+    """
+    stmt = upsert_insert(session)(HabitDailyRollup).values(
+        user_id=user_id,
+        habit_id=habit_id,
+        day=day,
+        completions=completions,
+        progress_sum=progress,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            HabitDailyRollup.user_id,
+            HabitDailyRollup.day,
+            HabitDailyRollup.habit_id,
+        ],
+        set_={
+            "completions": HabitDailyRollup.completions + stmt.excluded.completions,
+            "progress_sum": HabitDailyRollup.progress_sum + stmt.excluded.progress_sum,
+        },
+    )
+    total = (
+        await session.execute(stmt.returning(HabitDailyRollup.completions))
+    ).scalar_one()
+    if completions < 0 and total <= 0:
+        await session.execute(
+            delete(HabitDailyRollup).filter(
+                HabitDailyRollup.user_id == user_id,
+                HabitDailyRollup.habit_id == habit_id,
+                HabitDailyRollup.day == day,
+                HabitDailyRollup.completions <= 0,
+            )
+        )
+    return max(total, 0)
+
+
+async def apply_rollup_deltas(
+    session: AsyncSession, deltas: list[dict]
+) -> dict[tuple[int, datetime.date], int]:
+    """Adds many deltas in one multi-row upsert. Does not commit.
+
+    Each dict has user_id, habit_id, day, completions and progress_sum, with at
+    most one entry per (habit, day). Returns the new completions per (habit, day);
+    rows that drop to zero are removed with one more statement, as in
+    apply_rollup_delta.
+    """
+    if not deltas:
+        return {}
+    stmt = upsert_insert(session)(HabitDailyRollup).values(deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            HabitDailyRollup.user_id,
+            HabitDailyRollup.day,
+            HabitDailyRollup.habit_id,
+        ],
+        set_={
+            "completions": HabitDailyRollup.completions + stmt.excluded.completions,
+            "progress_sum": HabitDailyRollup.progress_sum + stmt.excluded.progress_sum,
+        },
+    )
+    result = await session.execute(
+        stmt.returning(
+            HabitDailyRollup.user_id,
+            HabitDailyRollup.habit_id,
+            HabitDailyRollup.day,
+            HabitDailyRollup.completions,
+        )
+    )
+    rows = result.all()
+    emptied = [
+        (row.user_id, row.habit_id, row.day) for row in rows if row.completions <= 0
+    ]
+    if emptied:
+        await session.execute(
+            delete(HabitDailyRollup).filter(
+                tuple_(
+                    HabitDailyRollup.user_id,
+                    HabitDailyRollup.habit_id,
+                    HabitDailyRollup.day,
+                ).in_(emptied),
+                HabitDailyRollup.completions <= 0,
+            )
+        )
+    return {(row.habit_id, row.day): max(row.completions, 0) for row in rows}
+
+
+async def rebuild_daily_rollups(
+    session: AsyncSession, *, user_id: int | None = None
+) -> None:
+    """Recomputes rollups from raw logs (all users, or just one). Does not commit.
+
+    This is the backfill/repair path; normal writes keep the table current. It
+    also re-buckets a user's history after their timezone changes. Days before a
+    user's `logs_archived_before` are left alone: their raw logs are archived,
+    and any logged there since were already added to the kept rollup.
+    """
+    clear = delete(HabitDailyRollup).filter(
+        ~exists().where(
+            User.id == HabitDailyRollup.user_id,
+            User.logs_archived_before > HabitDailyRollup.day,
+        )
+    )
+    day = local_date(HabitTrackingLog.logged_datetime, User.timezone)
+    source = (
+        select(
+            HabitTrackingLog.user_id,
+            HabitTrackingLog.habit_id,
+            day.label("day"),
+            func.count(HabitTrackingLog.id).label("completions"),
+            func.coalesce(func.sum(HabitTrackingLog.progress), 0).label("progress_sum"),
+        )
+        .join(User, User.id == HabitTrackingLog.user_id)
+        .filter(
+            or_(User.logs_archived_before.is_(None), day >= User.logs_archived_before)
+        )
+    )
+    if user_id is not None:
+        clear = clear.filter(HabitDailyRollup.user_id == user_id)
+        source = source.filter(HabitTrackingLog.user_id == user_id)
+    source = source.group_by(HabitTrackingLog.user_id, HabitTrackingLog.habit_id, "day")
+
+    await session.execute(clear)
+    await session.execute(
+        insert(HabitDailyRollup).from_select(
+            ["user_id", "habit_id", "day", "completions", "progress_sum"], source
+        )
+    )
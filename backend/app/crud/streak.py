@@ -0,0 +1,333 @@
+import datetime
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+
+from sqlalchemy import case, delete, desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.schedule import HabitSchedule
+from app.db.functions import day_number
+from app.models.habit import FrequencyType, Habit, HabitDailyRollup
+from app.models.streak import HabitStreak, UserStreak
+
+# The overall streak counts days with at least one log, whatever the habit
+OVERALL_SCHEDULE = HabitSchedule(FrequencyType.DAILY, 1, None)
+
+
+def effective_current_streak(
+    state: HabitStreak | UserStreak | None,
+    schedule: HabitSchedule,
+    today: datetime.date,
+) -> int:
+    """Stored current streak, or 0 if the run was broken by a missed period.
+
+    The current period is still open, so a run ending in the previous period is alive.
+    """
+    if state is None or state.last_completed_day is None:
+        return 0
+    last_period = schedule.period_of(state.last_completed_day)
+    if last_period is None or last_period < schedule.latest_period(today) - 1:
+        return 0
+    return state.current_streak
+
+
+def _period_expression(schedule: HabitSchedule):
+    """SQL mirror of HabitSchedule.period_of over rollup days, plus a day filter."""
+    number = day_number(HabitDailyRollup.day)
+    if schedule.frequency_type != FrequencyType.WEEKLY:
+        return number, None
+    if not schedule.days:
+        return number // 7, None
+    position = number % 7
+    index = case({d: i for i, d in enumerate(schedule.days)}, value=position)
+    return (number // 7) * len(schedule.days) + index, position.in_(schedule.days)
+
+
+async def _streak_runs(
+    session: AsyncSession, schedule: HabitSchedule, *filters
+) -> Sequence:
+    """Gaps-and-islands over met periods: one row per run, latest run first."""
+    period, scheduled = _period_expression(schedule)
+    days = select(
+        period.label("period"), HabitDailyRollup.day, HabitDailyRollup.completions
+    ).filter(*filters)
+    if scheduled is not None:
+        days = days.filter(scheduled)
+    days = days.subquery("days")
+
+    met_periods = (
+        select(days.c.period, func.max(days.c.day).label("last_day"))
+        .group_by(days.c.period)
+        .having(func.sum(days.c.completions) >= schedule.target)
+        .subquery("met_periods")
+    )
+    islands = select(
+        met_periods.c.period,
+        met_periods.c.last_day,
+        (
+            met_periods.c.period - func.row_number().over(order_by=met_periods.c.period)
+        ).label("island"),
+    ).subquery("islands")
+    runs = (
+        select(
+            func.count().label("length"),
+            func.max(islands.c.period).label("last_period"),
+            func.max(islands.c.last_day).label("last_day"),
+        )
+        .group_by(islands.c.island)
+        .order_by(desc("last_period"))
+    )
+    return (await session.execute(runs)).all()
+
+
+def _apply_runs(state: HabitStreak | UserStreak, runs: Sequence) -> None:
+    if not runs:
+        state.current_streak = state.longest_streak = 0
+        state.last_completed_day = None
+        return
+    state.current_streak = runs[0].length
+    state.longest_streak = max(run.length for run in runs)
+    state.last_completed_day = runs[0].last_day
+
+
+async def _load_schedule(
+    session: AsyncSession, habit_id: int
+) -> tuple[int, HabitSchedule] | None:
+    result = await session.execute(
+        select(
+            Habit.user_id, Habit.frequency_type, Habit.target_times, Habit.days_of_week
+        ).filter(Habit.id == habit_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return row.user_id, HabitSchedule(
+        row.frequency_type, row.target_times, row.days_of_week
+    )
+
+
+async def _load_schedules(
+    session: AsyncSession, habit_ids: Iterable[int]
+) -> dict[int, HabitSchedule]:
+    result = await session.execute(
+        select(
+            Habit.id, Habit.frequency_type, Habit.target_times, Habit.days_of_week
+        ).filter(Habit.id.in_(list(habit_ids)))
+    )
+    return {
+        row.id: HabitSchedule(row.frequency_type, row.target_times, row.days_of_week)
+        for row in result.all()
+    }
+
+
+async def recompute_habit_streak(
+    session: AsyncSession, habit_id: int
+) -> HabitStreak | None:
+    """Full recompute of a habit's streak state from its rollup. Does not commit."""
+    loaded = await _load_schedule(session, habit_id)
+    if loaded is None:
+        return None
+    user_id, schedule = loaded
+    runs = await _streak_runs(session, schedule, HabitDailyRollup.habit_id == habit_id)
+    state = await session.get(HabitStreak, habit_id)
+    if state is None:
+        state = HabitStreak(habit_id=habit_id, user_id=user_id)
+        session.add(state)
+    _apply_runs(state, runs)
+    await session.flush([state])
+    return state
+
+
+async def recompute_user_streak(session: AsyncSession, user_id: int) -> UserStreak:
+    """Full recompute of a user's overall day streak from the rollup.
+
+    Does not commit.
+    """
+    runs = await _streak_runs(
+        session, OVERALL_SCHEDULE, HabitDailyRollup.user_id == user_id
+    )
+    state = await session.get(UserStreak, user_id)
+    if state is None:
+        state = UserStreak(user_id=user_id)
+        session.add(state)
+    _apply_runs(state, runs)
+    await session.flush([state])
+    return state
+
+
+def _advance(
+    state: HabitStreak | UserStreak,
+    schedule: HabitSchedule,
+    period: int,
+    day: datetime.date,
+) -> bool:
+    """Extends the run for a newly met period in O(1); False if it needs a recompute."""
+    if state.last_completed_day is None:
+        state.current_streak = 1
+    else:
+        last_period = schedule.period_of(state.last_completed_day)
+        if last_period is None or period < last_period:
+            return False  # Backfilled history or a changed schedule
+        if period == last_period:
+            return True
+        state.current_streak = (
+            state.current_streak + 1 if period == last_period + 1 else 1
+        )
+    state.longest_streak = max(state.longest_streak, state.current_streak)
+    state.last_completed_day = day
+    return True
+
+
+def _period_changes(
+    schedule: HabitSchedule,
+    deltas: dict[datetime.date, int],
+    completions: dict[datetime.date, int],
+) -> list[tuple[int, datetime.date, int, int]]:
+    """(period, latest changed day, completions after, delta) per changed period, oldest
+    first.
+
+    `deltas` are the changed days and `completions` the rollup days after the change.
+    """
+    totals: dict[int, int] = defaultdict(int)
+    for day, count in completions.items():
+        period = schedule.period_of(day)
+        if period is not None:
+            totals[period] += count
+    changed: dict[int, tuple[datetime.date, int]] = {}
+    for day, delta in deltas.items():
+        period = schedule.period_of(day)
+        if period is not None:
+            latest, total = changed.get(period, (day, 0))
+            changed[period] = (max(latest, day), total + delta)
+    return [
+        (period, day, totals[period], delta)
+        for period, (day, delta) in sorted(changed.items())
+    ]
+
+
+def _apply_period_changes(
+    state: HabitStreak | UserStreak | None,
+    schedule: HabitSchedule,
+    changes: list[tuple[int, datetime.date, int, int]],
+) -> bool:
+    """Applies period changes oldest first. False if a recompute is needed."""
+    if state is None:
+        return False
+    for period, day, count, delta in changes:
+        if count < schedule.target <= count - delta:
+            return False  # The period became unmet
+        if count - delta < schedule.target <= count and not _advance(
+            state, schedule, period, day
+        ):
+            return False
+    return True
+
+
+async def record_log_changes(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    changes: Iterable[tuple[int, datetime.date, int]],
+) -> None:
+    """Updates habit and overall streak state after rollup changes of (habit_id, day,
+    delta) logs.
+
+    Must run after the rollup deltas are applied. Schedules, streak states and
+    period completions of all touched habits are loaded with one IN query each,
+    and a period that becomes met extends its run in O(1). Backfills, a period
+    that becomes unmet and missing state fall back to the full recompute of that
+    habit. Does not commit.
+    """
+    by_habit: dict[int, dict[datetime.date, int]] = defaultdict(
+        lambda: defaultdict(int)
+    )
+    by_day: dict[datetime.date, int] = defaultdict(int)
+    for habit_id, day, delta in changes:
+        by_habit[habit_id][day] += delta
+        by_day[day] += delta
+    if not by_day:
+        return
+
+    schedules = await _load_schedules(session, by_habit)
+    states = {
+        state.habit_id: state
+        for state in await session.scalars(
+            select(HabitStreak).filter(HabitStreak.habit_id.in_(schedules))
+        )
+    }
+    completions: dict[int, dict[datetime.date, int]] = defaultdict(dict)
+    spans = [
+        schedules[habit_id].period_days(day)
+        for habit_id in schedules
+        for day in by_habit[habit_id]
+    ]
+    if spans:
+        result = await session.execute(
+            select(
+                HabitDailyRollup.habit_id,
+                HabitDailyRollup.day,
+                HabitDailyRollup.completions,
+            ).filter(
+                HabitDailyRollup.user_id == user_id,
+                HabitDailyRollup.habit_id.in_(schedules),
+                HabitDailyRollup.day >= min(first_day for first_day, _ in spans),
+                HabitDailyRollup.day <= max(last_day for _, last_day in spans),
+            )
+        )
+        for habit_id, day, count in result.all():
+            completions[habit_id][day] = count
+    for habit_id, schedule in schedules.items():
+        periods = _period_changes(schedule, by_habit[habit_id], completions[habit_id])
+        if periods and not _apply_period_changes(
+            states.get(habit_id), schedule, periods
+        ):
+            await recompute_habit_streak(session, habit_id)
+
+    result = await session.execute(
+        select(HabitDailyRollup.day, func.sum(HabitDailyRollup.completions))
+        .filter(HabitDailyRollup.user_id == user_id, HabitDailyRollup.day.in_(by_day))
+        .group_by(HabitDailyRollup.day)
+    )
+    periods = _period_changes(
+        OVERALL_SCHEDULE, by_day, {day: int(count) for day, count in result.all()}
+    )
+    if not _apply_period_changes(
+        await session.get(UserStreak, user_id), OVERALL_SCHEDULE, periods
+    ):
+        await recompute_user_streak(session, user_id)
+
+
+async def record_log_change(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    habit_id: int,
+    day: datetime.date,
+    delta: int,
+) -> None:
+    """Updates habit and overall streak state after a rollup change of `delta` logs.
+
+    Does not commit.
+    """
+    await record_log_changes(session, user_id=user_id, changes=[(habit_id, day, delta)])
+
+
+async def delete_habit_streak(session: AsyncSession, habit_id: int) -> None:
+    await session.execute(delete(HabitStreak).filter(HabitStreak.habit_id == habit_id))
+
+
+async def rebuild_streaks(session: AsyncSession, *, user_id: int | None = None) -> None:
+    """Repair path: recomputes every habit and overall streak (all users or one).
+
+    Does not commit.
+    """
+    habits = select(Habit.id, Habit.user_id)
+    if user_id is not None:
+        habits = habits.filter(Habit.user_id == user_id)
+    rows = (await session.execute(habits)).all()
+    for row in rows:
+        await recompute_habit_streak(session, row.id)
+    for owner_id in {row.user_id for row in rows} | (
+        {user_id} if user_id is not None else set()
+    ):
+        await recompute_user_streak(session, owner_id)
@@ -0,0 +1,365 @@
+import datetime
+import uuid
+from collections.abc import Iterable
+from typing import Annotated, NamedTuple, cast
+
+from fastapi import Depends
+from sqlalchemy import CursorResult, and_, delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
+
+from app.core.config import settings
+from app.core.cursor import decode_cursor, encode_cursor
+from app.crud.bulk import (
+    as_utc,
+    owned_habit_ids,
+    record_logs_added,
+    record_logs_removed,
+)
+from app.crud.rollup import apply_rollup_delta, log_day, upsert_insert
+from app.crud.user import bump_data_version, user_timezone
+from app.db import SessionContext
+from app.models.habit import Habit, HabitCategory, HabitTrackingLog
+from app.models.sync import SyncClientId, SyncTombstone
+from app.schemas.habit import HabitTrackingLog as HabitTrackingLogSchema
+from app.schemas.sync import SyncLogOperation
+
+# A change committed late can carry an earlier updated_at (now() is the
+# transaction start), so each cursor reaches back this far. Clients upsert,
+# so seeing a row twice is harmless.
+CHANGES_OVERLAP = datetime.timedelta(seconds=30)
+
+CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 2000
+
+# Rows changed at the same moment are sent in this order, then by id
+CHANGE_STREAMS = ("categories", "habits", "logs", "deleted")
+
+
+class ChangesPosition(NamedTuple):
+    """Where a changes cursor points.
+
+    Rows changed after `since`; or, while a catch-up is being paged, rows after
+    the one of CHANGE_STREAMS[`stream`] with `id` that changed at `since`. The
+    catch-up's last cursor goes back to `started`, the time of its first page.
+    """
+
+    since: datetime.datetime
+    stream: int | None = None
+    id: int | None = None
+    started: datetime.datetime | None = None
+
+
+async def add_tombstones(
+    session: AsyncSession,
+    user_id: int,
+    entity: str,
+    entity_ids: Iterable[int],
+    client_ids: Iterable[uuid.UUID | None] | None = None,
+) -> None:
+    """Records deletes for the changes feed. Does not commit."""
+    entity_ids = list(entity_ids)
+    client_ids = (
+        list(client_ids) if client_ids is not None else [None] * len(entity_ids)
+    )
+    if entity_ids:
+        await session.execute(
+            insert(SyncTombstone),
+            [
+                {
+                    "user_id": user_id,
+                    "entity": entity,
+                    "entity_id": entity_id,
+                    "client_id": client_id,
+                }
+                for entity_id, client_id in zip(entity_ids, client_ids)
+            ],
+        )
+
+
+async def prune_tombstones(session: AsyncSession) -> int:
+    """Drops tombstones past SYNC_TOMBSTONE_DAYS; returns how many. Does not commit."""
+    horizon = datetime.datetime.now(datetime.UTC) - datetime.timedelta(
+        days=settings.SYNC_TOMBSTONE_DAYS
+    )
+    result = cast(
+        "CursorResult",
+        await session.execute(
+            delete(SyncTombstone).filter(SyncTombstone.deleted_at < horizon)
+        ),
+    )
+    return result.rowcount
+
+
+def _aware(value: str) -> datetime.datetime:
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        # Cursors are issued in UTC; a naive one wasn't made here
+        raise ValueError("Malformed cursor")
+    return moment
+
+
+def changes_since(cursor: str) -> ChangesPosition:
+    """The position a changes cursor stands for. Raises ValueError for a bad cursor."""
+    payload = decode_cursor(cursor)
+    try:
+        position = ChangesPosition(_aware(payload["since"]))
+        if "stream" in payload:
+            position = position._replace(
+                stream=int(payload["stream"]),
+                id=int(payload["id"]),
+                started=_aware(payload["started"]),
+            )
+    except (KeyError, TypeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if position.stream is not None and not 0 <= position.stream < len(CHANGE_STREAMS):
+        raise ValueError("Malformed cursor")
+    return position
+
+
+def _changed_after(position: ChangesPosition, stream: int, column, id_column):
+    # Only strict comparisons: SQLite stores server-side timestamps without
+    # fractional seconds, so they never equal a bound value there. At
+    # microsecond resolution, "> since - 1us" is ">= since".
+    if position.stream is None or stream < position.stream:
+        return column > position.since
+    at_or_after = column > position.since - datetime.timedelta(microseconds=1)
+    if stream > position.stream:
+        return at_or_after
+    return and_(at_or_after, or_(column > position.since, id_column > position.id))
+
+
+def cursor_expired(since: datetime.datetime) -> bool:
+    """True when deletes after `since` may already be pruned."""
+    return since < datetime.datetime.now(datetime.UTC) - datetime.timedelta(
+        days=settings.SYNC_TOMBSTONE_DAYS
+    )
+
+
+def _log_row(log: HabitTrackingLog) -> dict:
+    return {
+        "habit_id": log.habit_id,
+        "logged_datetime": log.logged_datetime,
+        "progress": log.progress,
+    }
+
+
+class SyncRepository:
+    def __init__(self, session: SessionContext):
+        self.session = session
+
+    async def apply_log_operations(
+        self, user_id: int, operations: list[SyncLogOperation]
+    ) -> list[dict]:
+        """Applies a client's queued log operations in one transaction; safe to replay.
+
+        Each create first claims its client id in sync_client_ids; only claimed
+        ones are inserted. A client id that is already taken, by an earlier or a
+        concurrent replay of the same create, even with an edited logged_at, comes
+        back as a duplicate instead of a second log. Updates and deletes then run
+        in queue order against the logs found by client id. Returns one result dict
+        (client_id, op, status, log) per operation.
+        """
+        creates = [operation for operation in operations if operation.op == "create"]
+        # The schema requires habit_id on creates; the filter only narrows the type
+        habit_ids = {
+            operation.habit_id
+            for operation in creates
+            if operation.habit_id is not None
+        }
+        owned = await owned_habit_ids(self.session, user_id, habit_ids)
+        wanted: dict[uuid.UUID, SyncLogOperation] = {}
+        for operation in creates:
+            if operation.habit_id in owned:
+                wanted.setdefault(operation.client_id, operation)
+        fresh = set()
+        if wanted:
+            stmt = upsert_insert(self.session)(SyncClientId).on_conflict_do_nothing(
+                index_elements=[SyncClientId.user_id, SyncClientId.client_id]
+            )
+            fresh = set(
+                (
+                    await self.session.scalars(
+                        stmt.returning(SyncClientId.client_id),
+                        [
+                            {"user_id": user_id, "client_id": client_id}
+                            for client_id in wanted
+                        ],
+                    )
+                ).all()
+            )
+        rows = [
+            {
+                "user_id": user_id,
+                "client_id": client_id,
+                "habit_id": operation.habit_id,
+                "logged_datetime": operation.logged_datetime,
+                "completed": bool(operation.completed),
+                "progress": operation.progress,
+            }
+            for client_id, operation in wanted.items()
+            if client_id in fresh
+        ]
+        if rows:
+            await self.session.execute(insert(HabitTrackingLog), rows)
+
+        timezone = await user_timezone(self.session, user_id)
+        await record_logs_added(self.session, user_id, rows, timezone)
+
+        # Every log the batch refers to, newly created ones included, in one query
+        result = await self.session.scalars(
+            select(HabitTrackingLog).filter(
+                HabitTrackingLog.user_id == user_id,
+                HabitTrackingLog.client_id.in_(
+                    {operation.client_id for operation in operations}
+                ),
+            )
+        )
+        logs = {log.client_id: log for log in result.all()}
+
+        results, removed = [], []
+        for operation in operations:
+            log = logs.get(operation.client_id)
+            if operation.op == "create":
+                if operation.client_id in fresh:
+                    fresh.discard(operation.client_id)
+                    status = "created"
+                elif operation.client_id in wanted:
+                    status = "duplicate"
+                else:
+                    status = "rejected"
+            elif log is None:
+                status = "not_found"
+            elif operation.op == "update":
+                if operation.completed is not None:
+                    log.completed = operation.completed
+                if operation.progress is not None and operation.progress != (
+                    log.progress or 0
+                ):
+                    await apply_rollup_delta(
+                        self.session,
+                        user_id=user_id,
+                        habit_id=log.habit_id,
+                        day=log_day(log.logged_datetime, timezone),
+                        completions=0,
+                        progress=operation.progress - (log.progress or 0),
+                    )
+                    log.progress = operation.progress
+                status = "updated"
+            else:
+                removed.append(logs.pop(operation.client_id))
+                status = "deleted"
+            results.append(
+                {"client_id": operation.client_id, "op": operation.op, "status": status}
+            )
+
+        if removed:
+            await (
+                self.session.flush()
+            )  # Updates queued for a log deleted later in the batch go first
+            await self.session.execute(
+                delete(HabitTrackingLog).filter(
+                    HabitTrackingLog.id.in_([log.id for log in removed])
+                )
+            )
+            await record_logs_removed(
+                self.session, user_id, [_log_row(log) for log in removed], timezone
+            )
+            await add_tombstones(
+                self.session,
+                user_id,
+                "log",
+                [log.id for log in removed],
+                [log.client_id for log in removed],
+            )
+
+        if any(
+            entry["status"] in ("created", "updated", "deleted") for entry in results
+        ):
+            await bump_data_version(self.session, user_id)
+        await self.session.flush()
+        # Read back as plain rows, with the database's updated_at and friends
+        kept = await self.session.execute(
+            select(*HabitTrackingLog.__table__.columns).filter(
+                HabitTrackingLog.id.in_([log.id for log in logs.values()])
+            )
+        )
+        current = {
+            row.client_id: HabitTrackingLogSchema.model_validate(row) for row in kept
+        }
+        for entry in results:
+            entry["log"] = current.get(entry["client_id"])
+        return results
+
+    async def get_changes(
+        self,
+        user_id: int,
+        position: ChangesPosition | None = None,
+        limit: int = CHANGES_PAGE_SIZE,
+    ) -> dict:
+        """Up to `limit` habits, categories, logs and deletes changed after `position`.
+
+        Rows come oldest change first, each list from one range scan on a
+        (user_id, updated_at) or (user_id, deleted_at) index. Without a position
+        every current row is listed, for a first sync. With `has_more` the
+        cursor points just past the last row returned, so a long catch-up is
+        fetched page by page; otherwise it points at the present.
+        """
+        now = datetime.datetime.now(datetime.UTC)
+        streams = {
+            "categories": (
+                select(HabitCategory),
+                HabitCategory,
+                HabitCategory.updated_at,
+            ),
+            # The eager relationships would drag in every log of every habit
+            "habits": (
+                select(Habit).options(
+                    noload(Habit.category), noload(Habit.tracking_logs)
+                ),
+                Habit,
+                Habit.updated_at,
+            ),
+            "logs": (
+                select(HabitTrackingLog).options(noload(HabitTrackingLog.habit)),
+                HabitTrackingLog,
+                HabitTrackingLog.updated_at,
+            ),
+            "deleted": (select(SyncTombstone), SyncTombstone, SyncTombstone.deleted_at),
+        }
+        candidates = []
+        for rank, name in enumerate(CHANGE_STREAMS):
+            query, model, column = streams[name]
+            if position is None and name == "deleted":
+                continue
+            query = query.filter(model.user_id == user_id)
+            if position is not None:
+                query = query.filter(_changed_after(position, rank, column, model.id))
+            rows = await self.session.scalars(
+                query.order_by(column, model.id).limit(limit + 1)
+            )
+            candidates.extend(
+                (as_utc(getattr(row, column.key)), rank, row.id, row) for row in rows
+            )
+        # Each list is in key order; only the merged first `limit` are sent
+        candidates.sort(key=lambda candidate: candidate[:3])
+        page, has_more = candidates[:limit], len(candidates) > limit
+
+        started = position.started if position is not None and position.started else now
+        if has_more:
+            at, rank, row_id, _ = page[-1]
+            cursor = {
+                "since": at.isoformat(),
+                "stream": rank,
+                "id": row_id,
+                "started": started.isoformat(),
+            }
+        else:
+            cursor = {"since": (started - CHANGES_OVERLAP).isoformat()}
+        changes: dict = {name: [] for name in CHANGE_STREAMS}
+        for _, rank, _, row in page:
+            changes[CHANGE_STREAMS[rank]].append(row)
+        return {"cursor": encode_cursor(cursor), "has_more": has_more, **changes}
+
+
+SyncRepositoryDependency = Annotated[SyncRepository, Depends(SyncRepository)]
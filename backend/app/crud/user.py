@@ -1,14 +1,26 @@
-from datetime import UTC, datetime
-from typing import Annotated
+from typing import Annotated, NamedTuple
 
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.core.security import password_hasher
+from app.crud.heatmap import rebuild_year_bitmaps
+from app.crud.rollup import rebuild_daily_rollups
+from app.crud.streak import rebuild_streaks
 from app.db import SessionContext
+from app.db.routing import READ_PRIMARY
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.core.security import get_password_hash
+
+
+class UserState(NamedTuple):
+    """The user fields that every habit-data write or timezone change moves."""
+
+    data_version: int
+    timezone: str
+
 
 class UserRepository:
     def __init__(self, session: SessionContext):
@@ -17,20 +29,21 @@ class UserRepository:
     async def create_user(self, user_data: UserCreate) -> User:
         db_user = User(
             email=user_data.email,
-            password_hash=get_password_hash(user_data.password),
+            password_hash=await password_hasher.hash(user_data.password),
             is_active=user_data.is_active if user_data.is_active is not None else True,
             role_id=user_data.role_id,
-            full_name=user_data.full_name
+            full_name=user_data.full_name,
+            timezone=user_data.timezone,
         )
         self.session.add(db_user)
-        await self.session.commit()
+        await self.session.flush()
         await self.session.refresh(db_user)
         # Re-fetch the user to ensure all relationships, like role, are eagerly loaded
         if db_user.id is not None:
             loaded_user = await self.get_user_by_id(db_user.id)
             if loaded_user:
                 return loaded_user
-        return db_user # Fallback, though ideally loaded_user is always found
+        return db_user  # Fallback, though ideally loaded_user is always found
 
     async def get_user_by_id(self, user_id: int) -> User | None:
         query = select(User).options(selectinload(User.role)).filter(User.id == user_id)
@@ -38,10 +51,56 @@ class UserRepository:
         return result.scalar_one_or_none()
 
     async def get_user_by_email(self, email: str) -> User | None:
-        query = select(User).options(selectinload(User.role)).filter(User.email == email)
+        query = (
+            select(User).options(selectinload(User.role)).filter(User.email == email)
+        )
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
+    async def update_password_hash(self, user_id: int, password_hash: str) -> None:
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(password_hash=password_hash)
+        )
+        await self.session.flush()
 
-UserRepositoryDependency = Annotated[UserRepository, Depends(UserRepository)]
+    async def get_user_state(self, user_id: int) -> UserState | None:
+        """Read from the primary even in replica-routed requests: it keys ETags."""
+        query = (
+            select(User.data_version, User.timezone)
+            .filter(User.id == user_id)
+            .execution_options(**READ_PRIMARY)
+        )
+        row = (await self.session.execute(query)).one_or_none()
+        return UserState(*row) if row is not None else None
 
+    async def update_timezone(self, user_id: int, timezone: str) -> User | None:
+        user = await self.get_user_by_id(user_id)
+        if user is None or user.timezone == timezone:
+            return user
+        user.timezone = timezone
+        await self.session.flush([user])
+        # Rollup days, heatmap bits and streak periods are local calendar days, so they
+        # move with the zone
+        await rebuild_daily_rollups(self.session, user_id=user_id)
+        await rebuild_year_bitmaps(self.session, user_id=user_id)
+        await rebuild_streaks(self.session, user_id=user_id)
+        await bump_data_version(self.session, user_id)
+        await self.session.flush()
+        return await self.get_user_by_id(user_id)
+
+
+async def user_timezone(session: AsyncSession, user_id: int) -> str:
+    result = await session.execute(select(User.timezone).filter(User.id == user_id))
+    return result.scalar_one_or_none() or "UTC"
+
+
+async def bump_data_version(session: AsyncSession, user_id: int) -> None:
+    """Marks the user's habit data as changed. Call inside the write's transaction."""
+    await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+    )
+
+
+UserRepositoryDependency = Annotated[UserRepository, Depends(UserRepository)]
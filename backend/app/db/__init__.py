@@ -1,21 +1,68 @@
-from typing import Annotated
+from typing import Annotated, TypeAlias
 
-from fastapi import Depends
+from fastapi import Depends, Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.db import bucketing, functions
+from app.db.pool import engine_options
+from app.db.routing import RoutingSession, use_replica
 
-engine = create_async_engine(settings.DB_CONNECTION_STRING, connect_args={})
+engine = create_async_engine(
+    settings.DB_CONNECTION_STRING, **engine_options(settings.DB_CONNECTION_STRING)
+)
+replica_engine = (
+    create_async_engine(
+        settings.DB_REPLICA_CONNECTION_STRING,
+        **engine_options(settings.DB_REPLICA_CONNECTION_STRING),
+    )
+    if settings.DB_REPLICA_CONNECTION_STRING
+    else None
+)
 
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _register_sqlite_functions(dbapi_connection, _) -> None:
+    # Timezone bucketing and bitmap updates need Python-side helpers on SQLite
+    bucketing.register_sqlite_functions(dbapi_connection)
+    functions.register_sqlite_functions(dbapi_connection)
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        await db.close()
 
+for _engine in (engine, replica_engine):
+    if _engine is not None and _engine.dialect.name == "sqlite":
+        event.listen(_engine.sync_engine, "connect", _register_sqlite_functions)
 
-SessionContext = Annotated[AsyncSession, Depends(get_db)]
+SessionLocal = async_sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    sync_session_class=RoutingSession,
+    replica_bind=replica_engine.sync_engine if replica_engine is not None else None,
+)
+
+
+async def get_db(request: Request):
+    """The request's unit of work: one session shared by every repository and
+    dependency.
+
+    A connection is checked out at the first statement, not before, so requests
+    answered from caches never take one. Repositories only flush; the work is
+    committed once, after the endpoint has returned and its response has been
+    serialized, or rolled back if anything raised. The connection goes back to
+    the pool right after, before the response is sent.
+
+    GET requests may read from the replica; see app.db.routing.
+    """
+    async with SessionLocal() as session:
+        if request.method in ("GET", "HEAD"):
+            use_replica(session)
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+
+
+# FastAPI does not unwrap `type` statements, so this stays a TypeAlias
+SessionContext: TypeAlias = Annotated[AsyncSession, Depends(get_db)]  # noqa: UP040
@@ -0,0 +1,156 @@
+"""Time bucketing in the user's local timezone, pushed into SQL.
+
+Buckets come back from the database as ready-to-use local wall-clock values
+(`datetime` for hour buckets, `date` otherwise), so callers never reparse them.
+
+- Postgres: `date_trunc(unit, ts AT TIME ZONE tz)`.
+- SQLite has no named timezones, so `tz_trunc(unit, ts, tz)` is registered on
+  every connection as a Python function backed by zoneinfo. SQLite stores
+  timestamps without an offset; they are read as UTC, which is how the API
+  writes them.
+
+Weeks are truncated to Monday, as `date_trunc('week', ...)` does.
+"""
+
+import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, DateTime, literal_column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+BUCKET_UNITS = ("hour", "day", "week", "month", "year")
+
+
+def truncate(moment: datetime.datetime, unit: str) -> datetime.datetime:
+    """Python mirror of `date_trunc` for a naive local datetime."""
+    if unit == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return moment
+    if unit == "week":
+        return moment - datetime.timedelta(days=moment.weekday())
+    if unit == "month":
+        return moment.replace(day=1)
+    if unit == "year":
+        return moment.replace(month=1, day=1)
+    raise ValueError(f"Unknown bucket unit: {unit!r}")
+
+
+def local_now(timezone: str) -> datetime.datetime:
+    """Current time as an aware datetime in `timezone`."""
+    return datetime.datetime.now(ZoneInfo(timezone))
+
+
+def local_today(timezone: str) -> datetime.date:
+    return local_now(timezone).date()
+
+
+def local_day_bounds(
+    first_day: datetime.date, last_day: datetime.date, timezone: str
+) -> tuple[datetime.datetime, datetime.datetime]:
+    """UTC [start, end) covering local days first_day..last_day.
+
+    Filter raw timestamps with these instead of a per-row date cast, so an index
+    on the timestamp column can serve the range.
+    """
+    zone = ZoneInfo(timezone)
+    start = datetime.datetime.combine(first_day, datetime.time.min, tzinfo=zone)
+    end = datetime.datetime.combine(
+        last_day + datetime.timedelta(days=1), datetime.time.min, tzinfo=zone
+    )
+    return start.astimezone(datetime.UTC), end.astimezone(datetime.UTC)
+
+
+def _unit_clause(unit: str):
+    if unit not in BUCKET_UNITS:
+        raise ValueError(f"Unknown bucket unit: {unit!r}")
+    return literal_column(f"'{unit}'")
+
+
+class local_trunc(FunctionElement):
+    """Timestamp truncated to `unit` in `tz`, as a naive local datetime."""
+
+    type = DateTime()
+    name = "local_trunc"
+    inherit_cache = True
+
+    def __init__(self, unit: str, expr, tz, **kw):
+        super().__init__(_unit_clause(unit), expr, tz, **kw)
+
+
+class local_date(FunctionElement):
+    """Calendar date of a timestamp in `tz`."""
+
+    type = Date()
+    name = "local_date"
+    inherit_cache = True
+
+
+class trunc_date(FunctionElement):
+    """DATE truncated to the first day of its week, month or year."""
+
+    type = Date()
+    name = "trunc_date"
+    inherit_cache = True
+
+    def __init__(self, unit: str, expr, **kw):
+        super().__init__(_unit_clause(unit), expr, **kw)
+
+
+def _args(element, compiler, **kw) -> list[str]:
+    return [compiler.process(clause, **kw) for clause in element.clauses]
+
+
+@compiles(local_trunc, "postgresql")
+def _local_trunc_postgresql(element, compiler, **kw):
+    unit, expr, tz = _args(element, compiler, **kw)
+    return f"date_trunc({unit}, ({expr}) AT TIME ZONE {tz})"
+
+
+@compiles(local_trunc, "sqlite")
+def _local_trunc_sqlite(element, compiler, **kw):
+    unit, expr, tz = _args(element, compiler, **kw)
+    return f"tz_trunc({unit}, {expr}, {tz})"
+
+
+@compiles(local_date, "postgresql")
+def _local_date_postgresql(element, compiler, **kw):
+    expr, tz = _args(element, compiler, **kw)
+    return f"CAST(({expr}) AT TIME ZONE {tz} AS DATE)"
+
+
+@compiles(local_date, "sqlite")
+def _local_date_sqlite(element, compiler, **kw):
+    expr, tz = _args(element, compiler, **kw)
+    return f"date(tz_trunc('day', {expr}, {tz}))"
+
+
+@compiles(trunc_date, "postgresql")
+def _trunc_date_postgresql(element, compiler, **kw):
+    unit, expr = _args(element, compiler, **kw)
+    return f"CAST(date_trunc({unit}, {expr}) AS DATE)"
+
+
+@compiles(trunc_date, "sqlite")
+def _trunc_date_sqlite(element, compiler, **kw):
+    unit, expr = _args(element, compiler, **kw)
+    return f"date(tz_trunc({unit}, {expr}, 'UTC'))"
+
+
+def _sqlite_tz_trunc(unit: str, value: str | None, timezone: str) -> str | None:
+    if value is None:
+        return None
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.UTC)
+    local = moment.astimezone(ZoneInfo(timezone)).replace(tzinfo=None)
+    return truncate(local, unit).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def register_sqlite_functions(dbapi_connection) -> None:
+    """Installs the Python functions the SQLite compilations above rely on."""
+    dbapi_connection.create_function(
+        "tz_trunc", 3, _sqlite_tz_trunc, deterministic=True
+    )
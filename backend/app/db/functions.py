@@ -0,0 +1,89 @@
+"""Dialect-aware SQL expressions shared by the CRUD layer.
+
+We deploy on Postgres (asyncpg) but develop and test against SQLite, so anything
+that is not portable SQL is expressed as a custom construct compiled per dialect.
+Timezone-aware bucketing lives in `app.db.bucketing`.
+"""
+
+from sqlalchemy import Integer, LargeBinary
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class day_number(FunctionElement):
+    """Days since 1970-01-05 (a Monday) for a DATE expression.
+
+    Mirrors `app.core.schedule.day_number`: `// 7` is the week, `% 7` the
+    position in it with 0=Monday.
+    """
+
+    type = Integer()
+    name = "day_number"
+    inherit_cache = True
+
+
+@compiles(day_number)
+def _day_number_default(element, compiler, **kw):
+    return f"({compiler.process(element.clauses, **kw)} - DATE '1970-01-05')"
+
+
+@compiles(day_number, "sqlite")
+def _day_number_sqlite(element, compiler, **kw):
+    days = compiler.process(element.clauses, **kw)
+    return f"CAST(julianday({days}) - julianday('1970-01-05') AS INTEGER)"
+
+
+class get_byte(FunctionElement):
+    """`get_byte(bytes, n)`: byte n of a binary value as an integer."""
+
+    type = Integer()
+    name = "get_byte"
+    inherit_cache = True
+
+
+@compiles(get_byte)
+def _get_byte_default(element, compiler, **kw):
+    return f"get_byte({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(get_byte, "sqlite")
+def _get_byte_sqlite(element, compiler, **kw):
+    return f"get_byte_blob({compiler.process(element.clauses, **kw)})"
+
+
+class set_byte(FunctionElement):
+    """`set_byte(bytes, n, value)`: copy of a binary value with byte n replaced."""
+
+    type = LargeBinary()
+    name = "set_byte"
+    inherit_cache = True
+
+
+@compiles(set_byte)
+def _set_byte_default(element, compiler, **kw):
+    return f"set_byte({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(set_byte, "sqlite")
+def _set_byte_sqlite(element, compiler, **kw):
+    return f"set_byte_blob({compiler.process(element.clauses, **kw)})"
+
+
+def _sqlite_get_byte(value: bytes, n: int) -> int:
+    return value[n]
+
+
+def _sqlite_set_byte(value: bytes, n: int, byte: int) -> bytes:
+    data = bytearray(value)
+    data[n] = byte & 0xFF
+    return bytes(data)
+
+
+def register_sqlite_functions(dbapi_connection) -> None:
+    """Installs the Python functions the SQLite compilations above rely on."""
+    dbapi_connection.create_function(
+        "get_byte_blob", 2, _sqlite_get_byte, deterministic=True
+    )
+    dbapi_connection.create_function(
+        "set_byte_blob", 3, _sqlite_set_byte, deterministic=True
+    )
@@ -0,0 +1,130 @@
+"""Connection pool settings and checkout metrics for the async engines.
+
+Every engine gets a MeteredQueuePool sized by the DB_POOL_* settings. Each
+checkout is timed from the request for a connection until it is handed over,
+which covers waiting for a free one, opening a new one and the pre-ping, so
+a pool that is too small for the worker's concurrency shows up as wait time
+and timeouts here before it shows up as slow requests.
+
+With DB_PGBOUNCER_TRANSACTION_MODE, server-side prepared statements are not
+cached and get unique names, since consecutive transactions on one client
+connection can run on different server connections behind pgbouncer.
+"""
+
+import statistics
+import time
+import uuid
+from collections import deque
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection, QueuePool
+
+from app.core.config import settings
+
+RECENT_CHECKOUTS = 1000  # Checkout waits kept for the percentiles
+
+
+class PoolStats:
+    """Checkout counters of one engine, kept across pool recreation."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: deque[float] = deque(maxlen=RECENT_CHECKOUTS)
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self) -> QueuePool:
+        pool = super().recreate()
+        # dispose() swaps in a fresh pool of this class; the counters carry over
+        if isinstance(pool, MeteredQueuePool):
+            pool.stats = self.stats
+        return pool
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+
+def engine_options(url: str) -> dict:
+    """Keyword arguments for create_async_engine(url) from the DB_POOL_* settings."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        # An in-memory database lives in a single connection; keep SQLAlchemy's default
+        # pool
+        return {"connect_args": {}}
+    options = {
+        "poolclass": MeteredQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {},
+    }
+    if parsed.get_driver_name() == "asyncpg":
+        if settings.DB_PGBOUNCER_TRANSACTION_MODE:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        else:
+            options["connect_args"] = {
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+            }
+    return options
+
+
+def pool_metrics(engine: AsyncEngine) -> dict:
+    """Live gauges of the engine's pool plus its checkout counters (waits in ms)."""
+    pool = engine.pool
+    if not isinstance(pool, MeteredQueuePool):
+        return {"pool": type(pool).__name__}
+    stats = pool.stats
+    waits_ms = sorted(1000 * wait for wait in stats.recent_waits) or [0.0]
+    return {
+        "size": pool.size(),
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "wait_ms": {
+            "mean": round(1000 * stats.total_wait / stats.checkouts, 3)
+            if stats.checkouts
+            else 0.0,
+            "p50": round(statistics.median(waits_ms), 3),
+            "p99": round(
+                statistics.quantiles(waits_ms, n=100, method="inclusive")[98], 3
+            )
+            if len(waits_ms) > 1
+            else round(waits_ms[0], 3),
+            "max": round(1000 * stats.max_wait, 3),
+        },
+    }
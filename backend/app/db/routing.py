@@ -0,0 +1,116 @@
+"""Sends the reads of GET requests to a read replica when one is configured.
+
+A request's session reads from DB_REPLICA_CONNECTION_STRING only when all of
+these hold; everything else, including every write, uses the primary:
+
+- the request is a GET (or HEAD), see `use_replica`;
+- the user is known (`bind_user`), so authentication itself, and with it the
+  principal cache, always reads the primary;
+- the statement is a SELECT without the READ_PRIMARY execution option, which
+  reads that must see the latest commit (and locking reads) carry;
+- the session hasn't written yet; after its first write it stays on the
+  primary, including for reads;
+- the user hasn't written through this process in the last
+  DB_REPLICA_STICKY_SECONDS, and the replica has caught up with the user's
+  data_version wherever `require_version` checks it (every endpoint that
+  depends on get_current_user_state does).
+
+To try it with two SQLite files or two Postgres instances, see
+`python -m app.core.replica_check`.
+"""
+
+from sqlalchemy import Engine, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.auth_cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+
+READ_PRIMARY = {
+    "read_primary": True
+}  # execution_options(**READ_PRIMARY) pins a statement to the primary
+
+recent_writers: TTLCache[bool] = TTLCache(settings.DB_REPLICA_STICKY_MAX_USERS)
+
+
+class RoutingSession(Session):
+    """Session that picks the primary or the replica engine per statement."""
+
+    def __init__(self, *args, replica_bind: Engine | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_bind = replica_bind
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        # Flushes ask without a clause; DML, DDL and raw SQL aren't selects
+        if clause is None or not getattr(clause, "is_select", False):
+            self.info["wrote"] = True
+        elif (
+            self.replica_bind is not None
+            and self.may_read_replica()
+            and not clause.get_execution_options().get("read_primary", False)
+        ):
+            return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    def may_read_replica(self) -> bool:
+        user_id = self.info.get("user_id")
+        return (
+            self.replica_bind is not None
+            and self.info.get("use_replica", False)
+            and user_id is not None
+            and not self.info.get("wrote", False)
+            and not self.info.get("replica_behind", False)
+            and recent_writers.get(user_id) is None
+        )
+
+
+def use_replica(session: AsyncSession, user_id: int | None = None) -> None:
+    """Lets the session read from the replica once its user is known."""
+    session.info["use_replica"] = True
+    if user_id is not None:
+        bind_user(session, user_id)
+
+
+def bind_user(session: AsyncSession, user_id: int) -> None:
+    session.info["user_id"] = user_id
+
+
+def may_read_replica(session: AsyncSession) -> bool:
+    sync_session = session.sync_session
+    return isinstance(sync_session, RoutingSession) and sync_session.may_read_replica()
+
+
+async def require_version(
+    session: AsyncSession, user_id: int, data_version: int
+) -> None:
+    """Keeps the session on the primary unless the replica has reached the user's
+    `data_version`.
+
+    Costs one primary-key read on the replica, and nothing when the session
+    can't read from it anyway.
+    """
+    if not may_read_replica(session):
+        return
+    replica_version = await session.scalar(
+        select(User.data_version).filter(User.id == user_id)
+    )
+    if replica_version is None or replica_version < data_version:
+        session.info["replica_behind"] = True
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _flushing(session: Session, flush_context, instances) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session: Session) -> None:
+    user_id = session.info.get("user_id")
+    if session.info.pop("wrote", False) and user_id is not None:
+        recent_writers.put(user_id, True, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_writes(session: Session) -> None:
+    session.info.pop("wrote", None)
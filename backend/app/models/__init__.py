@@ -1,7 +1,16 @@
 from app.models.base import Base, IdBase, TimestampMixin
-from app.models.user import User
+from app.models.habit import (
+    Habit,
+    HabitCategory,
+    HabitDailyRollup,
+    HabitTrackingLog,
+    HabitYearBitmap,
+)
+from app.models.import_job import ImportJob, ImportJobStatus
 from app.models.role import Role
-from app.models.habit import HabitCategory, Habit, HabitTrackingLog
+from app.models.streak import HabitStreak, UserStreak
+from app.models.sync import SyncClientId, SyncTombstone
+from app.models.user import User
 
 __all__ = [
     "Base",
@@ -12,4 +21,12 @@ __all__ = [
     "HabitCategory",
     "Habit",
     "HabitTrackingLog",
-]
\ No newline at end of file
+    "HabitDailyRollup",
+    "HabitYearBitmap",
+    "HabitStreak",
+    "UserStreak",
+    "ImportJob",
+    "ImportJobStatus",
+    "SyncClientId",
+    "SyncTombstone",
+]
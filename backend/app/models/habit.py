@@ -1,61 +1,201 @@
-import enum
 import datetime
-from sqlalchemy import String, Integer, ForeignKey, Time, Boolean, Enum as SQLAlchemyEnum, DateTime
+import enum
+import uuid
+
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    PrimaryKeyConstraint,
+    String,
+    UniqueConstraint,
+    Uuid,
+)
+from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models.base import IdBase, TimestampMixin # Use IdBase and TimestampMixin
+from app.models.base import (  # Use IdBase and TimestampMixin
+    Base,
+    IdBase,
+    TimestampMixin,
+)
+
 
 class FrequencyType(enum.Enum):
     DAILY = "daily"
     WEEKLY = "weekly"
 
+
 class HabitCategory(IdBase, TimestampMixin):
     __tablename__ = "habit_categories"
+    __table_args__ = (
+        Index("ix_habit_categories_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_habit_categories_user_id_name", "user_id", "name"),
+    )
 
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     color: Mapped[str | None] = mapped_column(String(50), nullable=True)
 
     user = relationship("User", back_populates="habit_categories")
-    habits = relationship("Habit", back_populates="category", cascade="all, delete-orphan")
+    habits = relationship(
+        "Habit", back_populates="category", cascade="all, delete-orphan"
+    )
 
     def __repr__(self):
         return f"<HabitCategory {self.name}>"
 
+
 class Habit(IdBase, TimestampMixin):
     __tablename__ = "habits"
+    __table_args__ = (
+        Index("ix_habits_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_habits_user_id_name", "user_id", "name"),
+        Index("ix_habits_category_id", "category_id"),
+    )
 
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     icon: Mapped[str | None] = mapped_column(String(50), nullable=True)
-    frequency_type: Mapped[FrequencyType] = mapped_column(SQLAlchemyEnum(FrequencyType), default=FrequencyType.DAILY, nullable=False)
+    frequency_type: Mapped[FrequencyType] = mapped_column(
+        SQLAlchemyEnum(FrequencyType), default=FrequencyType.DAILY, nullable=False
+    )
     target_times: Mapped[int | None] = mapped_column(Integer, nullable=True)
     days_of_week: Mapped[str] = mapped_column(String, default="[]", nullable=True)
     times_of_day: Mapped[str] = mapped_column(String, default="[]", nullable=True)
     reminder_on: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     streak_goal: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    category_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("habit_categories.id"), nullable=True)
+    category_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("habit_categories.id"), nullable=True
+    )
 
     user = relationship("User", back_populates="habits")
     category = relationship("HabitCategory", back_populates="habits", lazy="joined")
-    tracking_logs = relationship("HabitTrackingLog", back_populates="habit", cascade="all, delete-orphan", lazy="selectin")
+    tracking_logs = relationship(
+        "HabitTrackingLog",
+        back_populates="habit",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
 
     def __repr__(self):
         return f"<Habit {self.name}>"
 
+
 class HabitTrackingLog(IdBase, TimestampMixin):
+    # On Postgres this table is partitioned by month of logged_datetime (see
+    # app.core.partitions), so its unique constraints carry logged_datetime too
     __tablename__ = "habit_tracking_logs"
+    __table_args__ = (
+        # Replayed offline writes upsert against this, so a retry can't duplicate a log
+        UniqueConstraint(
+            "user_id",
+            "client_id",
+            "logged_datetime",
+            name="uq_habit_tracking_logs_user_id_client_id_logged_datetime",
+        ),
+        Index("ix_habit_tracking_logs_user_id_updated_at", "user_id", "updated_at"),
+        # Keyset pages of a habit's logs and of the user's feed, newest first
+        Index(
+            "ix_habit_tracking_logs_habit_id_logged_datetime_id",
+            "habit_id",
+            "logged_datetime",
+            "id",
+        ),
+        Index(
+            "ix_habit_tracking_logs_user_id_logged_datetime_id",
+            "user_id",
+            "logged_datetime",
+            "id",
+        ),
+    )
 
-    habit_id: Mapped[int] = mapped_column(Integer, ForeignKey("habits.id"), nullable=False)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    habit_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("habits.id"), nullable=False
+    )
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
     # logged_datetime is distinct from created_at (when the log entry was made)
     # and represents the actual time the habit was performed or intended to be performed.
-    logged_datetime: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    logged_datetime: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
     completed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    progress: Mapped[int | None] = mapped_column(Integer, nullable=True) # Optional, e.g., for habits like 'read 50 pages'
+    progress: Mapped[int | None] = mapped_column(
+        Integer, nullable=True
+    )  # Optional, e.g., for habits like 'read 50 pages'
+    client_id: Mapped[uuid.UUID | None] = mapped_column(
+        Uuid, nullable=True
+    )  # Generated by the client for logs written offline
 
     habit = relationship("Habit", back_populates="tracking_logs", lazy="joined")
     user = relationship("User", back_populates="habit_tracking_logs")
 
     def __repr__(self):
         return f"<HabitTrackingLog habit_id={self.habit_id} at {self.logged_datetime}>"
+
+
+class HabitDailyRollup(Base):
+    """Per-day aggregate of a habit's tracking logs.
+
+    Maintained incrementally by HabitTrackingLogRepository in the same transaction
+    as the log write, so analytics can read one row per habit-day instead of
+    rescanning raw logs. `completions` counts log entries, matching how analytics
+    has always counted them. For days before the owner's `logs_archived_before`
+    the raw logs have been archived (app.core.archive) and the rollup is kept as is.
+    """
+
+    __tablename__ = "habit_daily_rollups"
+    __table_args__ = (
+        # (user_id, day) leads so a user's window is a single range scan
+        PrimaryKeyConstraint("user_id", "day", "habit_id"),
+        Index("ix_habit_daily_rollups_habit_id_day", "habit_id", "day"),
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
+    habit_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("habits.id"), nullable=False
+    )
+    day: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    completions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    progress_sum: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<HabitDailyRollup habit_id={self.habit_id} day={self.day} "
+            f"completions={self.completions}>"
+        )
+
+
+class HabitYearBitmap(Base):
+    """One bit per local calendar day of a year: set when the habit has any log that
+    day.
+
+    Bit n (least significant bit first within each byte) is day n of the year,
+    0-based, so 366 days fit in 46 bytes. Maintained alongside the daily rollup.
+    """
+
+    __tablename__ = "habit_year_bitmaps"
+
+    habit_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("habits.id"), primary_key=True
+    )
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), index=True, nullable=False
+    )
+    bits: Mapped[bytes] = mapped_column(LargeBinary(46), nullable=False)
+
+    def __repr__(self):
+        return f"<HabitYearBitmap habit_id={self.habit_id} year={self.year}>"
@@ -0,0 +1,51 @@
+import datetime
+import enum
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import IdBase, TimestampMixin
+
+
+class ImportJobStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ImportJob(IdBase, TimestampMixin):
+    """A bulk tracking-log import and its progress.
+
+    `rows_processed` counts data rows of the upload already committed, so a
+    resumed job skips exactly those and continues.
+    """
+
+    __tablename__ = "import_jobs"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), index=True, nullable=False
+    )
+    format: Mapped[str] = mapped_column(String(10), nullable=False)
+    status: Mapped[ImportJobStatus] = mapped_column(
+        SQLAlchemyEnum(ImportJobStatus), default=ImportJobStatus.PENDING, nullable=False
+    )
+    rows_processed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rows_inserted: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rows_skipped: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )  # Already present
+    rows_failed: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )  # Invalid or not the user's habit
+    elapsed_seconds: Mapped[float] = mapped_column(
+        Float, default=0.0, nullable=False
+    )  # Time spent loading
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    finished_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.status.value}>"
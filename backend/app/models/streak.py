@@ -0,0 +1,44 @@
+import datetime
+
+from sqlalchemy import Date, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class StreakStateMixin:
+    # Streak lengths count schedule periods (days, scheduled weekdays or weeks)
+    current_streak: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    longest_streak: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_completed_day: Mapped[datetime.date | None] = mapped_column(
+        Date, nullable=True
+    )
+
+
+class HabitStreak(StreakStateMixin, Base):
+    """Streak state of one habit, updated on each tracking-log write."""
+
+    __tablename__ = "habit_streaks"
+
+    habit_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("habits.id"), primary_key=True
+    )
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), index=True, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<HabitStreak habit_id={self.habit_id} current={self.current_streak}>"
+
+
+class UserStreak(StreakStateMixin, Base):
+    """Overall day streak of a user: consecutive days with at least one log."""
+
+    __tablename__ = "user_streaks"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), primary_key=True
+    )
+
+    def __repr__(self):
+        return f"<UserStreak user_id={self.user_id} current={self.current_streak}>"
@@ -0,0 +1,58 @@
+import datetime
+import uuid
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Uuid, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base, IdBase
+
+
+class SyncTombstone(IdBase):
+    """Records a deleted habit, category or tracking log for the changes feed.
+
+    Deleting a habit records only the habit; its logs go with it. Tombstones older
+    than SYNC_TOMBSTONE_DAYS are pruned, and cursors that old must resync in full.
+    """
+
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+        Index("ix_sync_tombstones_user_id_client_id", "user_id", "client_id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
+    entity: Mapped[str] = mapped_column(
+        String(20), nullable=False
+    )  # "habit", "category" or "log"
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    client_id: Mapped[uuid.UUID | None] = mapped_column(
+        Uuid, nullable=True
+    )  # Logs created through sync
+    deleted_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self):
+        return f"<SyncTombstone {self.entity} {self.entity_id}>"
+
+
+class SyncClientId(Base):
+    """Claims the client id of a log created through sync, once per user.
+
+    What makes a queued create safe to replay: the tracking log table is
+    partitioned by logged_datetime, so its own client id constraint has to
+    include it and can't stop a second copy. A key outlives its log, so a
+    replay of a deleted or archived log's create doesn't bring it back.
+    """
+
+    __tablename__ = "sync_client_ids"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), primary_key=True
+    )
+    client_id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True)
+
+    def __repr__(self):
+        return f"<SyncClientId {self.user_id} {self.client_id}>"
@@ -1,8 +1,11 @@
-from sqlalchemy import String, Integer, ForeignKey, Boolean
+import datetime
+
+from sqlalchemy import BigInteger, Boolean, Date, ForeignKey, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import IdBase, TimestampMixin
 
+
 class User(IdBase, TimestampMixin):
     __tablename__ = "users"
 
@@ -10,15 +13,36 @@ class User(IdBase, TimestampMixin):
     password_hash: Mapped[str] = mapped_column(String, nullable=False)
     full_name: Mapped[str | None] = mapped_column(String, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
-    role_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("roles.id"), nullable=True)
+    role_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("roles.id"), nullable=True
+    )
+    # Bumped in the same transaction as every change to the user's habit data;
+    # keys the analytics cache so stale entries are never served after a write
+    data_version: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False
+    )
+    # IANA zone name; day, week and month boundaries in rollups, streaks and analytics
+    # follow it
+    timezone: Mapped[str] = mapped_column(
+        String(64), default="UTC", server_default="UTC", nullable=False
+    )
+    # Local days before this have had their raw logs archived; their daily rollups are
+    # the only record left
+    logs_archived_before: Mapped[datetime.date | None] = mapped_column(
+        Date, nullable=True
+    )
 
     # Relationships
     role = relationship("Role", back_populates="users")
     # Forward references for HabitCategory and Habit as they will be defined in another file
     # and imported in __init__.py to resolve circular dependencies if any.
-    habit_categories = relationship("HabitCategory", back_populates="user", cascade="all, delete-orphan")
+    habit_categories = relationship(
+        "HabitCategory", back_populates="user", cascade="all, delete-orphan"
+    )
     habits = relationship("Habit", back_populates="user", cascade="all, delete-orphan")
-    habit_tracking_logs = relationship("HabitTrackingLog", back_populates="user", cascade="all, delete-orphan")
+    habit_tracking_logs = relationship(
+        "HabitTrackingLog", back_populates="user", cascade="all, delete-orphan"
+    )
 
     def __repr__(self):
         return f"<User {self.email}>"
@@ -1,14 +1,39 @@
 from app.schemas.base import IdSchema, TimestampSchema
-from app.schemas.role import Role, RoleCreate, RoleUpdate
-from app.schemas.user import User, UserCreate, UserUpdate, UserInDB
 from app.schemas.habit import (
-    HabitCategory, HabitCategoryCreate, HabitCategoryUpdate,
-    Habit, HabitCreate, HabitUpdate,
-    HabitTrackingLog, HabitTrackingLogCreate, HabitTrackingLogUpdate,
-    FrequencyType, # Exporting Enum as it's used in schemas
-    HabitDailyStat, HabitStatistics # Added for statistics feature
+    FrequencyType,  # Exporting Enum as it's used in schemas
+    Habit,
+    HabitCategory,
+    HabitCategoryCreate,
+    HabitCategoryUpdate,
+    HabitCreate,
+    HabitDailyStat,  # Added for statistics feature
+    HabitHeatmap,
+    HabitStatistics,
+    HabitStreakInfo,
+    HabitSummary,
+    HabitTrackingLog,
+    HabitTrackingLogBatchCreate,
+    HabitTrackingLogCreate,
+    HabitTrackingLogPage,
+    HabitTrackingLogUpdate,
+    HabitUpdate,
+    StreakInfo,
+    StreakOverview,
+    YearHeatmap,
+)
+from app.schemas.import_job import ImportJob, ImportJobStatus
+from app.schemas.role import Role, RoleCreate, RoleUpdate
+from app.schemas.sync import (
+    SyncChanges,
+    SyncHabit,
+    SyncLogBatch,
+    SyncLogOperation,
+    SyncLogResponse,
+    SyncLogResult,
+    SyncTombstone,
 )
 from app.schemas.token import Token, TokenData
+from app.schemas.user import User, UserCreate, UserInDB, UserTimezoneUpdate, UserUpdate
 
 __all__ = [
     # Base Schemas
@@ -22,6 +47,7 @@ __all__ = [
     "User",
     "UserCreate",
     "UserUpdate",
+    "UserTimezoneUpdate",
     "UserInDB",
     # Habit Schemas
     "HabitCategory",
@@ -30,13 +56,32 @@ __all__ = [
     "Habit",
     "HabitCreate",
     "HabitUpdate",
+    "HabitSummary",
     "HabitTrackingLog",
     "HabitTrackingLogCreate",
+    "HabitTrackingLogBatchCreate",
     "HabitTrackingLogUpdate",
+    "HabitTrackingLogPage",
     "FrequencyType",
     "HabitDailyStat",
     "HabitStatistics",
+    "StreakInfo",
+    "HabitStreakInfo",
+    "StreakOverview",
+    "HabitHeatmap",
+    "YearHeatmap",
     # Token Schemas
     "Token",
     "TokenData",
+    # Import Schemas
+    "ImportJob",
+    "ImportJobStatus",
+    # Sync Schemas
+    "SyncLogOperation",
+    "SyncLogBatch",
+    "SyncLogResult",
+    "SyncLogResponse",
+    "SyncHabit",
+    "SyncTombstone",
+    "SyncChanges",
 ]
@@ -1,54 +1,73 @@
-from pydantic import BaseModel
-from typing import List, Optional, Union, Dict, Any
+import datetime
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
 
 # --- Schemas for Chart Datasets ---
 class ChartDataset(BaseModel):
     label: str
-    data: List[Union[int, float]]
-    borderColor: Optional[str] = None
-    backgroundColor: Optional[str] = None
-    fill: Optional[bool] = None # For area charts, if needed
+    data: list[int | float]
+    borderColor: str | None = None
+    backgroundColor: str | None = None
+    fill: bool | None = None  # For area charts, if needed
+
 
 class PieChartDataset(BaseModel):
-    label: Optional[str] = None # Often not needed for single dataset pie charts
-    data: List[Union[int, float]]
-    backgroundColor: List[str]
-    borderColor: Optional[List[str]] = None
-    borderWidth: Optional[int] = 1
+    label: str | None = None  # Often not needed for single dataset pie charts
+    data: list[int | float]
+    backgroundColor: list[str]
+    borderColor: list[str] | None = None
+    borderWidth: int | None = 1
+
 
 # --- Schemas for Analytics Page Sections ---
 class SummaryStats(BaseModel):
     total_completions: int
-    day_streak: int # Note: Complex to calculate accurately, may be simplified
+    day_streak: int  # Note: Complex to calculate accurately, may be simplified
     avg_per_habit: float
     active_habits: int
 
+
 class HabitProgressData(BaseModel):
-    labels: List[str] # e.g., dates or time periods
-    datasets: List[ChartDataset]
+    labels: list[str]  # e.g., dates or time periods
+    datasets: list[ChartDataset]
+    granularity: str | None = None  # Bucket unit: hour, day, week or month
+    total_points: int | None = None  # Buckets in the range before downsampling
+
 
 class CategoryDistributionData(BaseModel):
-    labels: List[str] # Category names
-    datasets: List[PieChartDataset]
+    labels: list[str]  # Category names
+    datasets: list[PieChartDataset]
+
 
 class HabitPerformanceItem(BaseModel):
-    id: str # Habit ID
+    id: str  # Habit ID
     name: str
     percentage: float
-    color: Optional[str] = None # Frontend might handle colors
-    # Optional: raw counts for more details
-    # completions: int
-    # target: int 
+    color: str | None = None  # Frontend might handle colors
+    # Raw counts behind the percentage
+    completions: int | None = None
+    target: float | None = None  # Expected completions for the period so far
+
 
 # --- Main Analytics Response Schema ---
 class AnalyticsResponse(BaseModel):
     summary_stats: SummaryStats
     habit_progress: HabitProgressData
     category_distribution: CategoryDistributionData
-    habit_performance: List[HabitPerformanceItem]
+    habit_performance: list[HabitPerformanceItem]
+
 
 # --- Request Query Parameters Schema (Optional but good practice) ---
 class AnalyticsFilters(BaseModel):
-    time_period: str = "Month" # e.g., Day, Week, Month, Year
-    habit_id: Optional[str] = None # For filtering by a specific habit, 'all' or None for all habits
+    time_period: str = "Month"  # e.g., Day, Week, Month, Year
+    habit_id: str | None = None
+    # Custom range (inclusive local dates); overrides time_period when given
+    start: datetime.date | None = None
+    end: datetime.date | None = None
+    granularity: Literal["hour", "day", "week", "month"] | None = None
+    max_points: int | None = Field(
+        default=None, ge=3, le=5000
+    )  # Downsample the chart beyond this
     # category_id: Optional[str] = None # Future: filter by category
@@ -1,21 +1,26 @@
 import datetime
-from typing import Optional, List
+import uuid
 
-from pydantic import Field # Added import for Field
+from pydantic import Field  # Added import for Field
+
+from app.models.habit import FrequencyType  # Enum for frequency_type
 from app.schemas.base import CustomBaseModel, IdSchema, TimestampSchema
-from app.models.habit import FrequencyType # Enum for frequency_type
+
 
 # --- HabitCategory Schemas --- #
 class HabitCategoryBase(CustomBaseModel):
     name: str
-    color: Optional[str] = None
+    color: str | None = None
+
 
 class HabitCategoryCreate(HabitCategoryBase):
     pass
 
+
 class HabitCategoryUpdate(CustomBaseModel):
-    name: Optional[str] = None
-    color: Optional[str] = None
+    name: str | None = None
+    color: str | None = None
+
 
 class HabitCategory(HabitCategoryBase, IdSchema, TimestampSchema):
     user_id: int
@@ -23,66 +28,134 @@ class HabitCategory(HabitCategoryBase, IdSchema, TimestampSchema):
     class Config:
         from_attributes = True
 
+
 # --- Habit Schemas --- #
 class HabitBase(CustomBaseModel):
     name: str
-    icon: Optional[str] = None
+    icon: str | None = None
     frequency_type: FrequencyType = FrequencyType.DAILY
-    target_times: Optional[int] = None # Updated: Now optional, default handled by model or logic
-    days_of_week: Optional[str] = None # Added: For weekly habits, JSON string array of day numbers
-    times_of_day: Optional[str] = None # Added: For daily habits, JSON string array of times
-    reminder_on: bool = False # Updated: Default to False
-    streak_goal: Optional[int] = None
-    category_id: Optional[int] = None
+    target_times: int | None = (
+        None  # Updated: Now optional, default handled by model or logic
+    )
+    days_of_week: str | None = (
+        None  # Added: For weekly habits, JSON string array of day numbers
+    )
+    times_of_day: str | None = (
+        None  # Added: For daily habits, JSON string array of times
+    )
+    reminder_on: bool = False  # Updated: Default to False
+    streak_goal: int | None = None
+    category_id: int | None = None
+
 
 class HabitCreate(HabitBase):
     pass
 
+
 class HabitUpdate(CustomBaseModel):
-    name: Optional[str] = None
-    icon: Optional[str] = None
-    frequency_type: Optional[FrequencyType] = None
-    target_times: Optional[int] = None
-    days_of_week: Optional[str] = None # Added
-    times_of_day: Optional[str] = None # Added
-    reminder_on: Optional[bool] = None
-    streak_goal: Optional[int] = None
-    category_id: Optional[int] = None
+    name: str | None = None
+    icon: str | None = None
+    frequency_type: FrequencyType | None = None
+    target_times: int | None = None
+    days_of_week: str | None = None  # Added
+    times_of_day: str | None = None  # Added
+    reminder_on: bool | None = None
+    streak_goal: int | None = None
+    category_id: int | None = None
+
 
 class Habit(HabitBase, IdSchema, TimestampSchema):
     user_id: int
-    category: Optional[HabitCategory] = None  # Nested category info
-    tracking_logs: List['HabitTrackingLog'] = []
+    category: HabitCategory | None = None  # Nested category info
+    tracking_logs: list["HabitTrackingLog"] = []
+
+
+class HabitSummary(HabitBase, IdSchema, TimestampSchema):
+    user_id: int
+    category: HabitCategory | None = None
+    last_logged_at: datetime.datetime | None = None
+    today_count: int = 0  # Logs today, in the user's timezone
+    current_period_completions: int = (
+        0  # Logs in the habit's current period (today, or this Monday-based week)
+    )
+    tracking_logs: list["HabitTrackingLog"] | None = None  # Only with include=logs
+
 
 # --- HabitTrackingLog Schemas --- #
 class HabitTrackingLogBase(CustomBaseModel):
     logged_datetime: datetime.datetime = Field(..., alias="logged_at")
     completed: bool = False
-    progress: Optional[int] = None
+    progress: int | None = None
+
 
 class HabitTrackingLogCreate(HabitTrackingLogBase):
     habit_id: int
 
+
+class HabitTrackingLogBatchCreate(CustomBaseModel):
+    logs: list[HabitTrackingLogCreate] = Field(..., min_length=1, max_length=500)
+
+
 class HabitTrackingLogUpdate(CustomBaseModel):
-    logged_datetime: Optional[datetime.datetime] = None
-    completed: Optional[bool] = None
-    progress: Optional[int] = None
+    logged_datetime: datetime.datetime | None = None
+    completed: bool | None = None
+    progress: int | None = None
+
 
 class HabitTrackingLog(HabitTrackingLogBase, IdSchema, TimestampSchema):
     habit_id: int
+    client_id: uuid.UUID | None = None
 
     class Config:
         from_attributes = True
 
 
+class HabitTrackingLogPage(CustomBaseModel):
+    items: list[HabitTrackingLog]  # Newest first
+    next_cursor: str | None = None  # Older logs
+    prev_cursor: str | None = None  # Newer logs
+
+
 # --- Habit Statistics Schemas --- #
 class HabitDailyStat(CustomBaseModel):
     date: datetime.date
-    value: int # Could be count of logs, or sum of progress if applicable
+    value: int  # Could be count of logs, or sum of progress if applicable
+
 
 class HabitStatistics(CustomBaseModel):
     total_completions: int
     # avg_completion_percentage: float # This might be better calculated on frontend based on current target
-    daily_stats: List[HabitDailyStat]
+    daily_stats: list[HabitDailyStat]
     # Potentially add start_date, end_date if needed for context
 
+
+# --- Streak Schemas --- #
+class StreakInfo(CustomBaseModel):
+    current_streak: int  # In schedule periods: days, scheduled weekdays or weeks
+    longest_streak: int
+    last_completed_day: datetime.date | None = None
+
+
+class HabitStreakInfo(StreakInfo):
+    habit_id: int
+
+
+class StreakOverview(CustomBaseModel):
+    overall: StreakInfo  # Consecutive days with at least one log
+    habits: list[HabitStreakInfo]
+
+
+# --- Heatmap Schemas --- #
+# Bitmaps are base64 of 46 bytes: bit n (least significant first within each
+# byte) is day n of the year, 0-based, and is set if the habit was logged that day.
+class HabitHeatmap(CustomBaseModel):
+    habit_id: int
+    days_completed: int
+    bitmap: str
+
+
+class YearHeatmap(CustomBaseModel):
+    year: int
+    days_in_year: int
+    any_habit: str  # Bitmap of days with at least one habit logged
+    habits: list[HabitHeatmap]
@@ -0,0 +1,26 @@
+import datetime
+
+from pydantic import computed_field
+
+from app.models.import_job import ImportJobStatus
+from app.schemas.base import IdSchema, TimestampSchema
+
+
+class ImportJob(IdSchema, TimestampSchema):
+    format: str
+    status: ImportJobStatus
+    rows_processed: int
+    rows_inserted: int
+    rows_skipped: int  # Already present
+    rows_failed: int  # Invalid, or not one of the user's habits
+    elapsed_seconds: float
+    last_error: str | None = None
+    finished_at: datetime.datetime | None = None
+
+    @computed_field
+    @property
+    def rows_per_second(self) -> float:
+        # Throughput over the time spent loading, so pauses between resumes don't count
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return round(self.rows_processed / self.elapsed_seconds, 1)
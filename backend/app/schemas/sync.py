@@ -0,0 +1,72 @@
+import datetime
+import uuid
+from typing import Literal
+
+from pydantic import Field, model_validator
+
+from app.schemas.base import CustomBaseModel, IdSchema, TimestampSchema
+from app.schemas.habit import HabitBase, HabitCategory, HabitTrackingLog
+
+
+class SyncLogOperation(CustomBaseModel):
+    client_id: uuid.UUID
+    op: Literal["create", "update", "delete"]
+    habit_id: int | None = None  # Required for create
+    logged_datetime: datetime.datetime | None = Field(
+        None, alias="logged_at"
+    )  # Required for create
+    completed: bool | None = None
+    progress: int | None = None
+
+    @model_validator(mode="after")
+    def check_create_fields(self) -> "SyncLogOperation":
+        if self.op == "create" and (
+            self.habit_id is None or self.logged_datetime is None
+        ):
+            raise ValueError("create operations need habit_id and logged_at")
+        return self
+
+
+class SyncLogBatch(CustomBaseModel):
+    # In the order the client queued them
+    operations: list[SyncLogOperation] = Field(..., min_length=1, max_length=500)
+
+
+class SyncLogResult(CustomBaseModel):
+    client_id: uuid.UUID
+    op: Literal["create", "update", "delete"]
+    # duplicate: the create was already applied by an earlier attempt
+    # not_found: nothing to update or delete, e.g. a replayed delete
+    # rejected: the habit is not one of the user's
+    status: Literal[
+        "created", "updated", "deleted", "duplicate", "not_found", "rejected"
+    ]
+    log: HabitTrackingLog | None = None
+
+
+class SyncLogResponse(CustomBaseModel):
+    results: list[SyncLogResult]
+
+
+# --- Changes Feed Schemas --- #
+class SyncHabit(HabitBase, IdSchema, TimestampSchema):
+    # Habit without its nested category and logs; those come in their own lists
+    user_id: int
+
+
+class SyncTombstone(CustomBaseModel):
+    entity: Literal[
+        "habit", "category", "log"
+    ]  # A deleted habit takes its logs with it
+    id: int = Field(..., validation_alias="entity_id")
+    client_id: uuid.UUID | None = None
+    deleted_at: datetime.datetime
+
+
+class SyncChanges(CustomBaseModel):
+    cursor: str  # Pass as `since` on the next call
+    has_more: bool  # More changes are waiting; fetch the next page right away
+    habits: list[SyncHabit]
+    categories: list[HabitCategory]
+    logs: list[HabitTrackingLog]
+    deleted: list[SyncTombstone]
@@ -1,34 +1,58 @@
-from typing import Optional
+from typing import Annotated
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from pydantic import EmailStr, Field
+from pydantic import AfterValidator, EmailStr, Field
 
 from app.schemas.base import CustomBaseModel, IdSchema, TimestampSchema
 from app.schemas.role import Role  # For nesting in User response
 
+
+def _check_timezone(value: str) -> str:
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise ValueError(f"Unknown timezone: {value}") from exc
+    return value
+
+
+# IANA timezone name, e.g. "Europe/Berlin"
+TimeZoneName = Annotated[str, AfterValidator(_check_timezone)]
+
+
 # Base schema for User, common attributes
 class UserBase(CustomBaseModel):
     email: EmailStr
-    full_name: Optional[str] = None
-    is_active: Optional[bool] = True
+    full_name: str | None = None
+    is_active: bool | None = True
+    timezone: TimeZoneName = "UTC"
+
 
 # Schema for creating a User (inherits from UserBase)
 class UserCreate(UserBase):
     password: str = Field(min_length=8)
-    full_name: Optional[str] = None
-    role_id: Optional[int] = None # Optional: assign a default role if not provided
+    full_name: str | None = None
+    role_id: int | None = None  # Optional: assign a default role if not provided
+
 
 # Schema for updating a User (all fields optional)
 class UserUpdate(CustomBaseModel):
-    email: Optional[EmailStr] = None
-    is_active: Optional[bool] = None
-    role_id: Optional[int] = None
+    email: EmailStr | None = None
+    is_active: bool | None = None
+    role_id: int | None = None
     # Password updates should be handled by a separate dedicated endpoint for security
 
+
+# Schema for changing the current user's timezone
+class UserTimezoneUpdate(CustomBaseModel):
+    timezone: TimeZoneName
+
+
 # Schema for representing a User in API responses (includes ID, timestamps, and Role info)
 class User(UserBase, IdSchema, TimestampSchema):
-    role: Optional[Role] = None # Nested Role schema
+    role: Role | None = None  # Nested Role schema
+
 
 # Schema for user in DB (includes password_hash)
 class UserInDB(UserBase, IdSchema, TimestampSchema):
     password_hash: str
-    role_id: Optional[int] = None
+    role_id: int | None = None
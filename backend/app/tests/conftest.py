@@ -0,0 +1,42 @@
+"""Shared fixtures.
+
+Tests run on SQLite, like local development: each test gets a fresh database
+file with the app's tables and SQL helper functions. Async tests use anyio's
+pytest plugin (`pytestmark = pytest.mark.anyio`).
+"""
+import os
+
+# Settings are read at import time; tests never touch the configured database
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DB_CONNECTION_STRING", "sqlite+aiosqlite:///:memory:")
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db import _register_sqlite_functions
+from app.models import Base, User
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.sqlite'}")
+    event.listen(engine.sync_engine, "connect", _register_sqlite_functions)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+async def user(session: AsyncSession) -> User:
+    user = User(email="test@example.com", password_hash="x")
+    session.add(user)
+    await session.flush()
+    return user
@@ -0,0 +1,191 @@
+"""EXPLAIN-based regression tests for the repositories' hot read paths.
+
+Each hot path calls the real repository code while every SELECT it sends is
+captured; each statement is then run through `EXPLAIN (FORMAT JSON)` with its
+own parameters. A sequential scan of habit_tracking_logs, habits or
+habit_categories fails the test, so a dropped index or a predicate that stops
+being index-friendly (a cast on the column, say) shows up before it ships.
+
+Planner choices only mean something on Postgres with realistic volumes, so
+these tests run only when TEST_POSTGRES_URL names a scratch database, e.g.
+
+    TEST_POSTGRES_URL=postgresql+asyncpg://postgres@localhost/plans pytest
+
+Its tables are dropped, recreated and seeded with synthetic users, habits and
+logs; never point it at a database you care about.
+"""
+import datetime
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+import pytest
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.crud import crud_analytics
+from app.crud.bulk import existing_log_keys, owned_habit_ids
+from app.crud.export import tracking_log_export_query
+from app.crud.habit import HabitCategoryRepository, HabitRepository, HabitTrackingLogRepository
+from app.crud.heatmap import rebuild_year_bitmaps
+from app.crud.pagination import LogPosition
+from app.crud.rollup import rebuild_daily_rollups
+from app.crud.streak import rebuild_streaks
+from app.crud.sync import ChangesPosition, SyncRepository
+from app.models import Base, Habit, User
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set"),
+]
+
+# Tables that must never be scanned in full on a hot path
+CHECKED_TABLES = {"habit_tracking_logs", "habits", "habit_categories"}
+
+SEED_USERS = 2000
+SEED_CATEGORIES = 3  # Per user
+SEED_HABITS = 5  # Per user
+SEED_LOGS = 60  # Per habit
+
+
+@dataclass
+class Probe:
+    user_id: int
+    habit_id: int
+    timezone: str
+    today: datetime.date
+
+
+async def _seed(session: AsyncSession) -> None:
+    await session.execute(text(
+        "INSERT INTO users (email, password_hash, is_active, data_version, timezone) "
+        "SELECT 'plan-' || g || '@example.com', 'x', true, 0, 'Europe/Berlin' FROM generate_series(1, :users) AS g"
+    ), {"users": SEED_USERS})
+    await session.execute(text(
+        "INSERT INTO habit_categories (user_id, name) "
+        "SELECT u.id, 'Category ' || g FROM users u CROSS JOIN generate_series(1, :categories) AS g"
+    ), {"categories": SEED_CATEGORIES})
+    await session.execute(text(
+        "INSERT INTO habits (user_id, name, frequency_type, target_times, days_of_week, times_of_day, reminder_on, category_id) "
+        "SELECT u.id, 'Habit ' || g, 'DAILY', 1, '[]', '[]', false, "
+        "(SELECT min(c.id) FROM habit_categories c WHERE c.user_id = u.id) "
+        "FROM users u CROSS JOIN generate_series(1, :habits) AS g"
+    ), {"habits": SEED_HABITS})
+    # Logs every seven hours going back from now
+    await session.execute(text(
+        "INSERT INTO habit_tracking_logs (habit_id, user_id, logged_datetime, completed) "
+        "SELECT h.id, h.user_id, now() - make_interval(hours => 7 * g), true "
+        "FROM habits h CROSS JOIN generate_series(1, :logs) AS g"
+    ), {"logs": SEED_LOGS})
+    await rebuild_daily_rollups(session)
+    await rebuild_year_bitmaps(session)
+    # Streak state only for the probed (newest) user: the rebuild goes habit by habit
+    await rebuild_streaks(session, user_id=SEED_USERS)
+    await session.commit()
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="module")
+async def engine():
+    assert POSTGRES_URL is not None
+    engine = create_async_engine(POSTGRES_URL)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        await _seed(session)
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("ANALYZE"))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+async def probe(engine: AsyncEngine) -> Probe:
+    async with AsyncSession(engine) as session:
+        row = (await session.execute(
+            select(User.id, User.timezone, func.min(Habit.id))
+            .join(Habit, Habit.user_id == User.id)
+            .group_by(User.id, User.timezone)
+            .order_by(User.id.desc())
+            .limit(1)
+        )).one()
+    return Probe(row[0], row[2], row[1], datetime.date.today())
+
+
+async def _feed_second_page(session: AsyncSession, probe: Probe) -> None:
+    repo = HabitTrackingLogRepository(session)
+    first = await repo.get_tracking_log_page(user_id=probe.user_id, limit=20)
+    last = first["items"][-1]
+    await repo.get_tracking_log_page(user_id=probe.user_id, position=LogPosition(last.logged_datetime, last.id), limit=20)
+
+
+async def _import_dedupe(session: AsyncSession, probe: Probe) -> None:
+    await owned_habit_ids(session, probe.user_id, {probe.habit_id})
+    moment = datetime.datetime.now(datetime.UTC)
+    rows = [{"habit_id": probe.habit_id, "logged_datetime": moment - datetime.timedelta(days=n)} for n in range(3)]
+    await existing_log_keys(session, probe.user_id, rows)
+
+
+HOT_PATHS: dict[str, Callable[[AsyncSession, Probe], Awaitable]] = {
+    "habit list": lambda s, p: HabitRepository(s).get_habit_summaries(user_id=p.user_id, today=p.today),
+    "habit ownership": lambda s, p: HabitRepository(s).user_owns_habit(habit_id=p.habit_id, user_id=p.user_id),
+    "categories": lambda s, p: HabitCategoryRepository(s).get_habit_categories_by_user_id(user_id=p.user_id),
+    "habit log page": lambda s, p: HabitTrackingLogRepository(s).get_tracking_log_page(user_id=p.user_id, habit_id=p.habit_id),
+    "feed page 2": _feed_second_page,
+    "habit statistics": lambda s, p: HabitTrackingLogRepository(s).get_habit_statistics(habit_id=p.habit_id, user_id=p.user_id),
+    "streaks": lambda s, p: HabitTrackingLogRepository(s).get_streak_overview(user_id=p.user_id, today=p.today),
+    "heatmap": lambda s, p: HabitTrackingLogRepository(s).get_year_heatmap(user_id=p.user_id, year=p.today.year),
+    "analytics month": lambda s, p: crud_analytics.get_analytics(db=s, user_id=p.user_id, time_period="Month", timezone=p.timezone),
+    "analytics hours": lambda s, p: crud_analytics.get_analytics(
+        db=s, user_id=p.user_id, time_period="Week", timezone=p.timezone, granularity="hour",
+        start=p.today - datetime.timedelta(days=2), end=p.today,
+    ),
+    "changes feed": lambda s, p: SyncRepository(s).get_changes(
+        user_id=p.user_id, position=ChangesPosition(datetime.datetime.now(datetime.UTC) - datetime.timedelta(hours=1))
+    ),
+    "export": lambda s, p: s.execute(tracking_log_export_query(user_id=p.user_id, habit_id=p.habit_id)),
+    "import dedupe": _import_dedupe,
+}
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name", "?"))
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+@pytest.mark.parametrize("name", HOT_PATHS)
+async def test_hot_path_uses_indexes(engine: AsyncEngine, probe: Probe, name: str):
+    captured: list[tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    async with AsyncSession(engine) as session:
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            await HOT_PATHS[name](session, probe)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        assert captured, f"{name} sent no SELECT"
+
+        connection = await session.connection()
+        for statement, parameters in captured:
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar_one()
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+            scanned = sorted(set(_seq_scans(plan)) & CHECKED_TABLES)
+            assert not scanned, f"sequential scan of {', '.join(scanned)} in: {' '.join(statement.split())}"
@@ -0,0 +1,72 @@
+import datetime
+
+from app.core.schedule import HabitSchedule, expected_occurrences, parse_days_of_week, weekday_counts
+from app.models.habit import FrequencyType
+
+MONDAY = datetime.date(2026, 10, 12)
+
+
+def day(offset: int) -> datetime.date:
+    return MONDAY + datetime.timedelta(days=offset)
+
+
+def test_parse_days_of_week_accepts_both_formats():
+    assert parse_days_of_week("3,1,5") == [1, 3, 5]
+    assert parse_days_of_week('["5","1"]') == [1, 5]
+    assert parse_days_of_week("[0, 6, 6, 9, \"x\"]") == [0, 6]
+    assert parse_days_of_week(None) == []
+    assert parse_days_of_week("") == []
+
+
+def test_daily_periods_are_days():
+    schedule = HabitSchedule(FrequencyType.DAILY, 2, None)
+    assert schedule.target == 2
+    assert schedule.period_of(day(1)) == schedule.period_of(day(0)) + 1
+    assert schedule.period_days(day(3)) == (day(3), day(3))
+    assert schedule.latest_period(day(3)) == schedule.period_of(day(3))
+
+
+def test_weekly_periods_are_monday_based_weeks():
+    schedule = HabitSchedule(FrequencyType.WEEKLY, 3, "[]")
+    assert schedule.is_weekly and schedule.target == 3
+    week = schedule.period_of(MONDAY)
+    assert [schedule.period_of(day(offset)) for offset in range(7)] == [week] * 7
+    assert schedule.period_of(day(-1)) == week - 1  # The Sunday before
+    assert schedule.period_of(day(7)) == week + 1
+    assert schedule.period_days(day(6)) == (MONDAY, day(6))
+    assert schedule.latest_period(day(4)) == week
+
+
+def test_weekly_days_of_week_number_scheduled_days_in_week_order():
+    # Sunday (0) and Wednesday (3): Sunday ends the Monday-based week
+    schedule = HabitSchedule(FrequencyType.WEEKLY, 5, "0,3")
+    assert schedule.target == 1
+    wednesday, sunday = schedule.period_of(day(2)), schedule.period_of(day(6))
+    assert wednesday is not None and sunday == wednesday + 1
+    assert schedule.period_of(day(9)) == sunday + 1  # Next Wednesday
+    assert schedule.period_of(day(-1)) == wednesday - 1  # Previous Sunday
+    assert schedule.period_of(MONDAY) is None
+    assert schedule.period_of(day(4)) is None
+    assert schedule.period_days(day(2)) == (day(2), day(2))
+
+
+def test_weekly_days_of_week_latest_period_on_unscheduled_days():
+    schedule = HabitSchedule(FrequencyType.WEEKLY, None, "0,3")
+    assert schedule.latest_period(day(4)) == schedule.period_of(day(2))  # Friday: this Wednesday
+    assert schedule.latest_period(MONDAY) == schedule.period_of(day(-1))  # Monday: last Sunday
+    assert schedule.latest_period(day(6)) == schedule.period_of(day(6))
+
+
+def test_weekday_counts_are_monday_based():
+    assert weekday_counts(MONDAY, day(6)) == [1] * 7
+    assert weekday_counts(day(5), day(7)) == [1, 0, 0, 0, 0, 1, 1]  # Saturday to the next Monday
+    assert weekday_counts(day(1), MONDAY) == [0] * 7
+
+
+def test_expected_occurrences_per_schedule():
+    schedules = [
+        HabitSchedule(FrequencyType.DAILY, 2, None),
+        HabitSchedule(FrequencyType.WEEKLY, 3, None),
+        HabitSchedule(FrequencyType.WEEKLY, None, "1,6"),  # Monday and Saturday
+    ]
+    assert expected_occurrences(schedules, MONDAY, day(13)) == [28.0, 6.0, 4.0]
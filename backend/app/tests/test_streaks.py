@@ -0,0 +1,218 @@
+import datetime
+import random
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.schedule import HabitSchedule
+from app.crud import streak as streak_module
+from app.crud.bulk import record_logs_added, record_logs_removed
+from app.crud.rollup import apply_rollup_delta
+from app.crud.streak import (
+    OVERALL_SCHEDULE, _advance, _streak_runs, rebuild_streaks, record_log_change,
+)
+from app.models import Habit, HabitDailyRollup, User
+from app.models.habit import FrequencyType
+from app.models.streak import HabitStreak, UserStreak
+
+pytestmark = pytest.mark.anyio
+
+MONDAY = datetime.date(2026, 10, 12)
+
+
+def day(offset: int) -> datetime.date:
+    return MONDAY + datetime.timedelta(days=offset)
+
+
+def log_row(habit: Habit, logged_day: datetime.date) -> dict:
+    logged = datetime.datetime.combine(logged_day, datetime.time(12), tzinfo=datetime.UTC)
+    return {"habit_id": habit.id, "logged_datetime": logged, "progress": None}
+
+
+async def add_habit(
+    session: AsyncSession, user: User, frequency_type: FrequencyType = FrequencyType.DAILY,
+    target_times: int | None = None, days_of_week: str | None = None,
+) -> Habit:
+    habit = Habit(
+        user_id=user.id, name="Habit", frequency_type=frequency_type,
+        target_times=target_times, days_of_week=days_of_week,
+    )
+    session.add(habit)
+    await session.flush()
+    return habit
+
+
+async def log(session: AsyncSession, user: User, habit: Habit, *days: datetime.date) -> None:
+    await record_logs_added(session, user.id, [log_row(habit, logged_day) for logged_day in days], "UTC")
+
+
+async def unlog(session: AsyncSession, user: User, habit: Habit, *days: datetime.date) -> None:
+    await record_logs_removed(session, user.id, [log_row(habit, logged_day) for logged_day in days], "UTC")
+
+
+async def streak(session: AsyncSession, habit: Habit) -> tuple[int, int]:
+    state = await session.get(HabitStreak, habit.id)
+    assert state is not None
+    return state.current_streak, state.longest_streak
+
+
+@pytest.fixture
+def recomputes(monkeypatch) -> list[int]:
+    """Habit ids passed to the full recompute fallback, in call order."""
+    calls: list[int] = []
+    recompute = streak_module.recompute_habit_streak
+
+    async def counting(session, habit_id):
+        calls.append(habit_id)
+        return await recompute(session, habit_id)
+
+    monkeypatch.setattr(streak_module, "recompute_habit_streak", counting)
+    return calls
+
+
+def test_advance_extends_restarts_and_refuses_backfills():
+    schedule = HabitSchedule(FrequencyType.DAILY, 1, None)
+    state = HabitStreak(habit_id=1, user_id=1, current_streak=0, longest_streak=0)
+
+    def advance(offset: int) -> bool:
+        period = schedule.period_of(day(offset))
+        assert period is not None
+        return _advance(state, schedule, period, day(offset))
+
+    assert advance(0) and (state.current_streak, state.longest_streak) == (1, 1)
+    assert advance(1) and (state.current_streak, state.longest_streak) == (2, 2)
+    assert advance(1) and (state.current_streak, state.longest_streak) == (2, 2)  # Same period
+    assert advance(3) and (state.current_streak, state.longest_streak) == (1, 2)  # Gap restarts the run
+    assert state.last_completed_day == day(3)
+    assert not advance(2)  # Backfill: needs a recompute
+
+
+async def test_streak_runs_group_consecutive_met_periods(session, user):
+    habit = await add_habit(session, user)
+    for offset in (0, 1, 3, 4, 5):
+        session.add(HabitDailyRollup(user_id=user.id, habit_id=habit.id, day=day(offset), completions=1))
+    await session.flush()
+
+    runs = await _streak_runs(session, HabitSchedule.for_habit(habit), HabitDailyRollup.habit_id == habit.id)
+
+    assert [(run.length, run.last_day) for run in runs] == [(3, day(5)), (2, day(1))]
+
+
+async def test_streak_runs_follow_weekly_days_of_week(session, user):
+    # Wednesday and Sunday; the Monday and Thursday logs are off schedule
+    habit = await add_habit(session, user, FrequencyType.WEEKLY, None, "0,3")
+    for offset in (0, 2, 3, 6, 9, 20):
+        session.add(HabitDailyRollup(user_id=user.id, habit_id=habit.id, day=day(offset), completions=1))
+    await session.flush()
+
+    runs = await _streak_runs(session, HabitSchedule.for_habit(habit), HabitDailyRollup.habit_id == habit.id)
+
+    assert [(run.length, run.last_day) for run in runs] == [(1, day(20)), (3, day(9))]
+
+
+async def test_period_reaching_target_extends_run_in_place(session, user, recomputes):
+    habit = await add_habit(session, user, target_times=2)
+    await log(session, user, habit, day(0))
+    assert recomputes == [habit.id]  # No state yet
+    assert await streak(session, habit) == (0, 0)
+
+    await log(session, user, habit, day(0))
+    await log(session, user, habit, day(1), day(1))
+
+    assert recomputes == [habit.id]
+    assert await streak(session, habit) == (2, 2)
+
+
+async def test_period_dropping_below_target_recomputes(session, user, recomputes):
+    habit = await add_habit(session, user)
+    await log(session, user, habit, day(0), day(1), day(2))
+    recomputes.clear()
+
+    await unlog(session, user, habit, day(1))
+
+    assert recomputes == [habit.id]
+    assert await streak(session, habit) == (1, 1)
+
+
+async def test_backfilled_period_recomputes(session, user, recomputes):
+    habit = await add_habit(session, user)
+    await log(session, user, habit, day(0))
+    await log(session, user, habit, day(2))
+    recomputes.clear()
+    assert await streak(session, habit) == (1, 1)
+
+    await log(session, user, habit, day(1))
+
+    assert recomputes == [habit.id]
+    assert await streak(session, habit) == (3, 3)
+
+
+async def test_weekly_target_counts_monday_based_weeks(session, user):
+    habit = await add_habit(session, user, FrequencyType.WEEKLY, 2, "[]")
+
+    async def log_one(logged_day: datetime.date) -> None:
+        await apply_rollup_delta(session, user_id=user.id, habit_id=habit.id, day=logged_day, completions=1)
+        await record_log_change(session, user_id=user.id, habit_id=habit.id, day=logged_day, delta=1)
+
+    await log_one(day(6))  # Sunday
+    await log_one(day(7))  # The next Monday starts another week
+    assert await streak(session, habit) == (0, 0)
+
+    await log_one(day(0))
+    assert await streak(session, habit) == (1, 1)
+    await log_one(day(8))
+    assert await streak(session, habit) == (2, 2)
+
+
+async def test_weekly_days_of_week_streak(session, user):
+    habit = await add_habit(session, user, FrequencyType.WEEKLY, None, "0,3")
+    await log(session, user, habit, day(2), day(6), day(9))
+    assert await streak(session, habit) == (3, 3)
+
+    await log(session, user, habit, day(10), day(11))  # Off schedule
+    assert await streak(session, habit) == (3, 3)
+
+    await log(session, user, habit, day(20))  # Skips the second Sunday
+    assert await streak(session, habit) == (1, 3)
+
+
+async def test_incremental_updates_agree_with_rebuild(session, user):
+    habits = [
+        await add_habit(session, user),
+        await add_habit(session, user, target_times=2),
+        await add_habit(session, user, FrequencyType.WEEKLY, 3, "[]"),
+        await add_habit(session, user, FrequencyType.WEEKLY, None, "0,3"),
+        await add_habit(session, user, FrequencyType.WEEKLY, None, "1,2,3,4,5"),
+    ]
+    schedules = {habit.id: HabitSchedule.for_habit(habit) for habit in habits}
+
+    async def snapshot() -> dict:
+        # Within a period the recorded last day may differ, so compare periods
+        states: dict = {}
+        for key, schedule, state in [
+            *[(habit_id, schedule, await session.get(HabitStreak, habit_id)) for habit_id, schedule in schedules.items()],
+            ("overall", OVERALL_SCHEDULE, await session.get(UserStreak, user.id)),
+        ]:
+            if state is None or state.last_completed_day is None:
+                states[key] = (0, 0, None) if state is None else (state.current_streak, state.longest_streak, None)
+            else:
+                period = schedule.period_of(state.last_completed_day)
+                states[key] = (state.current_streak, state.longest_streak, period)
+        return states
+
+    rng = random.Random(2026)
+    logged: list[dict] = []
+    for step in range(80):
+        action = rng.choice(["insert", "insert", "backfill", "delete"])
+        if action == "delete" and logged:
+            removed = [logged.pop(rng.randrange(len(logged))) for _ in range(min(len(logged), rng.randint(1, 4)))]
+            await record_logs_removed(session, user.id, removed, "UTC")
+        else:
+            offsets = range(0, 28) if action == "backfill" else range(28 + step // 4, 35 + step // 4)
+            added = [log_row(rng.choice(habits), day(rng.choice(offsets))) for _ in range(rng.randint(1, 6))]
+            await record_logs_added(session, user.id, added, "UTC")
+            logged.extend(added)
+
+        incremental = await snapshot()
+        await rebuild_streaks(session, user_id=user.id)
+        assert incremental == await snapshot(), f"step {step}: {action}"
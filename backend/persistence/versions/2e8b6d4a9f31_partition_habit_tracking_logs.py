@@ -0,0 +1,178 @@
+"""partition_habit_tracking_logs
+
+Revision ID: 2e8b6d4a9f31
+Revises: c5f1e7a3d928
+Create Date: 2026-10-18 20:06:41.207395
+
+On Postgres habit_tracking_logs becomes a table partitioned by month of
+logged_datetime (UTC). No rows are copied: the existing table is attached as
+the first partition, habit_tracking_logs_legacy, covering everything before
+the month after the newest log. Everything slow runs before the swap and
+without blocking writes (a NOT VALID bound check validated afterwards, and
+unique indexes built CONCURRENTLY), so the swap itself only takes brief locks.
+It gives up after lock_timeout rather than queueing writes behind a long
+transaction; just rerun it.
+
+Partitioned tables need the partition key in every unique constraint, so
+the primary key becomes (id, logged_datetime) and the client id constraint
+(user_id, client_id, logged_datetime). ids still come from the one sequence.
+The wider constraint no longer keeps a client id unique; sync_client_ids
+(revision 4c7e1a9d3b58) does that now.
+Later months are created ahead of time by `python -m app.core.partitions`;
+a default partition catches anything outside them.
+
+Elsewhere only the client id constraint changes. The Postgres downgrade
+copies every row back into a plain table, so it is not online; partitions
+detached in the meantime are not brought back.
+"""
+
+import datetime
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2e8b6d4a9f31"
+down_revision: str | None = "c5f1e7a3d928"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+TABLE = "habit_tracking_logs"
+LEGACY = "habit_tracking_logs_legacy"
+MONTHS_AHEAD = 3
+
+INDEXES = [
+    ("ix_habit_tracking_logs_id", ["id"]),
+    ("ix_habit_tracking_logs_user_id_updated_at", ["user_id", "updated_at"]),
+    (
+        "ix_habit_tracking_logs_habit_id_logged_datetime_id",
+        ["habit_id", "logged_datetime", "id"],
+    ),
+    (
+        "ix_habit_tracking_logs_user_id_logged_datetime_id",
+        ["user_id", "logged_datetime", "id"],
+    ),
+]
+OLD_UNIQUE = ("uq_habit_tracking_logs_user_id_client_id", ["user_id", "client_id"])
+NEW_UNIQUE = (
+    "uq_habit_tracking_logs_user_id_client_id_logged_datetime",
+    ["user_id", "client_id", "logged_datetime"],
+)
+
+
+def _month(day: datetime.date, months: int) -> datetime.date:
+    years, month = divmod(day.month - 1 + months, 12)
+    return datetime.date(day.year + years, month + 1, 1)
+
+
+def _bound(day: datetime.date) -> str:
+    return f"'{day.isoformat()} 00:00:00+00'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        with op.batch_alter_table(TABLE) as batch_op:
+            batch_op.drop_constraint(OLD_UNIQUE[0], type_="unique")
+            batch_op.create_unique_constraint(*NEW_UNIQUE)
+        return
+
+    # First month not held by the existing table; future-dated logs included
+    newest = bind.execute(
+        sa.text(
+            "SELECT date_trunc('month', "
+            "greatest(now(), coalesce(max(logged_datetime), now())) "
+            "AT TIME ZONE 'UTC') "
+            f"FROM {TABLE}"
+        )
+    ).scalar_one()
+    boundary = _month(newest.date(), 1)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {LEGACY}_bound "
+            f"CHECK (logged_datetime < {_bound(boundary)}) NOT VALID"
+        )
+        op.execute(f"ALTER TABLE {TABLE} VALIDATE CONSTRAINT {LEGACY}_bound")
+        op.execute(
+            f"CREATE UNIQUE INDEX CONCURRENTLY {LEGACY}_id_logged_datetime "
+            f"ON {TABLE} (id, logged_datetime)"
+        )
+        op.execute(
+            f"CREATE UNIQUE INDEX CONCURRENTLY uq_{LEGACY}_client_id "
+            f"ON {TABLE} ({', '.join(NEW_UNIQUE[1])})"
+        )
+
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+    op.execute(f"ALTER TABLE {LEGACY} DROP CONSTRAINT {OLD_UNIQUE[0]}")
+    op.execute(f"ALTER TABLE {LEGACY} DROP CONSTRAINT {TABLE}_pkey")
+    op.execute(
+        f"ALTER TABLE {LEGACY} ADD CONSTRAINT {LEGACY}_pkey "
+        f"PRIMARY KEY USING INDEX {LEGACY}_id_logged_datetime"
+    )
+    op.execute(
+        f"ALTER TABLE {LEGACY} ADD CONSTRAINT uq_{LEGACY}_client_id "
+        f"UNIQUE USING INDEX uq_{LEGACY}_client_id"
+    )
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace(TABLE, LEGACY)}")
+
+    # Constraints and indexes go on the parent while it is empty; attaching
+    # then adopts the legacy table's matching ones instead of building new
+    op.execute(
+        f"CREATE TABLE {TABLE} (LIKE {LEGACY} INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (logged_datetime)"
+    )
+    op.execute(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey "
+        "PRIMARY KEY (id, logged_datetime)"
+    )
+    op.create_unique_constraint(NEW_UNIQUE[0], TABLE, NEW_UNIQUE[1])
+    op.create_foreign_key(
+        f"{TABLE}_habit_id_fkey", TABLE, "habits", ["habit_id"], ["id"]
+    )
+    op.create_foreign_key(f"{TABLE}_user_id_fkey", TABLE, "users", ["user_id"], ["id"])
+    for name, columns in INDEXES:
+        op.create_index(name, TABLE, columns, unique=False)
+    op.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+
+    # The validated bound check lets the attach skip scanning the table
+    op.execute(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY} "
+        f"FOR VALUES FROM (MINVALUE) TO ({_bound(boundary)})"
+    )
+    op.execute(f"ALTER TABLE {LEGACY} DROP CONSTRAINT {LEGACY}_bound")
+    op.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+    for months in range(MONTHS_AHEAD):
+        start = _month(boundary, months)
+        op.execute(
+            f"CREATE TABLE {TABLE}_p{start:%Y%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ({_bound(start)}) TO ({_bound(_month(start, 1))})"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        with op.batch_alter_table(TABLE) as batch_op:
+            batch_op.drop_constraint(NEW_UNIQUE[0], type_="unique")
+            batch_op.create_unique_constraint(*OLD_UNIQUE)
+        return
+
+    op.execute(f"CREATE TABLE {TABLE}_flat (LIKE {TABLE} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {TABLE}_flat SELECT * FROM {TABLE}")
+    op.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}_flat.id")
+    op.execute(f"DROP TABLE {TABLE}")
+    op.execute(f"ALTER TABLE {TABLE}_flat RENAME TO {TABLE}")
+    op.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id)")
+    op.create_unique_constraint(OLD_UNIQUE[0], TABLE, OLD_UNIQUE[1])
+    op.create_foreign_key(
+        f"{TABLE}_habit_id_fkey", TABLE, "habits", ["habit_id"], ["id"]
+    )
+    op.create_foreign_key(f"{TABLE}_user_id_fkey", TABLE, "users", ["user_id"], ["id"])
+    for name, columns in INDEXES:
+        op.create_index(name, TABLE, columns, unique=False)
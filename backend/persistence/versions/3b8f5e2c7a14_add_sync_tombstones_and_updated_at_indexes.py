@@ -0,0 +1,82 @@
+"""add_sync_tombstones_and_updated_at_indexes
+
+Revision ID: 3b8f5e2c7a14
+Revises: a6e3c9d1f047
+Create Date: 2026-10-18 19:04:37.281945
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8f5e2c7a14"
+down_revision: str | None = "a6e3c9d1f047"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "sync_tombstones",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("client_id", sa.Uuid(), nullable=True),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_sync_tombstones_id"), "sync_tombstones", ["id"], unique=False
+    )
+    op.create_index(
+        "ix_sync_tombstones_user_id_deleted_at",
+        "sync_tombstones",
+        ["user_id", "deleted_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_habit_categories_user_id_updated_at",
+        "habit_categories",
+        ["user_id", "updated_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_habits_user_id_updated_at",
+        "habits",
+        ["user_id", "updated_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_habit_tracking_logs_user_id_updated_at",
+        "habit_tracking_logs",
+        ["user_id", "updated_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_habit_tracking_logs_user_id_updated_at", table_name="habit_tracking_logs"
+    )
+    op.drop_index("ix_habits_user_id_updated_at", table_name="habits")
+    op.drop_index(
+        "ix_habit_categories_user_id_updated_at", table_name="habit_categories"
+    )
+    op.drop_index("ix_sync_tombstones_user_id_deleted_at", table_name="sync_tombstones")
+    op.drop_index(op.f("ix_sync_tombstones_id"), table_name="sync_tombstones")
+    op.drop_table("sync_tombstones")
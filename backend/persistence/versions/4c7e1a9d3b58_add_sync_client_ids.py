@@ -0,0 +1,60 @@
+"""add_sync_client_ids
+
+Revision ID: 4c7e1a9d3b58
+Revises: 9c4e7a2f5b16
+Create Date: 2026-10-18 21:12:08.415390
+
+Partitioning habit_tracking_logs widened its client id constraint to
+(user_id, client_id, logged_datetime), which no longer stops two copies of
+one queued create: two concurrent replays can both miss the other's row, and
+a retry whose logged_at was edited offline doesn't collide at all.
+
+sync_client_ids restores the guarantee with a plain (user_id, client_id)
+primary key outside the partitioned table. Sync claims each create's client
+id there with ON CONFLICT DO NOTHING before inserting the log; a concurrent
+replay waits on the first claim and then finds it taken. The cost is one
+more small insert per synced create, and a row per synced log that is kept
+after the log is deleted or archived, since that is what makes a late replay
+a duplicate. A per-user advisory lock would have cost no storage but
+serialised all of a user's sync batches, and works on Postgres only.
+
+Existing client ids, of stored logs and of tombstones, are backfilled.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4c7e1a9d3b58"
+down_revision: str | None = "9c4e7a2f5b16"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "sync_client_ids",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("client_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id", "client_id"),
+    )
+    op.execute(
+        "INSERT INTO sync_client_ids (user_id, client_id) "
+        "SELECT user_id, client_id FROM habit_tracking_logs "
+        "WHERE client_id IS NOT NULL "
+        "UNION "
+        "SELECT user_id, client_id FROM sync_tombstones "
+        "WHERE client_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("sync_client_ids")
@@ -0,0 +1,31 @@
+"""add_data_version_to_users
+
+Revision ID: 5c8e1f2d9b47
+Revises: e3a9f0b5c182
+Create Date: 2026-10-18 15:02:44.873190
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c8e1f2d9b47"
+down_revision: str | None = "e3a9f0b5c182"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("data_version", sa.BigInteger(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "data_version")
@@ -0,0 +1,45 @@
+"""add_log_keyset_indexes
+
+Revision ID: 7d2a4f8b1c56
+Revises: 3b8f5e2c7a14
+Create Date: 2026-10-18 19:21:50.734116
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7d2a4f8b1c56"
+down_revision: str | None = "3b8f5e2c7a14"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_habit_tracking_logs_habit_id_logged_datetime_id",
+        "habit_tracking_logs",
+        ["habit_id", "logged_datetime", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_habit_tracking_logs_user_id_logged_datetime_id",
+        "habit_tracking_logs",
+        ["user_id", "logged_datetime", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_habit_tracking_logs_user_id_logged_datetime_id",
+        table_name="habit_tracking_logs",
+    )
+    op.drop_index(
+        "ix_habit_tracking_logs_habit_id_logged_datetime_id",
+        table_name="habit_tracking_logs",
+    )
@@ -0,0 +1,35 @@
+"""add_timezone_to_users
+
+Revision ID: 8a2d6c4f1e93
+Revises: 5c8e1f2d9b47
+Create Date: 2026-10-18 16:11:05.402318
+
+Existing users default to UTC, which is how rollup days were computed so far,
+so no rollup or streak rebuild is needed.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8a2d6c4f1e93"
+down_revision: str | None = "5c8e1f2d9b47"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column(
+            "timezone", sa.String(length=64), server_default="UTC", nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "timezone")
@@ -0,0 +1,28 @@
+"""add_logs_archived_before_to_users
+
+Revision ID: 9c4e7a2f5b16
+Revises: 2e8b6d4a9f31
+Create Date: 2026-10-18 20:41:17.093552
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9c4e7a2f5b16"
+down_revision: str | None = "2e8b6d4a9f31"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("users", sa.Column("logs_archived_before", sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "logs_archived_before")
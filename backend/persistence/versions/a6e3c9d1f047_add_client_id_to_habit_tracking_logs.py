@@ -0,0 +1,36 @@
+"""add_client_id_to_habit_tracking_logs
+
+Revision ID: a6e3c9d1f047
+Revises: f1c3a8e5b2d7
+Create Date: 2026-10-18 18:52:14.618203
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6e3c9d1f047"
+down_revision: str | None = "f1c3a8e5b2d7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("habit_tracking_logs") as batch_op:
+        batch_op.add_column(sa.Column("client_id", sa.Uuid(), nullable=True))
+        batch_op.create_unique_constraint(
+            "uq_habit_tracking_logs_user_id_client_id", ["user_id", "client_id"]
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("habit_tracking_logs") as batch_op:
+        batch_op.drop_constraint(
+            "uq_habit_tracking_logs_user_id_client_id", type_="unique"
+        )
+        batch_op.drop_column("client_id")
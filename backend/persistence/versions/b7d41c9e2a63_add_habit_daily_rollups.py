@@ -0,0 +1,63 @@
+"""add_habit_daily_rollups
+
+Revision ID: b7d41c9e2a63
+Revises: 4e2154ac9b59
+Create Date: 2026-10-18 10:12:31.204118
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d41c9e2a63"
+down_revision: str | None = "4e2154ac9b59"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "habit_daily_rollups",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("habit_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("completions", sa.Integer(), nullable=False),
+        sa.Column("progress_sum", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["habit_id"],
+            ["habits.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id", "day", "habit_id"),
+    )
+    op.create_index(
+        "ix_habit_daily_rollups_habit_id_day",
+        "habit_daily_rollups",
+        ["habit_id", "day"],
+        unique=False,
+    )
+
+    # Backfill from existing logs; new writes are maintained by the repository layer
+    op.execute("""
+        INSERT INTO habit_daily_rollups
+            (user_id, habit_id, day, completions, progress_sum)
+        SELECT user_id, habit_id, CAST(timezone('UTC', logged_datetime) AS DATE),
+               COUNT(id), COALESCE(SUM(progress), 0)
+        FROM habit_tracking_logs
+        GROUP BY user_id, habit_id, CAST(timezone('UTC', logged_datetime) AS DATE)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_habit_daily_rollups_habit_id_day", table_name="habit_daily_rollups"
+    )
+    op.drop_table("habit_daily_rollups")
@@ -0,0 +1,51 @@
+"""add_hot_path_indexes
+
+Revision ID: c5f1e7a3d928
+Revises: 7d2a4f8b1c56
+Create Date: 2026-10-18 19:40:02.551873
+
+Built with CREATE INDEX CONCURRENTLY on Postgres, so writes to these tables
+are not blocked while the indexes build; each runs outside the migration
+transaction. A build that fails leaves an INVALID index: drop it and rerun.
+
+Tracking logs are already covered by the (user_id, logged_datetime, id) and
+(habit_id, logged_datetime, id) keyset indexes; (user_id, name) serves both
+the per-user filter and the name ordering of the habit and category lists.
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c5f1e7a3d928"
+down_revision: str | None = "7d2a4f8b1c56"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+INDEXES = [
+    ("ix_habits_user_id_name", "habits", ["user_id", "name"]),
+    ("ix_habits_category_id", "habits", ["category_id"]),
+    ("ix_habit_categories_user_id_name", "habit_categories", ["user_id", "name"]),
+    (
+        "ix_sync_tombstones_user_id_client_id",
+        "sync_tombstones",
+        ["user_id", "client_id"],
+    ),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,55 @@
+"""add_habit_year_bitmaps
+
+Revision ID: d4b7e2a9c615
+Revises: 8a2d6c4f1e93
+Create Date: 2026-10-18 17:20:41.935127
+
+Bitmaps are derived from habit_daily_rollups, so existing data is backfilled
+with `python -m app.core.repair` after upgrading.
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4b7e2a9c615"
+down_revision: str | None = "8a2d6c4f1e93"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "habit_year_bitmaps",
+        sa.Column("habit_id", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("bits", sa.LargeBinary(length=46), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["habit_id"],
+            ["habits.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("habit_id", "year"),
+    )
+    op.create_index(
+        op.f("ix_habit_year_bitmaps_user_id"),
+        "habit_year_bitmaps",
+        ["user_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f("ix_habit_year_bitmaps_user_id"), table_name="habit_year_bitmaps"
+    )
+    op.drop_table("habit_year_bitmaps")
@@ -0,0 +1,66 @@
+"""add_streak_state_tables
+
+Revision ID: e3a9f0b5c182
+Revises: b7d41c9e2a63
+Create Date: 2026-10-18 13:48:05.611372
+
+Streak state is derived from habit_daily_rollups with schedule-aware logic that
+lives in the application, so existing data is backfilled with
+`python -m app.core.repair` after upgrading. Until then the first log write for
+a habit recomputes its state on demand.
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a9f0b5c182"
+down_revision: str | None = "b7d41c9e2a63"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "habit_streaks",
+        sa.Column("habit_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("current_streak", sa.Integer(), nullable=False),
+        sa.Column("longest_streak", sa.Integer(), nullable=False),
+        sa.Column("last_completed_day", sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["habit_id"],
+            ["habits.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("habit_id"),
+    )
+    op.create_index(
+        op.f("ix_habit_streaks_user_id"), "habit_streaks", ["user_id"], unique=False
+    )
+    op.create_table(
+        "user_streaks",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("current_streak", sa.Integer(), nullable=False),
+        sa.Column("longest_streak", sa.Integer(), nullable=False),
+        sa.Column("last_completed_day", sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_streaks")
+    op.drop_index(op.f("ix_habit_streaks_user_id"), table_name="habit_streaks")
+    op.drop_table("habit_streaks")
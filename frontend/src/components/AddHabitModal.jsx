@@ -252,7 +252,8 @@ const AddHabitModal = ({ isOpen, onClose, onHabitAdded, categories }) => {
             <div className="form-group days-selector-group">
               <label>Select Days</label>
               <div className="days-checkboxes">
-                {['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'].map((dayName, index) => (
+                {/* Weeks start on Monday; values keep the 0=Sunday numbering */}
+                {[['Mon', 1], ['Tue', 2], ['Wed', 3], ['Thu', 4], ['Fri', 5], ['Sat', 6], ['Sun', 0]].map(([dayName, index]) => (
                   <label key={index} className="day-checkbox-label">
                     <input 
                       type="checkbox" 